@@ -7,13 +7,15 @@ from audio_generator import generate_audio, get_available_voices, get_voice_for_
 from database import LanguageHelperDB
 from file_handler import create_file_upload_widget
 from tutor_agent import TutorAgent
-from openai_client import get_global_openai_client
+from openai_client import get_global_openai_client, response_tokens
 from constants import (
     OPENAI_MODEL, OPENAI_MAX_TOKENS, OPENAI_TEMPERATURE,
-    DEFAULT_HISTORY_LIMIT, SUCCESS_MESSAGES, ERROR_MESSAGES
+    DEFAULT_HISTORY_LIMIT, HISTORY_MODES, SUCCESS_MESSAGES, ERROR_MESSAGES,
+    LLM_CACHE_TTL, LLM_ERROR_CACHE_TTL
 )
 from validators import validate_text_input, validate_language, sanitize_text
 from logger_config import log_user_action, log_debug, log_error
+from cache_manager import cached, report_load_cost
 
 # Konfiguracja OpenAI
 client = get_global_openai_client()
@@ -52,6 +54,105 @@ if 'chat_sessions_history' not in st.session_state:
     st.session_state.chat_sessions_history = []
 if 'tips_history' not in st.session_state:
     st.session_state.tips_history = []
+if 'history_cursors' not in st.session_state:
+    st.session_state.history_cursors = {}
+if 'older_history' not in st.session_state:
+    st.session_state.older_history = {}
+if 'history_boundaries' not in st.session_state:
+    st.session_state.history_boundaries = {}
+if 'chat_session_id' not in st.session_state:
+    st.session_state.chat_session_id = None
+if 'chat_saved_count' not in st.session_state:
+    st.session_state.chat_saved_count = 0
+
+# Klucze sesji przechowujące listy dla każdego typu historii
+HISTORY_SESSION_KEYS = {
+    "translations": "translation_history",
+    "corrections": "correction_history",
+    "chat_sessions": "chat_sessions_history",
+    "tips_history": "tips_history"
+}
+
+def set_history(history_type, first_page):
+    """
+    Ustawia historię w sesji: świeża pierwsza strona + wcześniej dociągnięte starsze strony
+    
+    Starsze strony zaczynają się od kursora (znacznik czasu, ID) końca pierwszej strony z chwili
+    ich dociągnięcia. Nowe zapisy przesuwają pierwszą stronę, więc elementy między jej końcem
+    a tym kursorem są dociągane - element z granicy stron nie znika z listy.
+    """
+    older = st.session_state.older_history.get(history_type, [])
+    boundary = st.session_state.history_boundaries.get(history_type)
+    items = list(first_page)
+    if older and boundary and items and not db.is_past_cursor(items[-1], boundary):
+        items.extend(load_until_cursor(history_type, items, boundary))
+    
+    item_ids = {item['id'] for item in items}
+    st.session_state[HISTORY_SESSION_KEYS[history_type]] = items + [item for item in older if item['id'] not in item_ids]
+    
+    # Kursor ustawiamy tylko dopóki użytkownik nie dociągnął starszych stron
+    if not older:
+        has_more = len(first_page) >= DEFAULT_HISTORY_LIMIT
+        st.session_state.history_cursors[history_type] = db.history_cursor(first_page) if has_more else None
+
+def load_until_cursor(history_type, items, boundary):
+    """Dociąga elementy starsze niż koniec listy items, aż do pozycji kursora boundary (bez niej)"""
+    loaded, cursor = [], db.history_cursor(items)
+    while cursor:
+        page, cursor = db.get_history_page(history_type, DEFAULT_HISTORY_LIMIT, cursor)
+        for item in page:
+            if db.is_past_cursor(item, boundary):
+                return loaded
+            loaded.append(item)
+    return loaded
+
+def render_load_more_button(history_type, key_suffix=""):
+    """
+    Wyświetla przycisk dociągający kolejną stronę starszej historii
+    
+    Args:
+        history_type: Typ historii
+        key_suffix: Przyrostek klucza widżetu - różny dla każdego miejsca wywołania
+    """
+    cursor = st.session_state.history_cursors.get(history_type)
+    if not cursor:
+        return
+    
+    if st.button("⬇️ Załaduj starsze", key=f"load_more_{history_type}{key_suffix}"):
+        if not st.session_state.older_history.get(history_type):
+            # Kursor pierwszej dociągniętej strony to granica między pierwszą stroną a starszymi
+            st.session_state.history_boundaries[history_type] = cursor
+        items, next_cursor = db.get_history_page(history_type, DEFAULT_HISTORY_LIMIT, cursor)
+        st.session_state.older_history.setdefault(history_type, []).extend(items)
+        st.session_state[HISTORY_SESSION_KEYS[history_type]].extend(items)
+        st.session_state.history_cursors[history_type] = next_cursor
+        log_debug(f"Dociągnięto {len(items)} starszych elementów historii: {history_type}")
+        st.rerun()
+
+def load_chat_messages(chat_session):
+    """Zwraca wszystkie wiadomości sesji czatu z archiwum (pobierane stronami)"""
+    if chat_session.get('chat_text'):
+        # Sesja zapisana jako jeden tekst (przed wprowadzeniem osobnych wiadomości)
+        messages = []
+        for line in chat_session['chat_text'].split('\n'):
+            if line.startswith('user:'):
+                messages.append({'role': 'user', 'content': line[5:].strip(), 'timestamp': chat_session['timestamp']})
+            elif line.startswith('assistant:'):
+                messages.append({'role': 'assistant', 'content': line[10:].strip(), 'timestamp': chat_session['timestamp']})
+        return messages
+    
+    messages, cursor = db.get_chat_messages(chat_session['id'])
+    while cursor:
+        page, cursor = db.get_chat_messages(chat_session['id'], cursor=cursor)
+        messages.extend(page)
+    return messages
+
+def reset_chat():
+    """Czyści bieżącą rozmowę - kolejne wiadomości trafią do nowej sesji w archiwum"""
+    st.session_state.chat_messages = []
+    st.session_state.chat_context = ""
+    st.session_state.chat_session_id = None
+    st.session_state.chat_saved_count = 0
 
 def load_data_from_db(force_reload=False):
     """Ładuje dane z bazy danych do sesji"""
@@ -62,25 +163,14 @@ def load_data_from_db(force_reload=False):
         return
     
     try:
-        # Pobierz tłumaczenia z bazy danych
-        translations = db.get_translations(limit=DEFAULT_HISTORY_LIMIT)
-        st.session_state.translation_history = translations
-        
-        # Pobierz poprawki i analizy z bazy danych
-        corrections = db.get_corrections(limit=DEFAULT_HISTORY_LIMIT)
-        st.session_state.correction_history = corrections
-        
-        # Pobierz sesje czatu z bazy danych
-        chat_sessions = db.get_chat_sessions(limit=DEFAULT_HISTORY_LIMIT)
-        st.session_state.chat_sessions_history = chat_sessions
-        
-        # Pobierz historię wskazówek z bazy danych
-        tips_history = db.get_learning_tips_history(limit=DEFAULT_HISTORY_LIMIT)
-        st.session_state.tips_history = tips_history
+        # Pobierz wszystkie typy historii jednym wywołaniem (pierwsza strona, starsze dociągane na żądanie)
+        snapshot = db.load_history_snapshot(limit=DEFAULT_HISTORY_LIMIT)
+        for history_type, items in snapshot.items():
+            set_history(history_type, items)
         
         st.session_state.db_loaded = True
         action = "Ponownie załadowano" if force_reload else "Załadowano"
-        log_debug(f"{action} {len(translations)} tłumaczeń, {len(corrections)} poprawek/analiz, {len(chat_sessions)} sesji czatu i {len(tips_history)} wskazówek z bazy danych")
+        log_debug(f"{action} {len(snapshot['translations'])} tłumaczeń, {len(snapshot['corrections'])} poprawek/analiz, {len(snapshot['chat_sessions'])} sesji czatu i {len(snapshot['tips_history'])} wskazówek z bazy danych")
     except Exception as e:
         log_error(f"Błąd podczas ładowania danych z bazy: {str(e)}")
 
@@ -89,25 +179,38 @@ def reload_data_from_db():
     from constants import DEFAULT_HISTORY_LIMIT
     
     try:
-        # ZAWSZE pobierz najnowsze dane z bazy danych
-        translations = db.get_translations(limit=DEFAULT_HISTORY_LIMIT)
-        st.session_state.translation_history = translations
-        
-        corrections = db.get_corrections(limit=DEFAULT_HISTORY_LIMIT)
-        st.session_state.correction_history = corrections
-        
-        chat_sessions = db.get_chat_sessions(limit=DEFAULT_HISTORY_LIMIT)
-        st.session_state.chat_sessions_history = chat_sessions
+        # ZAWSZE pobierz najnowsze dane z bazy danych (unieważnione typy jednym równoległym przebiegiem)
+        snapshot = db.load_history_snapshot(limit=DEFAULT_HISTORY_LIMIT)
+        for history_type, items in snapshot.items():
+            set_history(history_type, items)
         
-        tips_history = db.get_learning_tips_history(limit=DEFAULT_HISTORY_LIMIT)
-        st.session_state.tips_history = tips_history
-        
-        log_debug(f"Ponownie załadowano {len(translations)} tłumaczeń, {len(corrections)} poprawek/analiz, {len(chat_sessions)} sesji czatu i {len(tips_history)} wskazówek z bazy danych")
+        log_debug(f"Ponownie załadowano {len(snapshot['translations'])} tłumaczeń, {len(snapshot['corrections'])} poprawek/analiz, {len(snapshot['chat_sessions'])} sesji czatu i {len(snapshot['tips_history'])} wskazówek z bazy danych")
     except Exception as e:
         log_error(f"Błąd podczas ponownego ładowania danych z bazy: {str(e)}")
     
     # NIE wywołuj st.rerun() tutaj - to powoduje nieskończoną pętlę
 
+@cached(ttl=LLM_CACHE_TTL, namespace="llm", error_ttl=LLM_ERROR_CACHE_TTL)
+def _request_translation(text, target_language):
+    """Pyta model o tłumaczenie (ten sam tekst i język docelowy - wynik z cache)"""
+    response = client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": f"Jesteś ekspertem w tłumaczeniu tekstów. Tłumacz tekst z języka polskiego na {target_language}. Zwróć tylko przetłumaczony tekst, bez dodatkowych komentarzy."
+            },
+            {
+                "role": "user",
+                "content": f"Przetłumacz na {target_language}: {text}"
+            }
+        ],
+        max_tokens=OPENAI_MAX_TOKENS,
+        temperature=OPENAI_TEMPERATURE
+    )
+    report_load_cost(tokens=response_tokens(response))
+    return response.choices[0].message.content.strip()
+
 def translate_text(text, target_language="angielski"):
     """
     Funkcja do tłumaczenia tekstu z polskiego na wybrany język
@@ -126,22 +229,7 @@ def translate_text(text, target_language="angielski"):
     text = sanitize_text(text)
     
     try:
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Jesteś ekspertem w tłumaczeniu tekstów. Tłumacz tekst z języka polskiego na {target_language}. Zwróć tylko przetłumaczony tekst, bez dodatkowych komentarzy."
-                },
-                {
-                    "role": "user",
-                    "content": f"Przetłumacz na {target_language}: {text}"
-                }
-            ],
-            max_tokens=OPENAI_MAX_TOKENS,
-            temperature=OPENAI_TEMPERATURE
-        )
-        return response.choices[0].message.content.strip()
+        return _request_translation(text, target_language)
     except Exception as e:
         st.error(f"Błąd podczas tłumaczenia: {str(e)}")
         return None
@@ -264,6 +352,12 @@ def main():
         if st.button("🗑️ Wyczyść", key="clear_history", help="Wyczyść całą historię"):
             st.session_state.translation_history = []
             st.session_state.correction_history = []
+            st.session_state.older_history = {}
+            st.session_state.history_cursors = {}
+            st.session_state.history_boundaries = {}
+            # Kolejne wiadomości bieżącej rozmowy trafią do nowej sesji
+            st.session_state.chat_session_id = None
+            st.session_state.chat_saved_count = 0
             # Wyczyść również bazę danych
             if db.clear_all():
                 st.success("✅ Historia została wyczyszczona z pamięci i bazy danych!")
@@ -274,8 +368,26 @@ def main():
     stats = db.get_stats()
     st.sidebar.markdown("---")
     st.sidebar.markdown("**📊 Statystyki bazy danych:**")
-    st.sidebar.info(f"Status: {stats['status']}")
+    st.sidebar.info(f"Status: {stats['status']} ({stats.get('backend')})")
     st.sidebar.info(f"Liczba rekordów: {stats['total_points']}")
+    if stats.get('pending_writes'):
+        st.sidebar.info(f"Oczekujące zapisy: {stats['pending_writes']}")
+    if stats.get('mode_counts'):
+        with st.sidebar.expander("Szczegóły"):
+            history_labels = {
+                "translations": "Tłumaczenia",
+                "corrections": "Poprawki/analizy/ćwiczenia",
+                "chat_sessions": "Sesje czatu",
+                "tips_history": "Wskazówki"
+            }
+            for history_type, label in history_labels.items():
+                count = sum(stats['mode_counts'].get(history_mode, 0) for history_mode in HISTORY_MODES[history_type])
+                last_write = stats['last_writes'].get(history_type)
+                last_write_text = last_write.strftime('%d.%m.%Y %H:%M') if last_write else "-"
+                st.markdown(f"**{label}:** {count} (ostatni zapis: {last_write_text} UTC)")
+            if stats['language_counts']:
+                st.markdown("**Języki:** " + ", ".join(f"{language} ({count})" for language, count in stats['language_counts'].items()))
+            st.markdown(f"**Rozmiar danych:** {stats['payload_bytes'] / (1024 * 1024):.2f} MB")
     
 
     
@@ -399,6 +511,7 @@ def main():
                                         if db.delete_item(tip_item['id']):
                                             st.success("✅ Wskazówki usunięte z archiwum!")
                                             st.rerun()
+                        render_load_more_button("tips_history")
                     else:
                         st.info("📭 Brak zapisanych wskazówek w archiwum")
                     
@@ -577,6 +690,7 @@ def main():
                                             st.rerun()
                     else:
                         st.info("📭 Brak zapisanych ćwiczeń w archiwum")
+                    render_load_more_button("corrections", key_suffix="_exercises")
                     
                     if st.button("❌ Zamknij archiwum", key="close_exercise_archive"):
                         st.session_state.open_exercise_archive = False
@@ -683,9 +797,18 @@ def main():
                                         'timestamp': datetime.now()
                                     })
                                     
-                                    # Automatycznie zapisz sesję po każdej wiadomości
+                                    # Automatycznie zapisz sesję po każdej wiadomości (dopisywane są tylko nowe wiadomości)
                                     if len(st.session_state.chat_messages) >= 2:  # Co najmniej pytanie i odpowiedź
-                                        db.save_chat_session(st.session_state.chat_messages, target_language, context_info)
+                                        session_id = db.save_chat_session(
+                                            st.session_state.chat_messages,
+                                            target_language,
+                                            context_info,
+                                            session_id=st.session_state.chat_session_id,
+                                            saved_count=st.session_state.chat_saved_count
+                                        )
+                                        if session_id:
+                                            st.session_state.chat_session_id = session_id
+                                            st.session_state.chat_saved_count = len(st.session_state.chat_messages)
                                         # Odśwież dane z bazy danych
                                         reload_data_from_db()
                                     
@@ -709,15 +832,13 @@ def main():
             
             with col_clear:
                 if st.button("🗑️ Wyczyść", use_container_width=True, key="clear_chat"):
-                    st.session_state.chat_messages = []
-                    st.session_state.chat_context = ""
+                    reset_chat()
                     st.success("✅ Chat wyczyszczony!")
                     st.rerun()
             
             with col_new_chat:
                 if st.button("🆕 Nowy chat", use_container_width=True, key="new_chat"):
-                    st.session_state.chat_messages = []
-                    st.session_state.chat_context = ""
+                    reset_chat()
                     st.success("✅ Rozpoczęto nowy chat!")
                     st.rerun()
             
@@ -731,44 +852,43 @@ def main():
                         with st.expander(f"Sesja z {chat_session['timestamp'].strftime('%d.%m.%Y %H:%M')} - {chat_session['language']} ({chat_session['message_count']} wiadomości)"):
                             if chat_session.get('context'):
                                 st.info(f"**Kontekst:** {chat_session['context']}")
+                            if chat_session.get('title'):
+                                st.caption(f"{chat_session['title']} … {chat_session.get('last_message', '')}")
                             
-                            # Wyświetl wiadomości
-                            messages = chat_session['chat_text'].split('\n')
-                            for message in messages:
-                                if message.strip():
-                                    if message.startswith('user:'):
-                                        st.markdown(f"**👤 Ty:** {message[5:].strip()}")
-                                    elif message.startswith('assistant:'):
-                                        st.markdown(f"**🎓 Korepetytor:** {message[10:].strip()}")
+                            # Wiadomości pobierane z bazy dopiero na żądanie
+                            if st.checkbox("📜 Pokaż wiadomości", key=f"show_chat_messages_{chat_session['id']}_{i}"):
+                                for message in load_chat_messages(chat_session):
+                                    if message['role'] == 'user':
+                                        st.markdown(f"**👤 Ty:** {message['content']}")
+                                    else:
+                                        st.markdown(f"**🎓 Korepetytor:** {message['content']}")
                                     st.markdown("---")
                             
                             col_load_chat, col_delete_chat = st.columns([3, 1])
                             with col_load_chat:
                                 if st.button(f"💬 Wczytaj tę sesję", key=f"load_chat_session_{i}"):
                                     # Wczytaj wiadomości do aktualnego chatu
-                                    st.session_state.chat_messages = []
-                                    for message in messages:
-                                        if message.strip():
-                                            if message.startswith('user:'):
-                                                st.session_state.chat_messages.append({
-                                                    'role': 'user',
-                                                    'content': message[5:].strip(),
-                                                    'timestamp': chat_session['timestamp']
-                                                })
-                                            elif message.startswith('assistant:'):
-                                                st.session_state.chat_messages.append({
-                                                    'role': 'assistant',
-                                                    'content': message[10:].strip(),
-                                                    'timestamp': chat_session['timestamp']
-                                                })
+                                    st.session_state.chat_messages = load_chat_messages(chat_session)
                                     st.session_state.chat_context = chat_session.get('context', '')
+                                    if chat_session.get('chat_text'):
+                                        # Stara sesja - dalsza rozmowa zostanie zapisana jako nowa sesja
+                                        st.session_state.chat_session_id = None
+                                        st.session_state.chat_saved_count = 0
+                                    else:
+                                        # Dalsze wiadomości są dopisywane do tej samej sesji
+                                        st.session_state.chat_session_id = chat_session['id']
+                                        st.session_state.chat_saved_count = len(st.session_state.chat_messages)
                                     st.success("✅ Sesja wczytana!")
                                     st.rerun()
                             with col_delete_chat:
                                 if st.button(f"🗑️ Usuń", key=f"delete_chat_session_{i}"):
-                                    if db.delete_item(chat_session['id']):
+                                    if db.delete_chat_session(chat_session['id']):
+                                        if st.session_state.chat_session_id == chat_session['id']:
+                                            st.session_state.chat_session_id = None
+                                            st.session_state.chat_saved_count = 0
                                         st.success("✅ Sesja usunięta z archiwum!")
                                         st.rerun()
+                    render_load_more_button("chat_sessions")
                 else:
                     st.info("📭 Brak zapisanych sesji czatu w archiwum")
                 
@@ -1200,30 +1320,31 @@ def main():
                                     st.markdown(f"**Przetłumaczony ({item['target_language']}):**")
                                     st.write(item['output'])
                             
-                            # Wyświetl audio jeśli jest dostępne
-                            if 'audio_data' in item and item['audio_data']:
+                            # Wyświetl audio jeśli jest dostępne (dane pobierane dopiero po włączeniu odtwarzacza)
+                            if item.get('audio_ref'):
                                 st.markdown("**🔊 Audio:**")
                                 st.info(f"Głos: {item.get('voice', 'alloy')}")
                                 
-                                # Zapisz audio do pliku tymczasowego
-                                import tempfile
-                                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-                                    temp_file.write(item['audio_data'])
-                                    temp_file_path = temp_file.name
-                                
-                                # Wyświetl audio
-                                st.audio(temp_file_path, format="audio/wav")
-                                
-                                # Przycisk pobierania
-                                st.download_button(
-                                    label="📥 Pobierz audio",
-                                    data=item['audio_data'],
-                                    file_name=f"translation_{item['timestamp'].strftime('%Y%m%d_%H%M%S')}.wav",
-                                    mime="audio/wav",
-                                    key=f"download_history_{item['timestamp'].strftime('%Y%m%d_%H%M%S')}_{i}"
-                                )
+                                if st.checkbox("▶️ Pokaż odtwarzacz", key=f"show_audio_{item.get('id', i)}_{i}"):
+                                    audio_bytes = db.get_audio(item)
+                                    if audio_bytes:
+                                        # Wyświetl audio
+                                        st.audio(audio_bytes, format="audio/wav")
+                                        
+                                        # Przycisk pobierania
+                                        st.download_button(
+                                            label="📥 Pobierz audio",
+                                            data=audio_bytes,
+                                            file_name=f"translation_{item['timestamp'].strftime('%Y%m%d_%H%M%S')}.wav",
+                                            mime="audio/wav",
+                                            key=f"download_history_{item['timestamp'].strftime('%Y%m%d_%H%M%S')}_{i}"
+                                        )
+                                    else:
+                                        st.error("❌ Nie znaleziono pliku audio w magazynie")
                             else:
                                 st.info("🔇 Audio nie jest dostępne dla tego tłumaczenia")
+                
+                render_load_more_button("translations")
         
         elif "Poprawianie" in mode:
             # Historia poprawek - tylko w sekcji poprawek
@@ -1262,6 +1383,8 @@ def main():
                             
                             st.markdown("**Wyjaśnienie poprawek:**")
                             st.write(item['explanation'])
+                
+                render_load_more_button("corrections", key_suffix="_corrections")
         
         elif "Analiza" in mode:
             # Historia analiz - tylko w sekcji analiz
@@ -1327,6 +1450,8 @@ def main():
                                         st.write(f"• {tip}")
                             else:
                                 st.info("📊 Analiza nie jest dostępna dla tego wpisu")
+                
+                render_load_more_button("corrections", key_suffix="_analyses")
     
     # Historia jest teraz wyświetlana w każdej sekcji osobno
     
@@ -0,0 +1,215 @@
+"""
+Asynchroniczny wariant bazy danych Language Helper
+
+AsyncLanguageHelperDB jest nakładką na LanguageHelperDB z ograniczoną liczbą równoległych operacji
+w każdej pętli zdarzeń. Przy zdalnym Qdrant odczyty bez cache (strony historii, wiadomości czatu,
+wyszukiwanie) wykonywane są przez AsyncQdrantClient; pozostałe operacje - oraz wszystkie przy
+magazynach lokalnych (qdrant_local, sqlite) - w puli wątków. Zapis (kolejka w tle), cache
+(single-flight, stale-while-revalidate), migracje i statystyki są wspólne z wersją synchroniczną.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from dotenv import load_dotenv
+from constants import (
+    QDRANT_DEFAULT_COLLECTION, ASYNC_DB_MAX_CONCURRENCY, HISTORY_MODES, DEFAULT_HISTORY_LIMIT,
+    CHAT_MESSAGES_PAGE_SIZE, MAX_HISTORY_LIMIT
+)
+from logger_config import log_database_operation
+from storage_backends import create_async_backend
+from database import LanguageHelperDB, _decode_cursor
+
+# Ładowanie zmiennych środowiskowych
+load_dotenv()
+
+# Współdzielone bazy: kolekcja -> LanguageHelperDB (jedno połączenie i kolejka zapisów na proces,
+# niezależnie od pętli zdarzeń - operacje wykonywane są w wątkach)
+_shared_databases = {}
+_shared_databases_lock = threading.Lock()
+
+def get_shared_database(collection_name):
+    """
+    Zwraca bazę współdzieloną przez wszystkie instancje AsyncLanguageHelperDB w procesie
+    
+    Pierwsze wywołanie łączy się z magazynem i tworzy kolekcję (operacja blokująca).
+    
+    Args:
+        collection_name: Nazwa kolekcji
+    
+    Returns:
+        LanguageHelperDB: Synchroniczna baza danych
+    """
+    with _shared_databases_lock:
+        if collection_name not in _shared_databases:
+            _shared_databases[collection_name] = LanguageHelperDB(collection_name)
+        return _shared_databases[collection_name]
+
+def _delegate(name):
+    """Tworzy metodę asynchroniczną wykonującą metodę LanguageHelperDB o tej nazwie w puli wątków"""
+    @functools.wraps(getattr(LanguageHelperDB, name))
+    async def method(self, *args, **kwargs):
+        return await self._call(name, *args, **kwargs)
+    return method
+
+class AsyncLanguageHelperDB:
+    """Asynchroniczna baza danych z ograniczoną liczbą równoległych operacji"""
+    
+    def __init__(self, max_concurrency=ASYNC_DB_MAX_CONCURRENCY, collection_name=None):
+        """
+        Inicjalizuje bazę (połączenie tworzone przy pierwszym użyciu)
+        
+        Args:
+            max_concurrency: Maksymalna liczba równoległych operacji w jednej pętli zdarzeń
+            collection_name: Nazwa kolekcji (domyślnie z QDRANT_COLLECTION_NAME)
+        """
+        self.collection_name = collection_name or os.getenv("QDRANT_COLLECTION_NAME", QDRANT_DEFAULT_COLLECTION)
+        self.max_concurrency = max_concurrency
+        self.db = None
+        # Semafor jest związany z pętlą zdarzeń - osobny dla każdej pętli (np. kolejne st.rerun)
+        self._semaphores = weakref.WeakKeyDictionary()
+        # Klient asynchroniczny też jest związany z pętlą zdarzeń: pętla -> AsyncQdrantBackend lub None
+        self._async_backends = weakref.WeakKeyDictionary()
+    
+    async def initialize(self):
+        """
+        Łączy się ze współdzieloną bazą i tworzy kolekcję jeśli nie istnieje
+        
+        Returns:
+            bool: True jeśli połączenie z magazynem jest gotowe
+        """
+        if self.db is None:
+            try:
+                self.db = await asyncio.to_thread(get_shared_database, self.collection_name)
+            except Exception as e:
+                log_database_operation("Połączenie asynchroniczne", False, str(e))
+                return False
+        return self.db.backend is not None
+    
+    def _semaphore(self):
+        """Zwraca semafor limitu równoległych operacji dla bieżącej pętli zdarzeń"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+    
+    async def _call(self, name, *args, **kwargs):
+        """Wykonuje metodę LanguageHelperDB w puli wątków z limitem równoległych operacji"""
+        await self.initialize()
+        if self.db is None:
+            raise RuntimeError("Brak połączenia z bazą danych")
+        async with self._semaphore():
+            return await asyncio.to_thread(getattr(self.db, name), *args, **kwargs)
+    
+    async def _async_backend(self):
+        """
+        Zwraca magazyn asynchroniczny bieżącej pętli zdarzeń
+        
+        Returns:
+            AsyncQdrantBackend: Magazyn lub None - zapytania wykonywane wtedy w puli wątków
+        """
+        await self.initialize()
+        if self.db is None or self.db.backend is None:
+            return None
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_backends:
+            self._async_backends[loop] = create_async_backend(self.collection_name)
+        return self._async_backends[loop]
+    
+    async def _read(self, query, *args, **kwargs):
+        """Wykonuje zapytanie magazynu asynchronicznego po zapisie oczekujących punktów"""
+        # Odczyt musi widzieć własne zapisy - opróżnienie kolejki blokuje, więc w wątku
+        if self.db._writer.depth():
+            await asyncio.to_thread(self.db._writer.flush)
+        async with self._semaphore():
+            return await query(*args, **kwargs)
+    
+    save_translation = _delegate("save_translation")
+    save_correction = _delegate("save_correction")
+    save_chat_session = _delegate("save_chat_session")
+    save_learning_tips = _delegate("save_learning_tips")
+    
+    get_translations = _delegate("get_translations")
+    get_corrections = _delegate("get_corrections")
+    get_chat_sessions = _delegate("get_chat_sessions")
+    get_learning_tips_history = _delegate("get_learning_tips_history")
+    load_history_snapshot = _delegate("load_history_snapshot")
+    get_audio = _delegate("get_audio")
+    find_vocabulary = _delegate("find_vocabulary")
+    
+    async def get_history_page(self, history_type, page_size=DEFAULT_HISTORY_LIMIT, cursor=None, language=None):
+        """Pobiera jedną stronę historii (jak LanguageHelperDB.get_history_page)"""
+        backend = await self._async_backend()
+        if backend is None:
+            return await self._call("get_history_page", history_type, page_size, cursor, language)
+        
+        try:
+            start_from, exclude_ids = self.db._page_start(cursor)
+            points = await self._read(
+                backend.query, HISTORY_MODES[history_type], page_size + 1,
+                language=language, start_from=start_from, exclude_ids=exclude_ids
+            )
+            return self.db._history_page(history_type, points, page_size, cursor)
+        except Exception as e:
+            log_database_operation("Pobieranie strony historii", False, str(e))
+            return [], None
+    
+    async def get_chat_messages(self, session_id, page_size=CHAT_MESSAGES_PAGE_SIZE, cursor=None):
+        """Pobiera jedną stronę wiadomości sesji czatu (jak LanguageHelperDB.get_chat_messages)"""
+        backend = await self._async_backend()
+        if backend is None:
+            return await self._call("get_chat_messages", session_id, page_size, cursor)
+        
+        try:
+            after_seq = _decode_cursor(cursor)["seq"] if cursor else None
+            points = await self._read(backend.query_session, session_id, page_size + 1, after_seq)
+            return self.db._message_page(session_id, points, page_size)
+        except Exception as e:
+            log_database_operation("Pobieranie wiadomości czatu", False, str(e))
+            return [], None
+    
+    async def search_similar(self, text, mode, language=None, k=5):
+        """Wyszukuje wpisy historii podobne do tekstu (jak LanguageHelperDB.search_similar)"""
+        backend = await self._async_backend()
+        if backend is None:
+            return await self._call("search_similar", text, mode, language, k)
+        
+        try:
+            # Embedding liczony lokalnie (obciąża procesor) - w puli wątków
+            vector = await asyncio.to_thread(self.db.embedder.embed, text)
+            hits = await self._read(backend.search, vector, [mode], k, language)
+            return self.db._similar_items(mode, hits)
+        except Exception as e:
+            log_database_operation("Wyszukiwanie podobnych", False, str(e))
+            return []
+    
+    async def find_analyses(self, language=None, word=None, vocabulary_level=None, rule_name=None,
+                            grammar_level=None, limit=MAX_HISTORY_LIMIT):
+        """Wyszukuje analizy po słownictwie i regułach gramatycznych (jak LanguageHelperDB.find_analyses)"""
+        backend = await self._async_backend()
+        if backend is None:
+            return await self._call("find_analyses", language, word, vocabulary_level, rule_name, grammar_level, limit)
+        
+        try:
+            selector = self.db._analysis_selector(language, word, vocabulary_level, rule_name, grammar_level)
+            points = await self._read(backend.query_selected, selector, limit)
+            return [self.db._correction_from_point(point) for point in points]
+        except Exception as e:
+            log_database_operation("Wyszukiwanie analiz", False, str(e))
+            return []
+    
+    delete_item = _delegate("delete_item")
+    delete_chat_session = _delegate("delete_chat_session")
+    clear_all = _delegate("clear_all")
+    get_stats = _delegate("get_stats")
+    
+    async def close(self):
+        """Czeka na zapis punktów oczekujących w kolejce współdzielonej bazy i zamyka klienta asynchronicznego"""
+        if self.db is not None:
+            await asyncio.to_thread(self.db._writer.flush)
+        backend = self._async_backends.pop(asyncio.get_running_loop(), None)
+        if backend is not None:
+            await backend.close()
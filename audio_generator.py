@@ -4,6 +4,7 @@ import base64
 from pathlib import Path
 from openai_client import get_global_openai_client
 from logger_config import log_api_call, log_error, log_debug
+from constants import LANGUAGE_VOICE_MAPPING
 
 # Konfiguracja OpenAI
 client = get_global_openai_client()
@@ -90,20 +91,7 @@ def get_voice_for_language(language: str) -> str:
     """
     Zwraca odpowiedni głos dla danego języka
     """
-    voice_mapping = {
-        "angielski": "alloy",
-        "niemiecki": "onyx", 
-        "francuski": "nova",
-        "hiszpański": "echo",
-        "włoski": "fable",
-        "polski": "shimmer",
-        "rosyjski": "onyx",
-        "japoński": "nova",
-        "koreański": "shimmer",
-        "chiński": "alloy"
-    }
-    
-    return voice_mapping.get(language, "alloy")
+    return LANGUAGE_VOICE_MAPPING.get(language, "alloy")
 
 def save_audio_file(audio_data: bytes, filename: str = "audio.mp3") -> str:
     """
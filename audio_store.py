@@ -0,0 +1,126 @@
+"""
+Magazyn plików audio adresowany treścią (SHA-256) dla aplikacji Language Helper
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Union
+from dotenv import load_dotenv
+from constants import AUDIO_FORMAT, AUDIO_STORE_DEFAULT_DIR
+from logger_config import log_debug, log_error, log_info
+
+# Ładowanie zmiennych środowiskowych
+load_dotenv()
+
+class AudioStore:
+    """Przechowuje audio jako pliki na dysku, nazwane skrótem SHA-256 zawartości"""
+    
+    def __init__(self, base_dir: str):
+        """
+        Inicjalizuje magazyn audio
+        
+        Args:
+            base_dir: Katalog, w którym przechowywane są pliki audio
+        """
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        log_info(f"Magazyn audio zainicjalizowany: {self.base_dir}")
+    
+    def _path(self, digest: str, audio_format: str) -> Path:
+        """
+        Zwraca ścieżkę pliku dla skrótu (dwupoziomowy podział katalogów)
+        
+        Args:
+            digest: Skrót SHA-256 zawartości (hex)
+            audio_format: Rozszerzenie pliku audio
+        
+        Returns:
+            Path: Ścieżka do pliku
+        """
+        return self.base_dir / digest[:2] / digest[2:4] / f"{digest}.{audio_format}"
+    
+    def put(self, audio_data: bytes, audio_format: str = AUDIO_FORMAT) -> Dict[str, Union[str, int]]:
+        """
+        Zapisuje audio w magazynie (identyczna zawartość zapisywana jest tylko raz)
+        
+        Args:
+            audio_data: Dane audio
+            audio_format: Format audio
+        
+        Returns:
+            Dict: Referencja do audio (skrót, rozmiar, format) do zapisania w payloadzie
+        """
+        digest = hashlib.sha256(audio_data).hexdigest()
+        path = self._path(digest, audio_format)
+        
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Zapis atomowy: plik tymczasowy w tym samym katalogu, potem zamiana nazwy
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as temp_file:
+                    temp_file.write(audio_data)
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            log_debug(f"Audio store put: {digest} ({len(audio_data)} B)")
+        
+        return {
+            "audio_sha256": digest,
+            "audio_size": len(audio_data),
+            "audio_format": audio_format
+        }
+    
+    def get(self, digest: str, audio_format: str = AUDIO_FORMAT) -> Optional[bytes]:
+        """
+        Odczytuje audio z magazynu
+        
+        Args:
+            digest: Skrót SHA-256 zawartości
+            audio_format: Format audio
+        
+        Returns:
+            bytes: Dane audio lub None jeśli plik nie istnieje
+        """
+        path = self._path(digest, audio_format)
+        
+        try:
+            # Dane zwracane jako bytes (np. do st.audio) - odczyt pliku w całości
+            return path.read_bytes()
+        except FileNotFoundError:
+            log_error(f"Brak pliku audio w magazynie: {digest}")
+            return None
+    
+    def exists(self, digest: str, audio_format: str = AUDIO_FORMAT) -> bool:
+        """Sprawdza czy audio o podanym skrócie jest w magazynie"""
+        return self._path(digest, audio_format).exists()
+    
+    def size(self, digest: str, audio_format: str = AUDIO_FORMAT) -> Optional[int]:
+        """Zwraca rozmiar pliku audio w bajtach lub None jeśli go nie ma"""
+        path = self._path(digest, audio_format)
+        return path.stat().st_size if path.exists() else None
+    
+    def delete(self, digest: str, audio_format: str = AUDIO_FORMAT) -> bool:
+        """
+        Usuwa audio z magazynu
+        
+        Args:
+            digest: Skrót SHA-256 zawartości
+            audio_format: Format audio
+        
+        Returns:
+            bool: True jeśli plik został usunięty
+        """
+        path = self._path(digest, audio_format)
+        if path.exists():
+            path.unlink()
+            log_debug(f"Audio store delete: {digest}")
+            return True
+        return False
+
+# Globalny magazyn audio
+audio_store = AudioStore(base_dir=os.getenv("AUDIO_STORE_DIR", AUDIO_STORE_DEFAULT_DIR))
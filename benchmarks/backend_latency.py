@@ -0,0 +1,57 @@
+"""
+Benchmark opóźnienia zapisu i odczytu dla każdego magazynu danych
+
+Uruchomienie (zdalny Qdrant tylko gdy podano go w --backends i ustawiono QDRANT_URL):
+    python -m benchmarks.backend_latency --points 5000
+    python -m benchmarks.backend_latency --backends qdrant qdrant_local sqlite
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from constants import HISTORY_MODES, DEFAULT_HISTORY_LIMIT
+from storage_backends import create_backend
+from benchmarks.common import timed, synthetic_points, fill_backend, print_report
+
+def measure_backend(backend_type, points, repeats):
+    """Mierzy zapis pojedynczego punktu, zapis partii i odczyt najnowszej strony historii"""
+    os.environ["STORAGE_BACKEND"] = backend_type
+    backend = create_backend("benchmark_backend_latency")
+    backend.ensure_schema()
+    backend.clear()
+    
+    started = time.perf_counter()
+    fill_backend(backend, points)
+    batch_ms = (time.perf_counter() - started) * 1000
+    
+    single_points = iter(synthetic_points(repeats, seed=1))
+    save = timed(lambda: backend.upsert([next(single_points)]), repeats)
+    load = timed(lambda: backend.query(HISTORY_MODES["translations"], DEFAULT_HISTORY_LIMIT), repeats)
+    backend.clear()
+    
+    return {
+        "backend": backend_type,
+        "save_one_ms": save["median_ms"],
+        "save_batched_ms_per_1k": round(batch_ms / points * 1000, 1),
+        "load_page_ms": load["median_ms"]
+    }
+
+def main():
+    """Punkt wejścia CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark zapisu i odczytu dla magazynów danych")
+    parser.add_argument("--backends", nargs="+", default=["qdrant_local", "sqlite"],
+                        help="typy magazynów (qdrant, qdrant_local, sqlite)")
+    parser.add_argument("--points", type=int, default=5000, help="liczba punktów w kolekcji")
+    parser.add_argument("--repeats", type=int, default=20, help="liczba powtórzeń pomiaru")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.environ.setdefault("SQLITE_PATH", os.path.join(temp_dir, "benchmark.db"))
+        os.environ.setdefault("QDRANT_LOCAL_PATH", ":memory:")
+        rows = [measure_backend(backend_type, args.points, args.repeats) for backend_type in args.backends]
+    
+    print_report(f"Opóźnienie zapisu i odczytu ({args.points} punktów)", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark pierwszej odpowiedzi po restarcie: pusty cache a cache wczytany ze snapshotu
+
+Restart symulowany jest zastąpieniem globalnego cache nowym, pustym CacheManager (te same
+limity) z magazynem L2 w katalogu tymczasowym - skonfigurowany cache współdzielony nie jest
+czyszczony. Pusty cache startuje z pustym L2; start ze snapshotu - z L2 z chwili zapisu
+snapshotu (jak restart jednej repliki), bo wersje wpisów snapshotu są sprawdzane w L2.
+Pierwsza odpowiedź to historia wszystkich typów (load_history_snapshot) i jedno zapytanie
+do modelu (@cached, przestrzeń nazw "llm") z opóźnieniem --llm-latency.
+
+Uruchomienie (magazyn wg STORAGE_BACKEND):
+    python -m benchmarks.cache_restart --points 20000
+    STORAGE_BACKEND=sqlite python -m benchmarks.cache_restart --llm-latency 0.8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import cache_manager as cache_module
+from cache_manager import CacheManager, cached
+from cache_backends import SQLiteCacheBackend
+from database import LanguageHelperDB
+from benchmarks.common import timed, fill_backend, print_report
+
+# Opóźnienie symulowanego zapytania do modelu (sekundy) - ustawiane z linii poleceń
+llm_latency = 0.0
+
+@cached(ttl=3600, namespace="llm")
+def simulated_llm_call(text):
+    """Symulowane zapytanie do modelu (odpowiedź po llm_latency sekundach)"""
+    time.sleep(llm_latency)
+    return text.upper()
+
+def restart_cache(configured, backend):
+    """Zastępuje globalny cache nowym, pustym (limity jak w configured) z podanym magazynem L2"""
+    cache_module.cache_manager = CacheManager(
+        default_ttl=configured.default_ttl,
+        max_entries=configured.max_entries,
+        max_bytes=configured.max_bytes,
+        namespace_budgets=configured.namespace_budgets,
+        backend=backend,
+        eviction_policy=configured.eviction_policy
+    )
+    return cache_module.cache_manager
+
+def first_response(db):
+    """Pierwsza odpowiedź po starcie: historia wszystkich typów i jedna odpowiedź modelu"""
+    db.load_history_snapshot()
+    return simulated_llm_call("wie geht es dir?")
+
+def main():
+    """Punkt wejścia CLI"""
+    global llm_latency
+    parser = argparse.ArgumentParser(description="Benchmark pierwszej odpowiedzi po restarcie (z i bez snapshotu)")
+    parser.add_argument("--points", type=int, default=20_000, help="liczba punktów w kolekcji")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="opóźnienie zapytania do modelu (s)")
+    parser.add_argument("--repeats", type=int, default=5, help="liczba powtórzeń pomiaru")
+    parser.add_argument("--collection", default="benchmark_cache_restart", help="nazwa kolekcji testowej")
+    args = parser.parse_args()
+    llm_latency = args.llm_latency
+    
+    db = LanguageHelperDB(args.collection)
+    db.backend.clear()
+    fill_backend(db.backend, args.points)
+    
+    configured = cache_module.cache_manager
+    with tempfile.TemporaryDirectory() as temp_dir:
+        snapshot_path = os.path.join(temp_dir, "cache.snapshot")
+        cold_backend = SQLiteCacheBackend(os.path.join(temp_dir, "cold_l2.db"))
+        warm_backend = SQLiteCacheBackend(os.path.join(temp_dir, "warm_l2.db"))
+        try:
+            restart_cache(configured, warm_backend)
+            first_response(db)
+            entries = cache_module.cache_manager.save_snapshot(snapshot_path)
+            
+            def cold_start():
+                cold_backend.clear()
+                restart_cache(configured, cold_backend)
+                return first_response(db)
+            
+            def warm_start():
+                restart_cache(configured, warm_backend).load_snapshot(snapshot_path)
+                return first_response(db)
+            
+            def snapshot_load_only():
+                return restart_cache(configured, warm_backend).load_snapshot(snapshot_path)
+            
+            cold = timed(cold_start, args.repeats)
+            warm = timed(warm_start, args.repeats)
+            load = timed(snapshot_load_only, args.repeats)
+            snapshot_kb = round(os.path.getsize(snapshot_path) / 1024, 1)
+        finally:
+            cache_module.cache_manager = configured
+    
+    print_report(f"Pierwsza odpowiedź po restarcie ({args.points} punktów, {db.backend.name})", [
+        {"start": "pusty cache", "first_response_ms": cold["median_ms"], "snapshot_load_ms": "-", "snapshot_kb": "-"},
+        {"start": f"snapshot ({entries} wpisów)", "first_response_ms": warm["median_ms"],
+         "snapshot_load_ms": load["median_ms"], "snapshot_kb": snapshot_kb}
+    ])
+    db.backend.clear()
+
+if __name__ == "__main__":
+    main()
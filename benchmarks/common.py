@@ -0,0 +1,102 @@
+"""
+Wspólne narzędzia benchmarków Language Helper (syntetyczna historia, pomiar czasu)
+"""
+
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from qdrant_client.models import PointStruct
+from constants import QDRANT_VECTOR_SIZE, QDRANT_TIMESTAMP_FIELD, LANGUAGE_VOICE_MAPPING
+
+# Rozkład trybów w syntetycznej historii (tryb -> waga)
+SYNTHETIC_MODES = {
+    "translation": 40,
+    "correction": 25,
+    "analysis": 15,
+    "exercise": 5,
+    "chat_session": 3,
+    "chat_message": 10,
+    "learning_tips": 5
+}
+
+def timed(operation, repeats=5):
+    """
+    Mierzy czas wykonania operacji
+    
+    Args:
+        operation: Funkcja bez argumentów
+        repeats: Liczba powtórzeń
+    
+    Returns:
+        dict: Mediana i minimum w milisekundach oraz wynik ostatniego wywołania
+    """
+    durations, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = operation()
+        durations.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(durations), 3), "min_ms": round(min(durations), 3), "result": result}
+
+def synthetic_payload(mode, index, rng, text_length=80):
+    """Buduje payload punktu historii danego trybu (bez kompresji)"""
+    now = datetime.now(timezone.utc) - timedelta(seconds=index)
+    language = rng.choice(list(LANGUAGE_VOICE_MAPPING))
+    text = " ".join(rng.choice(["the", "house", "is", "big", "and", "very", "old", "we", "live", "there"])
+                    for _ in range(max(text_length // 5, 1)))
+    payload = {
+        "timestamp": now.replace(tzinfo=None).isoformat(),
+        QDRANT_TIMESTAMP_FIELD: now.timestamp(),
+        "mode": mode,
+        "input_text": text,
+        "output_text": text
+    }
+    if mode == "translation":
+        payload.update({"target_language": language, "voice": "alloy", "has_audio": False})
+    else:
+        payload["language"] = language
+    if mode == "correction":
+        payload["explanation"] = text
+    elif mode == "chat_session":
+        payload.update({"title": text[:40], "last_message": text, "message_count": 2})
+    elif mode == "chat_message":
+        payload.update({"role": "user", "content": text})
+    elif mode == "learning_tips":
+        payload.update({"tips_text": text, "tips_count": 1})
+    return payload
+
+def synthetic_points(count, seed=0, text_length=80):
+    """
+    Generuje punkty syntetycznej historii (tryby wg SYNTHETIC_MODES, malejący czas)
+    
+    Wszystkie punkty współdzielą jeden wektor - benchmarki nie mierzą wyszukiwania.
+    """
+    rng = random.Random(seed)
+    modes = rng.choices(list(SYNTHETIC_MODES), weights=list(SYNTHETIC_MODES.values()), k=count)
+    vector = [1.0 / QDRANT_VECTOR_SIZE ** 0.5] * QDRANT_VECTOR_SIZE
+    for index, mode in enumerate(modes):
+        yield PointStruct(id=str(uuid.UUID(int=rng.getrandbits(128))), vector=vector,
+                          payload=synthetic_payload(mode, index, rng, text_length))
+
+def fill_backend(backend, count, batch_size=1000, seed=0, text_length=80):
+    """Zapisuje syntetyczną historię do magazynu partiami"""
+    batch = []
+    for point in synthetic_points(count, seed, text_length):
+        batch.append(point)
+        if len(batch) >= batch_size:
+            backend.upsert(batch)
+            batch = []
+    if batch:
+        backend.upsert(batch)
+
+def print_report(title, rows):
+    """Wypisuje tabelę wyników (lista słowników o tych samych kluczach)"""
+    print(f"\n{title}")
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in columns))
@@ -0,0 +1,100 @@
+"""
+Benchmark polityk usuwania wpisów cache: odtworzenie śladu odczytów przy limicie pamięci
+
+Każda pozycja śladu to odczyt klucza; przy braku wpisu wartość jest "ładowana" (zapis z kosztem
+odtworzenia). Porównywane są: LRU, GDSF dla całego cache oraz LRU z osobnym limitem pamięci
+przestrzeni nazw "llm" - z LRU lub GDSF w tej przestrzeni. Wynik: odsetek trafień i łączny koszt
+ponownych ładowań (sekundy).
+
+Domyślnie ślad jest syntetyczny (popularność wg rozkładu Zipfa): tanie i duże listy historii,
+drogie odpowiedzi modelu, tanie małe wyniki @cached. Własny ślad - plik JSONL z polami
+key, size (bajty) i cost (sekundy):
+    python -m benchmarks.eviction_replay --requests 200000 --max-mb 8
+    python -m benchmarks.eviction_replay --trace trace.jsonl --max-mb 64
+"""
+
+import argparse
+import json
+import random
+from cache_manager import CacheManager
+from benchmarks.common import print_report
+
+# Przestrzeń nazw -> (liczba kluczy, udział w odczytach, rozmiar w bajtach, koszt w sekundach)
+SYNTHETIC_NAMESPACES = {
+    "history": (40, 0.30, (40_000, 120_000), (0.02, 0.08)),
+    "llm": (5_000, 0.40, (2_000, 8_000), (1.0, 6.0)),
+    "memo": (20_000, 0.30, (200, 2_000), (0.001, 0.01))
+}
+
+def synthetic_trace(requests, seed=0, zipf_s=1.1):
+    """Generuje ślad odczytów (klucz, rozmiar, koszt) - klucze każdej przestrzeni wg rozkładu Zipfa"""
+    rng = random.Random(seed)
+    catalog = {}
+    for namespace, (keys, _, size_range, cost_range) in SYNTHETIC_NAMESPACES.items():
+        weights = [1 / (rank + 1) ** zipf_s for rank in range(keys)]
+        entries = [(f"{namespace}:{rank}", rng.randint(*size_range), rng.uniform(*cost_range)) for rank in range(keys)]
+        catalog[namespace] = (entries, weights)
+    
+    namespaces = list(SYNTHETIC_NAMESPACES)
+    shares = [SYNTHETIC_NAMESPACES[namespace][1] for namespace in namespaces]
+    for namespace in rng.choices(namespaces, weights=shares, k=requests):
+        entries, weights = catalog[namespace]
+        yield rng.choices(entries, weights=weights)[0]
+
+def file_trace(path):
+    """Czyta ślad z pliku JSONL (key, size, cost)"""
+    with open(path, encoding="utf-8") as trace_file:
+        for line in trace_file:
+            if line.strip():
+                record = json.loads(line)
+                yield record["key"], record["size"], record["cost"]
+
+def replay(trace, max_bytes, eviction_policy="lru", namespace_budgets=None):
+    """Odtwarza ślad na CacheManager i zwraca trafienia, braki i koszt ponownych ładowań"""
+    manager = CacheManager(default_ttl=10 ** 9, max_bytes=max_bytes, namespace_budgets=namespace_budgets,
+                           eviction_policy=eviction_policy)
+    hits = misses = 0
+    miss_cost = 0.0
+    for key, size, cost in trace:
+        if manager.get(key) is not None:
+            hits += 1
+            continue
+        misses += 1
+        miss_cost += cost
+        manager.set(key, "x" * size, cost=cost)
+    return {"hits": hits, "misses": misses, "miss_cost": miss_cost, "evictions": sum(manager.evictions.values())}
+
+def main():
+    """Punkt wejścia CLI"""
+    parser = argparse.ArgumentParser(description="Odtworzenie śladu odczytów cache dla polityk LRU i GDSF")
+    parser.add_argument("--trace", help="plik JSONL z polami key, size, cost (domyślnie ślad syntetyczny)")
+    parser.add_argument("--requests", type=int, default=100_000, help="liczba odczytów śladu syntetycznego")
+    parser.add_argument("--max-mb", type=float, default=8, help="limit pamięci cache (MB)")
+    parser.add_argument("--llm-share", type=float, default=0.25, help="część limitu pamięci dla przestrzeni llm")
+    parser.add_argument("--seed", type=int, default=0, help="ziarno śladu syntetycznego")
+    args = parser.parse_args()
+    
+    trace = list(file_trace(args.trace) if args.trace else synthetic_trace(args.requests, args.seed))
+    max_bytes = int(args.max_mb * 1024 * 1024)
+    llm_bytes = int(max_bytes * args.llm_share)
+    variants = {
+        "lru": {"eviction_policy": "lru"},
+        "gdsf": {"eviction_policy": "gdsf"},
+        "lru, limit llm": {"namespace_budgets": {"llm": {"max_bytes": llm_bytes}}},
+        "lru + gdsf (llm), limit llm": {"namespace_budgets": {"llm": {"max_bytes": llm_bytes, "eviction_policy": "gdsf"}}}
+    }
+    
+    rows = []
+    for name, options in variants.items():
+        result = replay(trace, max_bytes, **options)
+        rows.append({
+            "policy": name,
+            "hit_ratio": round(result["hits"] / len(trace), 3),
+            "miss_cost_s": round(result["miss_cost"], 1),
+            "evictions": result["evictions"]
+        })
+    
+    print_report(f"Odtworzenie {len(trace)} odczytów (limit {args.max_mb} MB)", rows)
+
+if __name__ == "__main__":
+    main()
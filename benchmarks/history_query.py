@@ -0,0 +1,54 @@
+"""
+Benchmark odczytu historii: przewinięcie całej kolekcji z filtrem w Pythonie
+a zapytanie filtrowane i sortowane w magazynie (indeksy payloadu)
+
+Uruchomienie (magazyn wg STORAGE_BACKEND, domyślnie zdalny Qdrant):
+    python -m benchmarks.history_query --points 100000
+    STORAGE_BACKEND=qdrant_local python -m benchmarks.history_query --points 20000
+"""
+
+import argparse
+from constants import HISTORY_MODES, MAX_HISTORY_LIMIT, QDRANT_TIMESTAMP_FIELD, DEFAULT_HISTORY_LIMIT
+from storage_backends import create_backend
+from benchmarks.common import timed, fill_backend, print_report
+
+def scroll_then_filter(backend, modes, limit):
+    """Dawny odczyt: wszystkie punkty bez filtra, wybór trybu i sortowanie w Pythonie"""
+    matching = [
+        point for point in backend.iter_points(batch_size=MAX_HISTORY_LIMIT * 10)
+        if point.payload.get("mode") in modes
+    ]
+    matching.sort(key=lambda point: point.payload[QDRANT_TIMESTAMP_FIELD], reverse=True)
+    return matching[:limit]
+
+def main():
+    """Punkt wejścia CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark odczytu historii (filtr w Pythonie vs indeksy)")
+    parser.add_argument("--points", type=int, default=100_000, help="liczba punktów w kolekcji")
+    parser.add_argument("--repeats", type=int, default=5, help="liczba powtórzeń pomiaru")
+    parser.add_argument("--collection", default="benchmark_history_query", help="nazwa kolekcji testowej")
+    args = parser.parse_args()
+    
+    backend = create_backend(args.collection)
+    backend.ensure_schema()
+    backend.clear()
+    fill_backend(backend, args.points)
+    
+    rows = []
+    for history_type, modes in HISTORY_MODES.items():
+        before = timed(lambda: scroll_then_filter(backend, modes, DEFAULT_HISTORY_LIMIT), args.repeats)
+        after = timed(lambda: backend.query(modes, DEFAULT_HISTORY_LIMIT), args.repeats)
+        # Oba odczyty muszą zwracać te same punkty
+        assert [point.id for point in before["result"]] == [point.id for point in after["result"]]
+        rows.append({
+            "history_type": history_type,
+            "scroll_filter_ms": before["median_ms"],
+            "indexed_query_ms": after["median_ms"],
+            "speedup": round(before["median_ms"] / max(after["median_ms"], 1e-6), 1)
+        })
+    
+    print_report(f"Odczyt {DEFAULT_HISTORY_LIMIT} najnowszych punktów ({args.points} punktów, {backend.name})", rows)
+    backend.clear()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark konwersji punktów historii: dawne słowniki z SimpleNamespace budowane od razu
+a rekordy __slots__ z leniwym dekodowaniem analizy
+
+Dla 1000 analiz mierzy czas konwersji i pamięć zajętą przez wynik (liczba bloków i KB
+wg tracemalloc) - przy samym wyświetleniu listy oraz po odczycie wszystkich analiz.
+
+Uruchomienie (bez magazynu - punkty budowane w pamięci):
+    python -m benchmarks.history_records --records 1000
+"""
+
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+import uuid
+from types import SimpleNamespace
+from database import HistoryRecords, _parse_timestamp
+from storage_backends import StoredPoint
+from benchmarks.common import timed, synthetic_payload, print_report
+
+def analysis_points(count, seed=0, vocabulary_size=15, rules_size=5):
+    """Buduje punkty analiz: dawny format (JSON w analysis_data) i natywny (listy w payloadzie)"""
+    rng = random.Random(seed)
+    legacy, native = [], []
+    for index in range(count):
+        payload = synthetic_payload("analysis", index, rng)
+        analysis = {
+            "vocabulary_items": [
+                {"word": f"word{item}", "translation": f"słowo{item}", "part_of_speech": "noun",
+                 "example_sentence": payload["input_text"], "difficulty_level": "B1"}
+                for item in range(vocabulary_size)
+            ],
+            "grammar_rules": [
+                {"rule_name": f"rule{item}", "explanation": payload["input_text"],
+                 "examples": [payload["input_text"]], "difficulty_level": "B1"}
+                for item in range(rules_size)
+            ],
+            "learning_tips": ["tip"] * 3
+        }
+        point_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        legacy.append(StoredPoint(id=point_id, payload={**payload, "analysis_data": json.dumps(analysis)}))
+        native.append(StoredPoint(id=point_id, payload={**payload, **analysis}))
+    return legacy, native
+
+def eager_item(point):
+    """Dawna konwersja: słownik, JSON analizy dekodowany od razu do obiektów SimpleNamespace"""
+    payload = point.payload
+    item = {
+        "id": point.id,
+        "timestamp": _parse_timestamp(payload["timestamp"]),
+        "input": payload["input_text"],
+        "output": payload["output_text"],
+        "language": payload["language"],
+        "mode": payload["mode"]
+    }
+    analysis_dict = json.loads(payload["analysis_data"])
+    item["analysis"] = SimpleNamespace(
+        vocabulary_items=[SimpleNamespace(**vocab) for vocab in analysis_dict.get("vocabulary_items", [])],
+        grammar_rules=[SimpleNamespace(**rule) for rule in analysis_dict.get("grammar_rules", [])],
+        learning_tips=analysis_dict.get("learning_tips", [])
+    )
+    return item
+
+def read_analyses(items):
+    """Odczytuje analizę każdego elementu (jak widok szczegółów)"""
+    for item in items:
+        analysis = item["analysis"]
+        for vocab in analysis.vocabulary_items:
+            vocab.word
+    return items
+
+def retained_memory(build):
+    """Zwraca liczbę bloków i KB pamięci zajętej przez wynik build() (tracemalloc)"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    kilobytes = round(sum(stat.size_diff for stat in stats) / 1024, 1)
+    del result
+    return blocks, kilobytes
+
+def timed_without_gc(operation, repeats):
+    """Mierzy czas jak timeit - z wyłączonym GC, który inaczej losowo dolicza zbieranie śmieci"""
+    gc.collect()
+    gc.disable()
+    try:
+        return timed(operation, repeats)["median_ms"]
+    finally:
+        gc.enable()
+
+def main():
+    """Punkt wejścia CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark konwersji historii (słowniki vs rekordy __slots__)")
+    parser.add_argument("--records", type=int, default=1000, help="liczba analiz")
+    parser.add_argument("--repeats", type=int, default=5, help="liczba powtórzeń pomiaru")
+    args = parser.parse_args()
+    
+    legacy, native = analysis_points(args.records)
+    records = HistoryRecords()
+    variants = {
+        "eager_dict (przed)": (legacy, eager_item),
+        "lazy_record_json": (legacy, records._correction_from_point),
+        "lazy_record_native": (native, records._correction_from_point)
+    }
+    
+    rows = []
+    per_thousand = 1000 / args.records
+    for name, (points, convert) in variants.items():
+        list_view = lambda: [convert(point) for point in points]
+        details_view = lambda: read_analyses([convert(point) for point in points])
+        list_blocks, list_kb = retained_memory(list_view)
+        details_blocks, details_kb = retained_memory(details_view)
+        rows.append({
+            "variant": name,
+            "list_ms_per_1k": round(timed_without_gc(list_view, args.repeats) * per_thousand, 2),
+            "list_blocks_per_1k": int(list_blocks * per_thousand),
+            "list_kb_per_1k": round(list_kb * per_thousand, 1),
+            "details_ms_per_1k": round(timed_without_gc(details_view, args.repeats) * per_thousand, 2),
+            "details_blocks_per_1k": int(details_blocks * per_thousand),
+            "details_kb_per_1k": round(details_kb * per_thousand, 1)
+        })
+    
+    print_report(f"Konwersja {args.records} analiz (lista historii / odczyt wszystkich analiz)", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark kompresji dużych pól payloadu: rozmiar kolekcji i czas przewijania
+bez kompresji oraz z każdym dostępnym kodekiem
+
+Uruchomienie (magazyn wg STORAGE_BACKEND):
+    python -m benchmarks.payload_compression --points 5000
+    STORAGE_BACKEND=sqlite python -m benchmarks.payload_compression --codecs none zlib zstd
+"""
+
+import argparse
+import json
+import os
+from constants import HISTORY_MODES, MAX_HISTORY_LIMIT, PAYLOAD_COMPRESSION_FIELDS
+from storage_backends import create_backend
+from payload_codec import compress_payload, decompress_value, zstandard
+from benchmarks.common import timed, synthetic_points, print_report
+
+def large_field_points(count, text_length):
+    """Punkty syntetycznej historii z dużymi polami (JSON analizy, treść wiadomości, wyjaśnienie)"""
+    for point in synthetic_points(count, text_length=text_length):
+        payload = point.payload
+        if payload["mode"] == "analysis":
+            payload["analysis_data"] = json.dumps({
+                "vocabulary_items": [{"word": word, "example_sentence": payload["input_text"]}
+                                     for word in payload["input_text"].split()[:20]],
+                "learning_tips": [payload["input_text"]]
+            })
+        elif payload["mode"] == "chat_message":
+            payload["content"] = payload["input_text"]
+        yield point
+
+def read_all(backend):
+    """Przewija całą kolekcję i dekompresuje duże pola (jak eksport lub kompaktowanie)"""
+    read = 0
+    for point in backend.iter_points(batch_size=MAX_HISTORY_LIMIT * 10):
+        for field_name in PAYLOAD_COMPRESSION_FIELDS:
+            if field_name in point.payload:
+                decompress_value(point.payload[field_name])
+        read += 1
+    return read
+
+def measure_codec(codec, points, text_length, repeats, collection):
+    """Zapisuje kolekcję z danym kodekiem i mierzy jej rozmiar oraz czas odczytu"""
+    os.environ["PAYLOAD_COMPRESSION"] = codec
+    backend = create_backend(collection)
+    backend.ensure_schema()
+    backend.clear()
+    
+    batch = []
+    for point in large_field_points(points, text_length):
+        compress_payload(point.payload)
+        batch.append(point)
+        if len(batch) >= 1000:
+            backend.upsert(batch)
+            batch = []
+    if batch:
+        backend.upsert(batch)
+    
+    page = timed(lambda: backend.query(HISTORY_MODES["corrections"], MAX_HISTORY_LIMIT), repeats)
+    scroll = timed(lambda: read_all(backend), repeats)
+    row = {
+        "codec": codec,
+        "payload_mb": round(backend.payload_bytes() / 1024 / 1024, 2),
+        "history_page_ms": page["median_ms"],
+        "full_scroll_ms": scroll["median_ms"]
+    }
+    backend.clear()
+    return row
+
+def main():
+    """Punkt wejścia CLI"""
+    available = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+    parser = argparse.ArgumentParser(description="Benchmark kompresji dużych pól payloadu")
+    parser.add_argument("--codecs", nargs="+", default=available, help="kodeki (none, zlib, zstd)")
+    parser.add_argument("--points", type=int, default=5000, help="liczba punktów w kolekcji")
+    parser.add_argument("--text-length", type=int, default=4000, help="przybliżona długość dużych pól (znaki)")
+    parser.add_argument("--repeats", type=int, default=3, help="liczba powtórzeń pomiaru")
+    parser.add_argument("--collection", default="benchmark_payload_compression", help="nazwa kolekcji testowej")
+    args = parser.parse_args()
+    
+    rows = [measure_codec(codec, args.points, args.text_length, args.repeats, args.collection) for codec in args.codecs]
+    
+    backend_type = os.getenv("STORAGE_BACKEND", "qdrant")
+    print_report(f"Kompresja pól payloadu ({args.points} punktów, {backend_type})", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Współdzielone magazyny cache (L2) dla CacheManager - wspólne dla wielu procesów aplikacji
+
+Dostępne implementacje (wybór przez zmienną środowiskową CACHE_BACKEND):
+- memory  - brak magazynu współdzielonego, tylko cache w pamięci procesu (domyślnie)
+- sqlite  - plik SQLite na tym samym hoście (np. wiele replik Streamlit)
+
+Każdy klucz ma numer wersji zmieniany przy każdym zapisie i usunięciu. Cache w pamięci
+procesu (L1) pamięta wersję wpisu i porównuje ją z magazynem przy odczycie, więc zapis
+lub unieważnienie w jednym procesie unieważnia wpis we wszystkich pozostałych.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+from dotenv import load_dotenv
+from constants import CACHE_SQLITE_DEFAULT_PATH, CACHE_SQLITE_PURGE_EVERY
+from logger_config import log_debug
+
+# Ładowanie zmiennych środowiskowych
+load_dotenv()
+
+class CacheBackend:
+    """Interfejs współdzielonego magazynu cache (wartości z wersją i terminem wygaśnięcia)"""
+    
+    name = "base"
+    
+    def version(self, key: str) -> int:
+        """Zwraca bieżącą wersję klucza (0 jeśli klucz nie ma wpisu - nie był zapisany lub go usunięto)"""
+        raise NotImplementedError
+    
+    def get(self, key: str) -> Optional[Tuple[Any, int, float, float]]:
+        """
+        Pobiera wpis
+        
+        Returns:
+            (wartość, wersja, pozostały czas świeżości, pozostały czas życia) w sekundach
+            lub None jeśli brak/wygasł
+        """
+        raise NotImplementedError
+    
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0) -> int:
+        """
+        Zapisuje wpis jako nową wersję klucza (świeży przez ttl, usuwany po ttl + stale_ttl)
+        
+        Returns:
+            int: Nowa wersja klucza
+        """
+        raise NotImplementedError
+    
+    def delete(self, key: str) -> int:
+        """
+        Usuwa wpis i zmienia wersję klucza (unieważnia kopie w innych procesach)
+        
+        Returns:
+            int: Nowa wersja klucza
+        """
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """Usuwa wszystkie wpisy i zmienia wersje wszystkich kluczy"""
+        raise NotImplementedError
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Magazyn cache w pliku SQLite (WAL) - współdzielony przez procesy na jednym hoście
+    
+    Wersje pochodzą z jednego licznika dla wszystkich kluczy, więc nowa wersja jest zawsze
+    większa od każdej wcześniejszej. Dzięki temu wersje kluczy bez wpisu (usuniętych
+    lub wygasłych) można usuwać - wersja 0 nie pasuje do żadnej kopii w L1.
+    """
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str, purge_every: int = CACHE_SQLITE_PURGE_EVERY):
+        """
+        Inicjalizuje magazyn i usuwa wygasłe wpisy
+        
+        Args:
+            path: Ścieżka pliku bazy cache
+            purge_every: Co ile zapisów usuwać wygasłe wpisy
+        """
+        self.path = path
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        # Transakcje sterowane jawnie (BEGIN IMMEDIATE) - zapis wersji i wartości jest atomowy
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(cache_entries)")]
+        if columns and "stale_at" not in columns:
+            # Tabela z wcześniejszej wersji - zawartość cache można odtworzyć
+            self.connection.execute("DROP TABLE cache_entries")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                key TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                stale_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                value BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_counter (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                version INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at);
+        """)
+        # Licznik startuje od największej wersji z wcześniejszych wersji magazynu (wersje per klucz)
+        self.connection.execute(
+            "INSERT OR IGNORE INTO cache_counter (id, version) "
+            "SELECT 0, COALESCE(MAX(version), 0) FROM cache_versions"
+        )
+        self.purge_expired()
+    
+    def _next_version(self) -> int:
+        """Zwraca kolejną wersję z licznika wspólnego dla kluczy (wywoływane w otwartej transakcji)"""
+        self.connection.execute("UPDATE cache_counter SET version = version + 1 WHERE id = 0")
+        return self.connection.execute("SELECT version FROM cache_counter WHERE id = 0").fetchone()[0]
+    
+    def _bump_version(self, key: str) -> int:
+        """Nadaje kluczowi nową wersję (wywoływane w otwartej transakcji)"""
+        version = self._next_version()
+        self.connection.execute(
+            "INSERT INTO cache_versions (key, version) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET version = excluded.version",
+            (key, version)
+        )
+        return version
+    
+    def purge_expired(self) -> int:
+        """
+        Usuwa wygasłe wpisy oraz wersje kluczy, które nie mają już wpisu
+        
+        Returns:
+            int: Liczba usuniętych wpisów
+        """
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                purged = self.connection.execute(
+                    "DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),)
+                ).rowcount
+                self.connection.execute(
+                    "DELETE FROM cache_versions WHERE key NOT IN (SELECT key FROM cache_entries)"
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        if purged:
+            log_debug(f"Cache L2: usunięto {purged} wygasłych wpisów")
+        return purged
+    
+    def version(self, key):
+        with self._lock:
+            row = self.connection.execute("SELECT version FROM cache_versions WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+    
+    def get(self, key):
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT version, stale_at, expires_at, value FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        
+        # Czas ścienny - zegar monotoniczny nie jest wspólny dla procesów
+        now = time.time()
+        remaining = row[2] - now
+        if remaining <= 0:
+            return None
+        try:
+            return pickle.loads(row[3]), row[0], row[1] - now, remaining
+        except Exception as e:
+            log_debug(f"Cache L2: uszkodzony wpis {key}: {str(e)}")
+            return None
+    
+    def set(self, key, value, ttl, stale_ttl=0):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._bump_version(key)
+                # Wiersz klucza zastępuje wpis poprzedniej wersji
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, version, stale_at, expires_at, value) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, version, time.time() + ttl, time.time() + ttl + stale_ttl, data)
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+        return version
+    
+    def delete(self, key):
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Bez wpisu wersja klucza nie jest potrzebna - kopie w L1 (wersja != 0) są nieaktualne
+                self.connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self.connection.execute("DELETE FROM cache_versions WHERE key = ?", (key,))
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return 0
+    
+    def clear(self):
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.execute("DELETE FROM cache_versions")
+                self.connection.execute("DELETE FROM cache_entries")
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+def create_cache_backend() -> Optional[CacheBackend]:
+    """
+    Tworzy współdzielony magazyn cache wybrany zmienną środowiskową CACHE_BACKEND
+    
+    Returns:
+        CacheBackend lub None (tylko cache w pamięci procesu)
+    """
+    backend_type = os.getenv("CACHE_BACKEND", "memory").lower()
+    if backend_type == "sqlite":
+        path = os.getenv("CACHE_SQLITE_PATH", CACHE_SQLITE_DEFAULT_PATH)
+        log_debug(f"Cache backend: sqlite ({path})")
+        return SQLiteCacheBackend(path)
+    if backend_type != "memory":
+        raise ValueError(f"Nieznany magazyn cache: {backend_type}")
+    return None
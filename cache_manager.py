@@ -2,83 +2,563 @@
 Menedżer cache dla aplikacji Language Helper
 """
 
+import asyncio
+import atexit
+import contextvars
+import functools
+import hashlib
+import heapq
+import inspect
+import itertools
+import json
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import types
+import threading
 import time
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
-from logger_config import log_debug, log_info
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, Any, Optional, Tuple, Type
+from constants import (
+    CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_NAMESPACE_BUDGETS, CACHE_SNAPSHOT_INTERVAL,
+    CACHE_EVICTION_POLICY, CACHE_TOKEN_COST_SECONDS, CACHE_MIN_COST_SECONDS
+)
+from logger_config import log_debug, log_info, log_warning
+from cache_backends import CacheBackend, create_cache_backend
+
+# Znacznik braku wpisu (wartością w cache może być None)
+_MISSING = object()
+
+# Format pliku snapshotu: nagłówek (znacznik, wersja formatu, czas zapisu), potem wpisy
+# (długość, CRC32, skompresowany pickle) - uszkodzony wpis jest pomijany bez odrzucania reszty
+_SNAPSHOT_MAGIC = b"LHCACHE1"
+_SNAPSHOT_FORMAT = 2
+_SNAPSHOT_HEADER = struct.Struct(">8sHd")
+_SNAPSHOT_ENTRY = struct.Struct(">II")
+
+# Polityki wyboru wpisu do usunięcia przy przekroczeniu limitu
+EVICTION_POLICIES = ("lru", "gdsf")
+
+# Koszt zgłoszony przez report_load_cost w trakcie bieżącego ładowania (lista [sekundy])
+_reported_cost: contextvars.ContextVar = contextvars.ContextVar("cache_reported_cost", default=None)
+
+def report_load_cost(tokens: int = 0, seconds: float = 0.0) -> None:
+    """
+    Dolicza koszt do wartości ładowanej w bieżącym kontekście (loader get_or_load, funkcja @cached)
+    
+    Koszt odtworzenia wpisu to zmierzony czas ładowania plus zgłoszone tokeny LLM przeliczone
+    przez CACHE_TOKEN_COST_SECONDS. Poza ładowaniem wywołanie jest ignorowane.
+    
+    Args:
+        tokens: Liczba zużytych tokenów
+        seconds: Dodatkowy koszt w sekundach (np. czas spędzony poza procesem)
+    """
+    reported = _reported_cost.get()
+    if reported is not None:
+        reported[0] += seconds + tokens * CACHE_TOKEN_COST_SECONDS
+
+class _Flight:
+    """Trwające ładowanie wartości dla klucza (wspólne dla wszystkich czekających wątków)"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.invalidated = False
+
+# Obiekty współdzielone przez cały proces - nie wliczane do rozmiaru wpisu
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+def deep_sizeof(value: Any) -> int:
+    """
+    Zwraca rozmiar obiektu w bajtach razem z obiektami, do których się odwołuje
+    
+    Obsługuje słowniki, sekwencje, zbiory oraz obiekty z __dict__ lub __slots__ (rekordy historii,
+    widoki analiz). Każdy obiekt liczony jest raz, nawet jeśli występuje wielokrotnie.
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or obj is None or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool)):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for cls in type(obj).__mro__:
+                for slot in cls.__dict__.get("__slots__", ()):
+                    if hasattr(obj, slot):
+                        stack.append(getattr(obj, slot))
+    return total
+
+def _namespace(key: str) -> str:
+    """Zwraca przestrzeń nazw klucza (część przed ":")"""
+    return key.split(":", 1)[0]
 
 class CacheManager:
-    """Menedżer cache z TTL (Time To Live)"""
+    """
+    Menedżer cache z TTL (Time To Live) i ograniczeniem liczby wpisów oraz pamięci
     
-    def __init__(self, default_ttl: int = 300):  # 5 minut domyślnie
+    Przy przekroczeniu limitu usuwany jest najdawniej używany wpis (polityka "lru", domyślna) albo
+    wpis o najniższym priorytecie GreedyDual-Size-Frequency (polityka "gdsf" - dla całego cache
+    lub tylko dla wybranych przestrzeni nazw, przez "eviction_policy" w namespace_budgets):
+    L + liczba odczytów * koszt odtworzenia / rozmiar, gdzie L rośnie do priorytetu ostatnio
+    usuniętego wpisu (starzenie). Koszt to czas ładowania i tokeny LLM (report_load_cost) -
+    drogie analizy zostają w cache dłużej niż tanie listy z bazy tej samej wielkości.
+    
+    Czas wygaśnięcia liczony jest zegarem monotonicznym (odporny na zmiany czasu systemowego).
+    Wygasłe wpisy usuwane są przyrostowo z kopca terminów wygaśnięcia przy każdej operacji,
+    a statystyki aktualizowane są na bieżąco - bez przeglądania całego cache.
+    Operacje są bezpieczne wątkowo; get_or_load ładuje brakujący wpis raz dla wszystkich wątków.
+    
+    Z opcjonalnym magazynem współdzielonym (backend) cache w pamięci działa jako L1: wpisy
+    pamiętają wersję klucza z magazynu i są odrzucane, gdy inny proces zapisał lub unieważnił klucz.
+    """
+    
+    def __init__(self, default_ttl: int = 300, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, namespace_budgets: Optional[Dict[str, Dict[str, int]]] = None,
+                 backend: Optional[CacheBackend] = None, eviction_policy: str = "lru"):  # 5 minut domyślnie
         """
         Inicjalizuje menedżer cache
         
         Args:
             default_ttl: Domyślny czas życia cache w sekundach
+            max_entries: Maksymalna liczba wpisów (None = bez limitu)
+            max_bytes: Maksymalny szacowany rozmiar wpisów w bajtach (None = bez limitu)
+            namespace_budgets: Przestrzeń nazw -> {"max_entries", "max_bytes", "eviction_policy"}
+                               (osobne limity i polityka usuwania wpisów z przestrzeni)
+            backend: Współdzielony magazyn cache (L2) lub None - tylko pamięć procesu
+            eviction_policy: "lru" lub "gdsf" (koszt odtworzenia na bajt) - limity całego cache
         """
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        namespace_policies = [budget.get("eviction_policy", eviction_policy) for budget in (namespace_budgets or {}).values()]
+        for policy in [eviction_policy] + namespace_policies:
+            if policy not in EVICTION_POLICIES:
+                raise ValueError(f"Nieznana polityka eviction: {policy}")
+        # Kolejność wpisów = kolejność użycia (najdawniej użyty na początku)
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.namespace_budgets = namespace_budgets or {}
+        self.backend = backend
+        self.backend_hits = 0
+        
+        # Kolejność LRU w każdej przestrzeni nazw - eviction z przestrzeni w O(1)
+        self._namespace_keys: Dict[str, "OrderedDict[str, None]"] = defaultdict(OrderedDict)
+        self._namespace_bytes: Dict[str, int] = defaultdict(int)
+        self._total_bytes = 0
+        self.evictions: Dict[str, int] = defaultdict(int)
+        
+        # GDSF: kopce (priorytet, numer, klucz) całego cache i przestrzeni nazw - nieaktualne
+        # pozycje pomijane przy zdejmowaniu; L (inflacja) = priorytet ostatnio usuniętego wpisu.
+        # Priorytety liczone są tylko dla wpisów, o których usunięciu może decydować GDSF
+        self.eviction_policy = eviction_policy
+        self._priority_heap: List[tuple] = []
+        self._namespace_priority_heaps: Dict[str, List[tuple]] = defaultdict(list)
+        self._priority_counter = itertools.count()
+        self._inflation = 0.0
+        
+        # Kopiec (expires_at, numer zapisu, klucz) - nieaktualne pozycje pomijane przy zdejmowaniu
+        self._expiry_heap: List[tuple] = []
+        self._write_counter = itertools.count()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.refreshes = 0
+        self.restored = 0
+        
+        # Wszystkie sesje Streamlit (wątki) współdzielą cache
+        self._lock = threading.RLock()
+        self._in_flight: Dict[str, _Flight] = {}
         log_info(f"Cache manager zainicjalizowany z TTL: {default_ttl}s")
     
-    def _is_expired(self, cache_entry: Dict[str, Any]) -> bool:
+    def _purge_expired(self) -> int:
         """
-        Sprawdza czy wpis cache wygasł
+        Usuwa wpisy, których termin wygaśnięcia minął (zdejmowane z wierzchołka kopca)
         
-        Args:
-            cache_entry: Wpis cache do sprawdzenia
+        Każda pozycja kopca jest zdejmowana najwyżej raz - koszt zamortyzowany O(log n) na wpis.
             
         Returns:
-            bool: True jeśli wpis wygasł
+            int: Liczba usuniętych wpisów
+        """
+        now = time.monotonic()
+        purged = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, write_id, key = heapq.heappop(self._expiry_heap)
+            cache_entry = self.cache.get(key)
+            # Pozycja nieaktualna - wpis usunięty lub nadpisany później
+            if cache_entry is None or cache_entry['write_id'] != write_id:
+                continue
+            self._remove(key)
+            self.expirations += 1
+            purged += 1
+        
+        # Zbyt wiele nieaktualnych pozycji (usunięte/nadpisane wpisy) - przebuduj kopiec
+        if len(self._expiry_heap) > 2 * len(self.cache) + 64:
+            self._expiry_heap = [
+                (entry['expires_at'], entry['write_id'], key) for key, entry in self.cache.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+        return purged
+    
+    def _entry_size(self, key: str, value: Any) -> int:
+        """
+        Zwraca rozmiar wpisu w bajtach (liczony raz przy zapisie, razem z zawartością list i rekordów)
+        
+        Wartość zmieniona w miejscu po zapisie nie jest przeliczana - zmiany przez set() lub update().
+        """
+        return sys.getsizeof(key) + deep_sizeof(value)
+    
+    def _remove(self, key: str) -> Dict[str, Any]:
+        """Usuwa wpis wraz z jego udziałem w licznikach rozmiaru"""
+        cache_entry = self.cache.pop(key)
+        namespace = cache_entry['namespace']
+        del self._namespace_keys[namespace][key]
+        if not self._namespace_keys[namespace]:
+            del self._namespace_keys[namespace]
+            self._namespace_priority_heaps.pop(namespace, None)
+        self._namespace_bytes[namespace] -= cache_entry['size']
+        self._total_bytes -= cache_entry['size']
+        return cache_entry
+    
+    def _namespace_policy(self, namespace: str) -> str:
+        """Zwraca politykę usuwania wpisów z przestrzeni nazw przy przekroczeniu jej limitu"""
+        return self.namespace_budgets.get(namespace, {}).get("eviction_policy", self.eviction_policy)
+    
+    def _uses_gdsf(self, namespace: str) -> bool:
+        """Sprawdza, czy wpisy przestrzeni nazw potrzebują priorytetu GDSF (cały cache lub przestrzeń)"""
+        return self.eviction_policy == "gdsf" or self._namespace_policy(namespace) == "gdsf"
+    
+    def _touch(self, key: str) -> None:
+        """Oznacza wpis jako ostatnio użyty (i zwiększa jego priorytet GDSF)"""
+        cache_entry = self.cache[key]
+        self.cache.move_to_end(key)
+        self._namespace_keys[cache_entry['namespace']].move_to_end(key)
+        cache_entry['frequency'] += 1
+        if self._uses_gdsf(cache_entry['namespace']):
+            self._push_priority(key)
+    
+    def _push_priority(self, key: str) -> None:
+        """Wylicza priorytet GDSF wpisu i umieszcza go w kopcach (poprzednie pozycje stają się nieaktualne)"""
+        cache_entry = self.cache[key]
+        priority = self._inflation + cache_entry['frequency'] * cache_entry['cost'] / max(cache_entry['size'], 1)
+        priority_id = next(self._priority_counter)
+        cache_entry['priority'] = priority
+        cache_entry['priority_id'] = priority_id
+        heapq.heappush(self._priority_heap, (priority, priority_id, key))
+        heapq.heappush(self._namespace_priority_heaps[cache_entry['namespace']], (priority, priority_id, key))
+        
+        # Zbyt wiele nieaktualnych pozycji (odczyty, usunięte wpisy) - przebuduj kopce
+        if len(self._priority_heap) > 2 * len(self.cache) + 64:
+            self._rebuild_priority_heaps()
+    
+    def _rebuild_priority_heaps(self) -> None:
+        """Buduje kopce priorytetów od nowa z aktualnych wpisów"""
+        self._priority_heap = [
+            (entry['priority'], entry['priority_id'], key) for key, entry in self.cache.items() if 'priority' in entry
+        ]
+        heapq.heapify(self._priority_heap)
+        self._namespace_priority_heaps = defaultdict(list)
+        for item in self._priority_heap:
+            self._namespace_priority_heaps[self.cache[item[2]]['namespace']].append(item)
+        for heap in self._namespace_priority_heaps.values():
+            heapq.heapify(heap)
+    
+    def _victim(self, namespace: Optional[str] = None) -> str:
+        """Zwraca klucz wpisu do usunięcia z przestrzeni nazw lub całego cache (zgodnie z jego polityką)"""
+        policy = self._namespace_policy(namespace) if namespace else self.eviction_policy
+        if policy == "lru":
+            return next(iter(self._namespace_keys[namespace] if namespace else self.cache))
+        
+        heap = self._namespace_priority_heaps[namespace] if namespace else self._priority_heap
+        while True:
+            priority, priority_id, key = heapq.heappop(heap)
+            cache_entry = self.cache.get(key)
+            if cache_entry is not None and cache_entry['priority_id'] == priority_id:
+                self._inflation = priority
+                return key
+    
+    def _evict(self, key: str) -> None:
+        """Usuwa wpis z powodu przekroczenia limitu"""
+        namespace = self._remove(key)['namespace']
+        self.evictions[namespace] += 1
+        log_debug(f"Cache evict: {key}")
+    
+    def _enforce_limits(self, namespace: str) -> None:
+        """Usuwa najdawniej używane wpisy, dopóki limity przestrzeni nazw i całego cache nie są spełnione"""
+        budget = self.namespace_budgets.get(namespace, {})
+        namespace_keys = self._namespace_keys.get(namespace)
+        while namespace_keys and (
+            (budget.get("max_entries") is not None and len(namespace_keys) > budget["max_entries"])
+            or (budget.get("max_bytes") is not None and self._namespace_bytes[namespace] > budget["max_bytes"])
+        ):
+            self._evict(self._victim(namespace))
+            namespace_keys = self._namespace_keys.get(namespace)
+        
+        while self.cache and (
+            (self.max_entries is not None and len(self.cache) > self.max_entries)
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            self._evict(self._victim())
+    
+    def _peek(self, key: str) -> Any:
+        """
+        Zwraca wartość wpisu (również nieświeżego) lub _MISSING bez liczenia odczytu
+        (trafień, kolejności LRU i liczby odczytów GDSF) - wywoływane z założoną blokadą
         """
-        if 'expires_at' not in cache_entry:
+        self._purge_expired()
+        
+        if key in self.cache and self.backend and not self._is_current(key):
+            # Klucz zapisany lub unieważniony w innym procesie
+            log_debug(f"Cache stale (L2): {key}")
+            self._remove(key)
+        
+        if key not in self.cache and self.backend:
+            self._load_from_backend(key)
+        
+        return self.cache[key]['value'] if key in self.cache else _MISSING
+    
+    def _lookup(self, key: str) -> Any:
+        """Zwraca wartość wpisu (również nieświeżego) lub _MISSING i liczy odczyt (wywoływane z założoną blokadą)"""
+        value = self._peek(key)
+        if value is _MISSING:
+            self.misses += 1
+            log_debug(f"Cache miss: {key}")
+            return _MISSING
+        
+        self._touch(key)
+        self.hits += 1
+        log_debug(f"Cache hit: {key}")
+        return value
+    
+    def _is_current(self, key: str) -> bool:
+        """Sprawdza, czy wersja wpisu L1 jest aktualna w magazynie współdzielonym"""
+        version = self.cache[key]['version']
+        if version is None:
+            # Wpis tylko w pamięci procesu (nie udało się go zapisać w magazynie)
+            return True
+        try:
+            return self.backend.version(key) == version
+        except Exception as e:
+            log_warning(f"Cache L2 niedostępny ({key}): {str(e)}")
             return True
+    
+    def _load_from_backend(self, key: str) -> None:
+        """Przenosi wpis z magazynu współdzielonego do L1 (z pozostałym czasem życia)"""
+        try:
+            stored = self.backend.get(key)
+        except Exception as e:
+            log_warning(f"Cache L2 niedostępny ({key}): {str(e)}")
+            return
+        if stored is None:
+            return
         
-        return datetime.now() > cache_entry['expires_at']
+        value, version, fresh_ttl, remaining_ttl = stored
+        self.backend_hits += 1
+        log_debug(f"Cache hit (L2): {key}")
+        self._store(key, value, fresh_ttl, remaining_ttl - fresh_ttl, version)
     
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
         """
         Pobiera wartość z cache
         
         Args:
             key: Klucz cache
+            default: Wartość zwracana przy braku wpisu (odróżnia brak od zapisanego None)
             
         Returns:
-            Wartość z cache lub None jeśli nie istnieje/wygasła
+            Wartość z cache lub default jeśli nie istnieje/wygasła
         """
-        if key not in self.cache:
-            log_debug(f"Cache miss: {key}")
-            return None
+        with self._lock:
+            value = self._lookup(key)
+        return default if value is _MISSING else value
         
-        cache_entry = self.cache[key]
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: Optional[int] = None,
+                    stale_ttl: float = 0) -> Any:
+        """
+        Pobiera wartość z cache, a przy braku ładuje ją funkcją loader (single-flight)
         
-        if self._is_expired(cache_entry):
-            log_debug(f"Cache expired: {key}")
-            del self.cache[key]
-            return None
+        Przy jednoczesnym braku wpisu w wielu wątkach loader wywoływany jest tylko raz -
+        pozostałe wątki czekają na jego wynik (lub wyjątek).
         
-        log_debug(f"Cache hit: {key}")
-        return cache_entry['value']
-    
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """
-        Ustawia wartość w cache
+        Stale-while-revalidate: po ttl (miękki TTL) wpis jest jeszcze przez stale_ttl sekund
+        zwracany od razu, a jedno odświeżenie w tle ładuje nową wartość. Dopiero po upływie
+        ttl + stale_ttl (twardy TTL) wywołujący czeka na loader.
         
         Args:
             key: Klucz cache
-            value: Wartość do zapisania
-            ttl: Czas życia w sekundach (opcjonalny)
+            loader: Funkcja bez argumentów zwracająca wartość
+            ttl: Czas świeżości w sekundach (opcjonalny)
+            stale_ttl: Jak długo po ttl zwracać nieświeżą wartość, odświeżając ją w tle
+            
+        Returns:
+            Wartość z cache lub zwrócona przez loader
         """
-        ttl = ttl or self.default_ttl
-        expires_at = datetime.now() + timedelta(seconds=ttl)
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                if time.monotonic() >= self.cache[key]['fresh_until'] and key not in self._in_flight:
+                    self._start_refresh(key, loader, ttl, stale_ttl)
+                return value
+            flight = self._in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._in_flight[key] = _Flight()
+        
+        if not is_leader:
+            log_debug(f"Cache wait: {key}")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        
+        return self._run_load(key, flight, loader, ttl, stale_ttl)
+    
+    def _run_load(self, key: str, flight: _Flight, loader: Callable[[], Any], ttl: Optional[int],
+                  stale_ttl: float) -> Any:
+        """Wykonuje ładowanie zarejestrowane w _in_flight i zapisuje wynik w cache (z kosztem ładowania)"""
+        reported = [0.0]
+        reported_token = _reported_cost.set(reported)
+        started = time.perf_counter()
+        try:
+            flight.value = loader()
+            cost = time.perf_counter() - started + reported[0]
+            with self._lock:
+                # Wpis unieważniony w trakcie ładowania - wynik mógł być nieaktualny
+                if not flight.invalidated:
+                    self._set(key, flight.value, ttl, stale_ttl, cost)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            _reported_cost.reset(reported_token)
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+    
+    def _start_refresh(self, key: str, loader: Callable[[], Any], ttl: Optional[int], stale_ttl: float) -> None:
+        """Uruchamia odświeżenie nieświeżego wpisu w wątku w tle (wywoływane z założoną blokadą)"""
+        flight = self._in_flight[key] = _Flight()
+        self.refreshes += 1
+        log_debug(f"Cache refresh (w tle): {key}")
+        
+        def refresh():
+            try:
+                self._run_load(key, flight, loader, ttl, stale_ttl)
+            except Exception as e:
+                # Nieświeża wartość zostaje do twardego TTL - kolejny odczyt ponowi odświeżenie
+                log_warning(f"Cache: odświeżenie {key} nieudane: {str(e)}")
         
+        threading.Thread(target=refresh, name=f"cache-refresh-{key}", daemon=True).start()
+    
+    def _set(self, key: str, value: Any, ttl: Optional[float], stale_ttl: float = 0,
+             cost: Optional[float] = None) -> None:
+        """Zapisuje wpis w L1 i w magazynie współdzielonym (wywoływane z założoną blokadą)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        version = None
+        if self.backend:
+            try:
+                version = self.backend.set(key, value, ttl, stale_ttl)
+            except Exception as e:
+                # Np. wartość, której nie da się serializować - wpis tylko w pamięci procesu
+                log_warning(f"Cache L2: nie zapisano {key}: {str(e)}")
+        self._store(key, value, ttl, stale_ttl, version, cost)
+    
+    def _store(self, key: str, value: Any, ttl: float, stale_ttl: float, version: Optional[int],
+               cost: Optional[float] = None, frequency: int = 1) -> None:
+        """
+        Zapisuje wpis w L1 (wywoływane z założoną blokadą)
+        
+        Nadpisany wpis (odświeżenie, update) zachowuje liczbę odczytów oraz koszt, jeśli nowy
+        nie został podany - popularność klucza nie zależy od wersji wartości.
+        """
+        now = time.monotonic()
+        fresh_until = now + ttl
+        expires_at = fresh_until + stale_ttl
+        
+        self._purge_expired()
+        if key in self.cache:
+            previous = self._remove(key)
+            frequency = max(frequency, previous['frequency'])
+            cost = previous['cost'] if cost is None else cost
+        
+        namespace = _namespace(key)
+        size = self._entry_size(key, value)
+        write_id = next(self._write_counter)
         self.cache[key] = {
             'value': value,
+            'fresh_until': fresh_until,
             'expires_at': expires_at,
-            'created_at': datetime.now()
+            'created_at': now,
+            'write_id': write_id,
+            'version': version,
+            'namespace': namespace,
+            'size': size,
+            'cost': max(cost or 0.0, CACHE_MIN_COST_SECONDS),
+            'frequency': frequency
         }
+        heapq.heappush(self._expiry_heap, (expires_at, write_id, key))
+        self._namespace_keys[namespace][key] = None
+        self._namespace_bytes[namespace] += size
+        self._total_bytes += size
+        if self._uses_gdsf(namespace):
+            self._push_priority(key)
         
         log_debug(f"Cache set: {key} (TTL: {ttl}s)")
+        self._enforce_limits(namespace)
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, cost: Optional[float] = None) -> None:
+        """
+        Ustawia wartość w cache
+        
+        Args:
+            key: Klucz cache
+            value: Wartość do zapisania
+            ttl: Czas życia w sekundach (opcjonalny)
+            cost: Koszt odtworzenia wartości w sekundach (opcjonalny, dla polityki gdsf)
+        """
+        with self._lock:
+            self._set(key, value, ttl or None, cost=cost)
+    
+    def update(self, key: str, updater: Callable[[Any], Any]) -> bool:
+        """
+        Zastępuje wartość wpisu wynikiem updater(wartość), zachowując pozostały czas życia
+        
+        Args:
+            key: Klucz cache
+            updater: Funkcja zwracająca nową wartość (nie powinna modyfikować starej w miejscu)
+            
+        Returns:
+            bool: True jeśli wpis istniał i został zaktualizowany
+        """
+        with self._lock:
+            # Ładowanie rozpoczęte przed zmianą mogło odczytać dane bez niej
+            if key in self._in_flight:
+                self._in_flight[key].invalidated = True
+            # Zapis (write-through) nie jest odczytem - nie zwiększa trafień ani priorytetu GDSF
+            value = self._peek(key)
+            if value is _MISSING:
+                return False
+            cache_entry, now = self.cache[key], time.monotonic()
+            # Wpis nieświeży pozostaje nieświeży (ujemny ttl) - odświeżenie w tle nadal nastąpi
+            fresh_ttl = cache_entry['fresh_until'] - now
+            self._set(key, updater(value), fresh_ttl, cache_entry['expires_at'] - now - fresh_ttl)
+            return True
     
     def delete(self, key: str) -> bool:
         """
@@ -90,15 +570,38 @@ class CacheManager:
         Returns:
             bool: True jeśli wpis został usunięty
         """
-        if key in self.cache:
-            del self.cache[key]
-            log_debug(f"Cache delete: {key}")
-            return True
-        return False
+        with self._lock:
+            if key in self._in_flight:
+                self._in_flight[key].invalidated = True
+            if self.backend:
+                try:
+                    self.backend.delete(key)
+                except Exception as e:
+                    log_warning(f"Cache L2: nie unieważniono {key}: {str(e)}")
+            if key in self.cache:
+                self._remove(key)
+                log_debug(f"Cache delete: {key}")
+                return True
+            return False
     
     def clear(self) -> None:
         """Czyści cały cache"""
-        self.cache.clear()
+        with self._lock:
+            for flight in self._in_flight.values():
+                flight.invalidated = True
+            if self.backend:
+                try:
+                    self.backend.clear()
+                except Exception as e:
+                    log_warning(f"Cache L2: nie wyczyszczono: {str(e)}")
+            self.cache.clear()
+            self._expiry_heap.clear()
+            self._namespace_keys.clear()
+            self._namespace_bytes.clear()
+            self._total_bytes = 0
+            self._priority_heap.clear()
+            self._namespace_priority_heaps.clear()
+            self._inflation = 0.0
         log_info("Cache cleared")
     
     def cleanup_expired(self) -> int:
@@ -108,19 +611,13 @@ class CacheManager:
         Returns:
             int: Liczba usuniętych wpisów
         """
-        expired_keys = []
-        
-        for key, cache_entry in self.cache.items():
-            if self._is_expired(cache_entry):
-                expired_keys.append(key)
+        with self._lock:
+            purged = self._purge_expired()
         
-        for key in expired_keys:
-            del self.cache[key]
+        if purged:
+            log_debug(f"Cleaned up {purged} expired cache entries")
         
-        if expired_keys:
-            log_debug(f"Cleaned up {len(expired_keys)} expired cache entries")
-        
-        return len(expired_keys)
+        return purged
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -129,68 +626,313 @@ class CacheManager:
         Returns:
             Dict ze statystykami cache
         """
-        total_entries = len(self.cache)
-        expired_entries = sum(1 for entry in self.cache.values() if self._is_expired(entry))
-        active_entries = total_entries - expired_entries
+        with self._lock:
+            # Po usunięciu wygasłych wszystkie pozostałe wpisy są aktywne
+            self._purge_expired()
         
-        return {
-            'total_entries': total_entries,
-            'active_entries': active_entries,
-            'expired_entries': expired_entries,
-            'cache_size_mb': self._estimate_memory_usage()
-        }
+            return {
+                'total_entries': len(self.cache),
+                'active_entries': len(self.cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'background_refreshes': self.refreshes,
+                'cache_size_mb': self._estimate_memory_usage(),
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'eviction_policy': self.eviction_policy,
+                'evictions': sum(self.evictions.values()),
+                'evictions_by_namespace': dict(self.evictions),
+                'memory_by_namespace': dict(self._namespace_bytes),
+                'loads_in_flight': len(self._in_flight),
+                'backend': self.backend.name if self.backend else "memory",
+                'backend_hits': self.backend_hits,
+                'restored_entries': self.restored
+            }
     
-    def _estimate_memory_usage(self) -> float:
+    def set_memory_budget(self, max_bytes: Optional[int], namespace: Optional[str] = None) -> int:
         """
-        Szacuje użycie pamięci przez cache
+        Ustawia limit pamięci całego cache lub przestrzeni nazw i od razu go egzekwuje
         
+        Args:
+            max_bytes: Limit w bajtach (None = bez limitu)
+            namespace: Przestrzeń nazw (None = cały cache)
+            
         Returns:
-            float: Szacowane użycie pamięci w MB
+            int: Liczba wpisów usuniętych, aby zmieścić się w limicie
+        """
+        with self._lock:
+            evictions_before = sum(self.evictions.values())
+            if namespace is None:
+                self.max_bytes = max_bytes
+                namespaces = list(self._namespace_keys)
+            else:
+                self.namespace_budgets.setdefault(namespace, {})["max_bytes"] = max_bytes
+                namespaces = [namespace]
+            for name in namespaces:
+                self._enforce_limits(name)
+            evicted = sum(self.evictions.values()) - evictions_before
+        
+        log_info(f"Cache: limit pamięci {namespace or 'całego cache'} = {max_bytes} B (usunięto {evicted} wpisów)")
+        return evicted
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Zwraca zużycie pamięci cache z podziałem na przestrzenie nazw
+        
+        Returns:
+            Dict: total_bytes, max_bytes oraz namespaces: przestrzeń -> {entries, bytes, max_bytes,
+            evictions, cost_seconds} (cost_seconds - łączny koszt odtworzenia wpisów)
+        """
+        with self._lock:
+            costs: Dict[str, float] = defaultdict(float)
+            for cache_entry in self.cache.values():
+                costs[cache_entry['namespace']] += cache_entry['cost']
+            return {
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'namespaces': {
+                    namespace: {
+                        'entries': len(keys),
+                        'bytes': self._namespace_bytes[namespace],
+                        'max_bytes': self.namespace_budgets.get(namespace, {}).get("max_bytes"),
+                        'eviction_policy': self._namespace_policy(namespace),
+                        'evictions': self.evictions.get(namespace, 0),
+                        'cost_seconds': round(costs[namespace], 3)
+                    }
+                    for namespace, keys in self._namespace_keys.items()
+                }
+            }
+    
+    def save_snapshot(self, path: str) -> int:
+        """
+        Zapisuje wpisy cache do pliku binarnego (cache rozgrzany po restarcie aplikacji)
+        
+        Wpisy zapisywane są w kolejności LRU z pozostałym czasem świeżości i życia, kosztem
+        odtworzenia i liczbą odczytów. Plik
+        powstaje atomowo (plik tymczasowy + zamiana). Wartości, których nie da się serializować,
+        oraz zapamiętane błędy (@cached) są pomijane.
+        
+        Args:
+            path: Ścieżka pliku snapshotu
+            
+        Returns:
+            int: Liczba zapisanych wpisów
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired()
+            # Serializacja poza blokadą - wartości wpisów nie są modyfikowane w miejscu
+            entries = [
+                (key, entry['value'], entry['fresh_until'] - now, entry['expires_at'] - now, entry['version'],
+                 entry['cost'], entry['frequency'])
+                for key, entry in self.cache.items()
+            ]
+        
+        saved = 0
+        # Unikalny plik tymczasowy w katalogu docelowym - równoległe zapisy (kilka procesów,
+        # zapis okresowy i przy zamknięciu) nie nadpisują sobie pliku przed os.replace
+        directory, name = os.path.split(os.path.abspath(path))
+        snapshot_file = tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix=".tmp", delete=False)
+        try:
+            with snapshot_file:
+                snapshot_file.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_FORMAT, time.time()))
+                for entry in entries:
+                    if isinstance(entry[1], _CachedError):
+                        continue
+                    try:
+                        data = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), 1)
+                    except Exception as e:
+                        log_debug(f"Cache snapshot: pominięto {entry[0]}: {str(e)}")
+                        continue
+                    snapshot_file.write(_SNAPSHOT_ENTRY.pack(len(data), zlib.crc32(data)))
+                    snapshot_file.write(data)
+                    saved += 1
+            os.replace(snapshot_file.name, path)
+        except BaseException:
+            os.unlink(snapshot_file.name)
+            raise
+        
+        log_debug(f"Cache snapshot: zapisano {saved} wpisów do {path}")
+        return saved
+    
+    def load_snapshot(self, path: str) -> int:
+        """
+        Wczytuje wpisy z pliku snapshotu z czasem życia pomniejszonym o czas od zapisu
+        
+        Pomijane są wpisy wygasłe, uszkodzone (CRC, deserializacja), już obecne w cache oraz
+        takie, których wersja w magazynie współdzielonym zmieniła się od zapisu snapshotu.
+        Plik w innym formacie jest ignorowany w całości.
+        
+        Args:
+            path: Ścieżka pliku snapshotu
+            
+        Returns:
+            int: Liczba wczytanych wpisów
+        """
+        try:
+            with open(path, "rb") as snapshot_file:
+                data = snapshot_file.read()
+        except FileNotFoundError:
+            return 0
+        
+        if len(data) < _SNAPSHOT_HEADER.size:
+            log_warning(f"Cache snapshot: plik {path} jest uszkodzony")
+            return 0
+        magic, snapshot_format, saved_at = _SNAPSHOT_HEADER.unpack_from(data)
+        if magic != _SNAPSHOT_MAGIC or snapshot_format != _SNAPSHOT_FORMAT:
+            log_warning(f"Cache snapshot: nieobsługiwany format pliku {path}")
+            return 0
+        
+        elapsed = max(0.0, time.time() - saved_at)
+        offset = _SNAPSHOT_HEADER.size
+        restored = skipped = 0
+        while offset + _SNAPSHOT_ENTRY.size <= len(data):
+            length, checksum = _SNAPSHOT_ENTRY.unpack_from(data, offset)
+            blob = data[offset + _SNAPSHOT_ENTRY.size:offset + _SNAPSHOT_ENTRY.size + length]
+            offset += _SNAPSHOT_ENTRY.size + length
+            if len(blob) != length or zlib.crc32(blob) != checksum:
+                skipped += 1
+                continue
+            try:
+                key, value, fresh_ttl, remaining_ttl, version, cost, frequency = pickle.loads(zlib.decompress(blob))
+            except Exception as e:
+                # Np. klasa wartości zmieniona od zapisu snapshotu
+                log_debug(f"Cache snapshot: nie wczytano wpisu: {str(e)}")
+                skipped += 1
+                continue
+            
+            remaining_ttl -= elapsed
+            if remaining_ttl <= 0:
+                continue
+            with self._lock:
+                if key in self.cache:
+                    continue
+                if self.backend and version is not None:
+                    try:
+                        if self.backend.version(key) != version:
+                            # Klucz zapisany lub unieważniony po zapisie snapshotu
+                            skipped += 1
+                            continue
+                    except Exception as e:
+                        log_warning(f"Cache L2 niedostępny ({key}): {str(e)}")
+                # Wpis po czasie świeżości wraca jako nieświeży (odświeżenie w tle przy odczycie)
+                fresh_ttl -= elapsed
+                self._store(key, value, fresh_ttl, remaining_ttl - fresh_ttl, version, cost, frequency)
+                self.restored += 1
+                restored += 1
+        
+        log_info(f"Cache snapshot: wczytano {restored} wpisów z {path} (pominięto {skipped})")
+        return restored
+    
+    def start_snapshots(self, path: str, interval: float) -> None:
+        """
+        Wczytuje snapshot i zapisuje go co interval sekund oraz przy zamknięciu procesu
+        
+        Args:
+            path: Ścieżka pliku snapshotu
+            interval: Odstęp między zapisami w sekundach
         """
-        import sys
+        try:
+            self.load_snapshot(path)
+        except Exception as e:
+            log_warning(f"Cache snapshot: nie wczytano {path}: {str(e)}")
         
-        total_size = 0
-        for key, value in self.cache.items():
-            total_size += sys.getsizeof(key)
-            total_size += sys.getsizeof(value)
+        def save():
+            try:
+                self.save_snapshot(path)
+            except Exception as e:
+                log_warning(f"Cache snapshot: nie zapisano {path}: {str(e)}")
         
-        return round(total_size / (1024 * 1024), 2)
+        def save_periodically():
+            while True:
+                time.sleep(interval)
+                save()
+        
+        threading.Thread(target=save_periodically, name="cache-snapshot", daemon=True).start()
+        atexit.register(save)
+    
+    def _estimate_memory_usage(self) -> float:
+        """
+        Zwraca użycie pamięci przez cache (suma rozmiarów wpisów liczonych przy zapisie)
+        
+        Returns:
+            float: Szacowane użycie pamięci w MB
+        """
+        return round(self._total_bytes / (1024 * 1024), 2)
 
 # Globalny menedżer cache
-cache_manager = CacheManager(default_ttl=300)  # 5 minut
+cache_manager = CacheManager(
+    default_ttl=300,  # 5 minut
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=int(os.getenv("CACHE_MAX_BYTES", CACHE_MAX_BYTES)),
+    namespace_budgets=CACHE_NAMESPACE_BUDGETS,
+    backend=create_cache_backend(),
+    eviction_policy=os.getenv("CACHE_EVICTION_POLICY", CACHE_EVICTION_POLICY).lower()
+)
 
 # Funkcje pomocnicze dla cache
-def cache_translations(translations: List[Dict]) -> None:
-    """Cache dla tłumaczeń"""
-    cache_manager.set("translations", translations, ttl=600)  # 10 minut
-
-def get_cached_translations() -> Optional[List[Dict]]:
-    """Pobiera tłumaczenia z cache"""
-    return cache_manager.get("translations")
+# Czas życia cache dla każdego typu historii (sekundy)
+HISTORY_CACHE_TTL = {
+    "translations": 600,  # 10 minut
+    "corrections": 600,  # 10 minut
+    "chat_sessions": 300,  # 5 minut
+    "tips_history": 300  # 5 minut
+}
+# Jak długo po czasie świeżości zwracać listę historii, odświeżając ją w tle (sekundy)
+HISTORY_CACHE_STALE_TTL = 3600
 
-def cache_corrections(corrections: List[Dict]) -> None:
-    """Cache dla poprawek i analiz"""
-    cache_manager.set("corrections", corrections, ttl=600)  # 10 minut
-
-def get_cached_corrections() -> Optional[List[Dict]]:
-    """Pobiera poprawki z cache"""
-    return cache_manager.get("corrections")
-
-def cache_chat_sessions(chat_sessions: List[Dict]) -> None:
-    """Cache dla sesji czatu"""
-    cache_manager.set("chat_sessions", chat_sessions, ttl=300)  # 5 minut
+def get_or_load_history(history_type: str, loader: Callable[[], List[Dict]]) -> List[Dict]:
+    """
+    Pobiera historię danego typu z cache lub ładuje ją (jeden odczyt z bazy dla wszystkich sesji)
+    
+    Po czasie świeżości lista jest jeszcze przez HISTORY_CACHE_STALE_TTL zwracana od razu
+    i odświeżana w tle - użytkownik nie czeka na zapytanie do bazy.
+    """
+    return cache_manager.get_or_load(
+        history_type, loader, ttl=HISTORY_CACHE_TTL[history_type], stale_ttl=HISTORY_CACHE_STALE_TTL
+    )
 
-def get_cached_chat_sessions() -> Optional[List[Dict]]:
-    """Pobiera sesje czatu z cache"""
-    return cache_manager.get("chat_sessions")
+def cache_history_item(history_type: str, item: Dict, limit: int) -> bool:
+    """
+    Dopisuje zapisany element na początek listy historii w cache (write-through)
+    
+    Element o tym samym ID (np. nadpisany nagłówek sesji czatu) jest przenoszony na początek.
+    Lista jest przycinana do dotychczasowej długości, ale nie krótszej niż limit.
+    
+    Returns:
+        bool: True jeśli lista była w cache i została zaktualizowana
+    """
+    def prepend(items):
+        kept = [existing for existing in items if str(existing["id"]) != str(item["id"])]
+        return ([item] + kept)[:max(len(items), limit)]
+    
+    return cache_manager.update(history_type, prepend)
 
-def cache_tips_history(tips_history: List[Dict]) -> None:
-    """Cache dla historii wskazówek"""
-    cache_manager.set("tips_history", tips_history, ttl=300)  # 5 minut
+def remove_cached_history_item(history_type: str, item_id: Any) -> bool:
+    """
+    Usuwa element o podanym ID z listy historii w cache (po usunięciu z bazy)
+    
+    Returns:
+        bool: True jeśli lista była w cache i została zaktualizowana
+    """
+    def remove(items):
+        return [existing for existing in items if str(existing["id"]) != str(item_id)]
+    
+    return cache_manager.update(history_type, remove)
 
-def get_cached_tips_history() -> Optional[List[Dict]]:
-    """Pobiera historię wskazówek z cache"""
-    return cache_manager.get("tips_history")
+def update_cached_db_stats(stats_key: str, updater: Callable[[Dict[str, Any]], Dict[str, Any]]) -> bool:
+    """
+    Zastępuje statystyki w cache wynikiem updater(statystyki) (np. po zapisie)
+    
+    Args:
+        stats_key: Klucz statystyk bazy (osobny dla każdego magazynu i kolekcji)
+        updater: Funkcja zwracająca nowe statystyki
+    
+    Returns:
+        bool: True jeśli statystyki były w cache i zostały zaktualizowane
+    """
+    return cache_manager.update(stats_key, updater)
 
 def invalidate_cache(cache_type: str = None) -> None:
     """
@@ -205,3 +947,231 @@ def invalidate_cache(cache_type: str = None) -> None:
     else:
         cache_manager.clear()
         log_info("All cache invalidated")
+
+# Dekorator @cached - memoizacja wyników funkcji w cache_manager
+# Przestrzeń nazw wpisów funkcji bez własnej przestrzeni
+CACHED_DEFAULT_NAMESPACE = "memo"
+# Parametry pomijane w domyślnym kluczu (instancja/klasa nie wpływa na wynik metod singletonów)
+_KEY_IGNORED_PARAMETERS = ("self", "cls")
+
+class _CachedError:
+    """Wyjątek zapamiętany przez @cached (negative caching) - zgłaszany ponownie przy odczycie"""
+    
+    __slots__ = ("error",)
+    
+    def __init__(self, error: BaseException):
+        self.error = error
+
+class CachedFunctionStats:
+    """Statystyki funkcji dekorowanej przez @cached"""
+    
+    def __init__(self, name: str, namespace: str):
+        self.name = name
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.background_loads = 0
+        self.errors = 0
+        self.error_hits = 0
+        self.load_time = 0.0
+    
+    def record(self, **counters: float) -> None:
+        """Zwiększa podane liczniki (np. record(hits=1))"""
+        with self._lock:
+            for name, amount in counters.items():
+                setattr(self, name, getattr(self, name) + amount)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Zwraca statystyki jako słownik (z odsetkiem trafień i średnim czasem ładowania)"""
+        with self._lock:
+            loads = self.misses + self.background_loads
+            return {
+                'namespace': self.namespace,
+                'calls': self.calls,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / self.calls, 3) if self.calls else 0.0,
+                'background_loads': self.background_loads,
+                'errors': self.errors,
+                'error_hits': self.error_hits,
+                'avg_load_time': round(self.load_time / loads, 4) if loads else 0.0
+            }
+
+# Nazwa funkcji (moduł.qualname) -> statystyki
+_cached_functions: Dict[str, CachedFunctionStats] = {}
+
+def normalize_cache_key(value: Any) -> str:
+    """
+    Zamienia wartość na skrót nadający się do klucza cache
+    
+    Słowniki są sortowane po kluczach, a krotki traktowane jak listy - te same argumenty dają
+    ten sam klucz w każdym procesie. Obiekty spoza JSON są odrzucane: ich repr często zawiera
+    adres w pamięci, więc klucz nie trafiałby w cache.
+    
+    Raises:
+        TypeError: Wartość nie jest serializowalna do JSON
+    """
+    try:
+        normalized = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    except TypeError as e:
+        raise TypeError(f"Klucz cache wymaga argumentów serializowalnych do JSON - podaj key= w @cached ({str(e)})") from e
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+def cached(ttl: Optional[float] = None, namespace: Optional[str] = None,
+           key: Optional[Callable[..., Any]] = None, stale_ttl: float = 0,
+           error_ttl: Optional[float] = None,
+           error_types: Tuple[Type[BaseException], ...] = (Exception,)) -> Callable:
+    """
+    Dekorator zapamiętujący wyniki funkcji (synchronicznej lub async) w cache_manager
+    
+    Domyślny klucz to "<namespace>:<moduł>.<funkcja>:<skrót argumentów>" - argumenty są
+    wiązane z sygnaturą (z wartościami domyślnymi), więc f("x") i f(text="x") trafiają
+    w ten sam wpis. Parametry self/cls są pomijane. Pozostałe argumenty muszą być
+    serializowalne do JSON - dla innych (np. obiektów) potrzebna jest funkcja key.
+    
+    Args:
+        ttl: Czas świeżości w sekundach (None = domyślny TTL menedżera)
+        namespace: Przestrzeń nazw wpisów (limity z CACHE_NAMESPACE_BUDGETS)
+        key: Funkcja o sygnaturze dekorowanej funkcji; zwrócony str jest pełnym kluczem
+             cache (np. wspólnym z unieważnianiem), inna wartość - częścią klucza po normalizacji
+        stale_ttl: Stale-while-revalidate jak w get_or_load (tylko funkcje synchroniczne)
+        error_ttl: Jak długo pamiętać wyjątek (None = wyjątki nie są zapamiętywane)
+        error_types: Zapamiętywane typy wyjątków
+        
+    Udekorowana funkcja ma atrybuty cache_key(*args, **kwargs), invalidate(*args, **kwargs)
+    i cache_stats().
+    """
+    def decorator(func: Callable) -> Callable:
+        is_async = inspect.iscoroutinefunction(func)
+        if is_async and stale_ttl:
+            raise ValueError(f"@cached: stale_ttl nie jest obsługiwany dla funkcji async ({func.__qualname__})")
+        
+        name = f"{func.__module__}.{func.__qualname__}"
+        function_namespace = namespace or CACHED_DEFAULT_NAMESPACE
+        signature = inspect.signature(func)
+        stats = _cached_functions[name] = CachedFunctionStats(name, function_namespace)
+        
+        def cache_key(*args, **kwargs) -> str:
+            if key is not None:
+                custom_key = key(*args, **kwargs)
+                if isinstance(custom_key, str):
+                    return custom_key
+                return f"{function_namespace}:{name}:{normalize_cache_key(custom_key)}"
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                parameter: value for parameter, value in bound.arguments.items()
+                if parameter not in _KEY_IGNORED_PARAMETERS
+            }
+            return f"{function_namespace}:{name}:{normalize_cache_key(arguments)}"
+        
+        def remember_error(entry_key: str, error: Exception) -> None:
+            """Zlicza błąd ładowania i zapamiętuje go na error_ttl (jeśli typ jest na liście)"""
+            stats.record(errors=1)
+            if error_ttl is not None and isinstance(error, error_types):
+                log_debug(f"Cache: zapamiętano błąd {entry_key} na {error_ttl}s: {str(error)}")
+                cache_manager.set(entry_key, _CachedError(error), ttl=error_ttl)
+        
+        def unwrap(value: Any) -> Any:
+            """Zlicza trafienie (zapamiętany wyjątek tylko jako error_hits) i zwraca wartość lub zgłasza wyjątek"""
+            if isinstance(value, _CachedError):
+                stats.record(error_hits=1)
+                raise value.error
+            stats.record(hits=1)
+            return value
+        
+        if is_async:
+            # Trwające wywołania (klucz -> zadanie) - współdzielone w obrębie jednej pętli zdarzeń
+            pending: Dict[str, asyncio.Future] = {}
+            
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                entry_key = cache_key(*args, **kwargs)
+                stats.record(calls=1)
+                value = cache_manager.get(entry_key, _MISSING)
+                if value is not _MISSING:
+                    return unwrap(value)
+                
+                loop = asyncio.get_running_loop()
+                task = pending.get(entry_key)
+                if task is not None and task.get_loop() is loop and not task.done():
+                    stats.record(hits=1)
+                    return await asyncio.shield(task)
+                
+                stats.record(misses=1)
+                # Zadanie kopiuje kontekst - report_load_cost w funkcji dolicza do tej listy
+                reported = [0.0]
+                reported_token = _reported_cost.set(reported)
+                task = pending[entry_key] = asyncio.ensure_future(func(*args, **kwargs))
+                _reported_cost.reset(reported_token)
+                started = time.perf_counter()
+                try:
+                    value = await asyncio.shield(task)
+                except Exception as e:
+                    remember_error(entry_key, e)
+                    raise
+                finally:
+                    load_time = time.perf_counter() - started
+                    stats.record(load_time=load_time)
+                    if pending.get(entry_key) is task:
+                        del pending[entry_key]
+                cache_manager.set(entry_key, value, ttl=ttl, cost=load_time + reported[0])
+                return value
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                entry_key = cache_key(*args, **kwargs)
+                caller = threading.get_ident()
+                loaded_here = False
+                
+                def loader():
+                    nonlocal loaded_here
+                    # Odświeżenie w tle (stale_ttl) wywołuje loader w innym wątku
+                    if threading.get_ident() == caller:
+                        loaded_here = True
+                    else:
+                        stats.record(background_loads=1)
+                    started = time.perf_counter()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        stats.record(load_time=time.perf_counter() - started)
+                
+                stats.record(calls=1)
+                try:
+                    value = cache_manager.get_or_load(entry_key, loader, ttl=ttl, stale_ttl=stale_ttl)
+                except Exception as e:
+                    if loaded_here:
+                        stats.record(misses=1)
+                        remember_error(entry_key, e)
+                    raise
+                if loaded_here:
+                    stats.record(misses=1)
+                    return value
+                return unwrap(value)
+        
+        def invalidate(*args, **kwargs) -> bool:
+            """Usuwa z cache wynik dla podanych argumentów"""
+            return cache_manager.delete(cache_key(*args, **kwargs))
+        
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
+        wrapper.cache_stats = stats.as_dict
+        return wrapper
+    
+    return decorator
+
+def get_cached_function_stats() -> Dict[str, Dict[str, Any]]:
+    """Zwraca statystyki wszystkich funkcji dekorowanych przez @cached (nazwa -> statystyki)"""
+    return {name: stats.as_dict() for name, stats in _cached_functions.items()}
+
+# Snapshot cache na dysku (zmienna CACHE_SNAPSHOT_PATH) - po restarcie cache startuje rozgrzany.
+# Wczytywany na końcu modułu: wartości (np. wyniki @cached) mogą wymagać importu modułów,
+# które same importują cache_manager.
+if os.getenv("CACHE_SNAPSHOT_PATH"):
+    cache_manager.start_snapshots(
+        os.getenv("CACHE_SNAPSHOT_PATH"),
+        float(os.getenv("CACHE_SNAPSHOT_INTERVAL", CACHE_SNAPSHOT_INTERVAL))
+    )
@@ -0,0 +1,265 @@
+"""
+Retencja i kompaktowanie historii Language Helper
+
+Uruchomienie:
+    python compaction.py                  # jednorazowo
+    python compaction.py --dry-run        # tylko raport, bez zmian
+    python compaction.py --interval 24    # cyklicznie co 24 godziny
+
+Po kompaktowaniu unieważniane są listy historii i statystyki w cache. Działająca aplikacja
+(inny proces) widzi to od razu tylko przy współdzielonym cache (CACHE_BACKEND=sqlite) - usunięcie
+klucza zwiększa jego wersję w L2. Z samym cache w pamięci procesu aplikacja pokazuje usunięte
+wpisy do wygaśnięcia list historii (HISTORY_CACHE_TTL).
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from constants import (
+    RETENTION_POLICIES, AUDIO_RETENTION_DAYS, COMPACTION_INTERVAL_HOURS,
+    QDRANT_VECTOR_SIZE, QDRANT_TIMESTAMP_FIELD, CHAT_MESSAGE_MODE, AUDIO_FORMAT
+)
+from logger_config import log_database_operation, log_info
+from audio_store import audio_store
+from storage_backends import PointSelector
+
+# Pola payloadu z referencją do audio w magazynie plików
+AUDIO_REF_FIELDS = ["audio_sha256", "audio_size", "audio_format"]
+
+class HistoryCompactor:
+    """Usuwa stare punkty historii wg polityk retencji i zwalnia zajmowane przez nie miejsce"""
+    
+    def __init__(self, db, policies=None, audio_retention_days=AUDIO_RETENTION_DAYS, dry_run=False):
+        """
+        Inicjalizuje kompaktor
+        
+        Args:
+            db: Instancja LanguageHelperDB
+            policies: Tryb -> {"max_age_days", "max_per_language"} (domyślnie RETENTION_POLICIES)
+            audio_retention_days: Wiek tłumaczeń (dni), po którym usuwane jest ich audio
+            dry_run: Tylko policz co zostałoby usunięte, bez zmian w bazie
+        """
+        self.db = db
+        self.backend = db.backend
+        self.policies = policies or RETENTION_POLICIES
+        self.audio_retention_days = audio_retention_days
+        self.dry_run = dry_run
+        self.report = defaultdict(int)
+        # Dry run: ID punktów, które zostałyby usunięte lub pozbawione audio, i policzone pliki audio
+        self._dropped_ids = set()
+        self._released_audio = set()
+    
+    def _point_bytes(self, point):
+        """Szacuje miejsce zajmowane przez punkt (payload JSON + wektor float32)"""
+        return len(json.dumps(point.payload).encode("utf-8")) + QDRANT_VECTOR_SIZE * 4
+    
+    def _cutoff(self, days):
+        """Zwraca numeryczny znacznik czasu sprzed podanej liczby dni"""
+        return (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+    
+    def _delete(self, selector, reason):
+        """
+        Usuwa zbiorczo punkty dopasowane przez selektor (wraz z wiadomościami usuwanych sesji czatu)
+        
+        Args:
+            selector: Selektor punktów
+            reason: Powód usunięcia (klucz w raporcie)
+        """
+        deleted, reclaimed = 0, 0
+        session_ids, audio_digests = [], set()
+        
+        # Odczyt tylko payloadów - do raportu oraz kaskadowego sprzątania
+        for point in self.backend.iter_selected(selector):
+            # Dry run nie usuwa punktów - nie licz ich drugi raz w kolejnych krokach
+            if str(point.id) in self._dropped_ids:
+                continue
+            if self.dry_run:
+                self._dropped_ids.add(str(point.id))
+            deleted += 1
+            reclaimed += self._point_bytes(point)
+            if point.payload.get("mode") == "chat_session" and "chat_text" not in point.payload:
+                session_ids.append(str(point.id))
+            if point.payload.get("audio_sha256"):
+                audio_digests.add((point.payload["audio_sha256"], point.payload.get("audio_format")))
+        
+        if not deleted:
+            return
+        
+        if not self.dry_run:
+            self.backend.delete_selected(selector)
+        self.report[f"deleted_{reason}"] += deleted
+        self.report["deleted_points"] += deleted
+        self.report["bytes_reclaimed"] += reclaimed
+        
+        for start in range(0, len(session_ids), 100):
+            self._delete(
+                PointSelector(modes=[CHAT_MESSAGE_MODE], match={"session_id": session_ids[start:start + 100]}),
+                "chat_messages"
+            )
+        self._release_audio(audio_digests)
+    
+    def _audio_referenced(self, digest):
+        """Sprawdza, czy do audio odwołuje się jeszcze jakiś punkt"""
+        selector = PointSelector(match={"audio_sha256": digest})
+        if not self.dry_run:
+            return self.backend.count(selector) > 0
+        # Punkty w bazie zostają - pomiń te, które zostałyby usunięte lub pozbawione audio
+        return any(str(point.id) not in self._dropped_ids for point in self.backend.iter_selected(selector))
+    
+    def _release_audio(self, audio_digests):
+        """Usuwa z magazynu plików audio, do których nie odwołuje się już żaden punkt"""
+        for digest, audio_format in audio_digests:
+            if digest in self._released_audio or self._audio_referenced(digest):
+                continue
+            audio_format = audio_format or AUDIO_FORMAT
+            size = audio_store.size(digest, audio_format)
+            if size is None:
+                continue
+            self._released_audio.add(digest)
+            self.report["audio_files_removed"] += 1
+            self.report["bytes_reclaimed"] += size
+            if not self.dry_run:
+                audio_store.delete(digest, audio_format)
+    
+    def apply_retention(self):
+        """Stosuje polityki retencji: maksymalny wiek i maksymalna liczba wpisów na język"""
+        for mode, policy in self.policies.items():
+            max_age_days = policy.get("max_age_days")
+            if max_age_days:
+                self._delete(PointSelector(modes=[mode], before=self._cutoff(max_age_days)), "expired")
+            
+            max_per_language = policy.get("max_per_language")
+            if not max_per_language:
+                continue
+            for language in self.backend.distinct_languages([mode]):
+                # Dry run: najnowsze spośród punktów, które zostałyby po wcześniejszych krokach
+                exclude_ids = list(self._dropped_ids) if self._dropped_ids else None
+                newest = self.backend.query([mode], max_per_language, language, exclude_ids=exclude_ids)
+                if len(newest) < max_per_language:
+                    continue
+                # Wszystko starsze niż najstarszy z dozwolonych wpisów
+                oldest_kept = newest[-1].payload[QDRANT_TIMESTAMP_FIELD]
+                self._delete(PointSelector(modes=[mode], language=language, before=oldest_kept), "over_limit")
+    
+    def strip_old_audio(self):
+        """Usuwa audio z tłumaczeń starszych niż audio_retention_days (tekst tłumaczenia zostaje)"""
+        selector = PointSelector(
+            modes=["translation"],
+            before=self._cutoff(self.audio_retention_days),
+            has_field="audio_sha256"
+        )
+        audio_digests = set()
+        for point in self.backend.iter_selected(selector):
+            if str(point.id) in self._dropped_ids:
+                continue
+            if self.dry_run:
+                self._dropped_ids.add(str(point.id))
+            audio_digests.add((point.payload["audio_sha256"], point.payload.get("audio_format")))
+        if not audio_digests:
+            return
+        
+        if not self.dry_run:
+            # Najpierw flaga - selektor (has_field) musi jeszcze dopasować punkty
+            self.backend.set_payload_selected(selector, {"has_audio": False})
+            self.backend.delete_payload_selected(selector, AUDIO_REF_FIELDS)
+        self.report["audio_stripped_digests"] += len(audio_digests)
+        self._release_audio(audio_digests)
+    
+    def merge_duplicate_chat_sessions(self):
+        """
+        Usuwa stare sesje czatu zapisane jako pełny tekst, będące początkiem innej sesji
+        
+        Przed zapisem przyrostowym każda odpowiedź zapisywała całą rozmowę od nowa,
+        więc z jednej rozmowy powstawało wiele sesji - zostaje tylko najdłuższa.
+        Porównywane są skróty prefiksów (po liniach), więc w pamięci nie są trzymane teksty.
+        """
+        full_digests = {}
+        prefix_digests = set()
+        for point in self.backend.iter_selected(PointSelector(modes=["chat_session"], has_field="chat_text")):
+            payload = point.payload
+            digest = hashlib.sha256(f"{payload.get('language')}\0{payload.get('context', '')}\0".encode("utf-8"))
+            lines = payload["chat_text"].split("\n")
+            for index, line in enumerate(lines):
+                if index:
+                    digest.update(b"\n")
+                digest.update(line.encode("utf-8"))
+                if index < len(lines) - 1:
+                    prefix_digests.add(digest.hexdigest())
+            full_digests[str(point.id)] = digest.hexdigest()
+        
+        # Sesja jest duplikatem, jeśli jest właściwym prefiksem innej lub identyczną kopią
+        duplicates, seen = [], set()
+        for point_id, digest in full_digests.items():
+            if digest in prefix_digests or digest in seen:
+                duplicates.append(point_id)
+            seen.add(digest)
+        
+        for start in range(0, len(duplicates), 100):
+            self._delete(PointSelector(ids=duplicates[start:start + 100]), "duplicate_chat_sessions")
+    
+    def run(self):
+        """
+        Wykonuje pełne kompaktowanie
+        
+        Returns:
+            dict: Raport (liczby usuniętych punktów, plików audio i odzyskane bajty)
+        """
+        started = time.monotonic()
+        self.report = defaultdict(int)
+        self._dropped_ids = set()
+        self._released_audio = set()
+        
+        if not self.backend:
+            log_database_operation("Kompaktowanie historii", False, "Brak połączenia z bazą danych")
+            return dict(self.report)
+        
+        try:
+            # Zapisy z kolejki muszą trafić do bazy przed selekcją
+            self.db._sync_pending_writes()
+            self.merge_duplicate_chat_sessions()
+            self.apply_retention()
+            self.strip_old_audio()
+            
+            if self.report["deleted_points"] and not self.dry_run:
+                self.backend.vacuum()
+            if not self.dry_run:
+                self.db.invalidate_history_cache()
+            
+            self.report["duration_ms"] = int((time.monotonic() - started) * 1000)
+            log_database_operation(
+                "Kompaktowanie historii" + (" (dry run)" if self.dry_run else ""), True,
+                f"Usunięto {self.report['deleted_points']} punktów, odzyskano {self.report['bytes_reclaimed']} B"
+            )
+        except Exception as e:
+            log_database_operation("Kompaktowanie historii", False, str(e))
+        
+        return dict(self.report)
+
+def main():
+    """Punkt wejścia CLI"""
+    from database import LanguageHelperDB
+    
+    parser = argparse.ArgumentParser(description="Retencja i kompaktowanie historii Language Helper")
+    parser.add_argument("--dry-run", action="store_true", help="tylko raport, bez usuwania")
+    parser.add_argument("--interval", type=float, nargs="?", const=COMPACTION_INTERVAL_HOURS,
+                        help=f"uruchamiaj cyklicznie co podaną liczbę godzin (domyślnie {COMPACTION_INTERVAL_HOURS})")
+    parser.add_argument("--audio-days", type=int, default=AUDIO_RETENTION_DAYS,
+                        help="wiek tłumaczeń (dni), po którym usuwane jest audio")
+    args = parser.parse_args()
+    
+    db = LanguageHelperDB()
+    compactor = HistoryCompactor(db, audio_retention_days=args.audio_days, dry_run=args.dry_run)
+    
+    while True:
+        report = compactor.run()
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        if not args.interval:
+            break
+        log_info(f"Kolejne kompaktowanie za {args.interval} h")
+        time.sleep(args.interval * 3600)
+
+if __name__ == "__main__":
+    main()
@@ -13,10 +13,68 @@ OPENAI_TTS_MAX_CHARS = 4000
 QDRANT_VECTOR_SIZE = 384
 QDRANT_TIMEOUT = 60.0
 QDRANT_DEFAULT_COLLECTION = "language_helper_history"
+QDRANT_TIMESTAMP_FIELD = "timestamp_ts"  # numeryczny znacznik czasu (sekundy UTC) do sortowania
+QDRANT_KEYWORD_INDEXES = ["mode", "language", "target_language", "session_id", "audio_sha256"]
+LANGUAGE_FACET_LIMIT = 1000  # maks. liczba różnych języków zwracanych przez facet Qdrant
+QDRANT_SEQUENCE_FIELD = "seq"  # numer wiadomości w sesji czatu (indeks całkowitoliczbowy)
+# Listy zagnieżdżone w payloadzie analiz -> pola elementów z indeksem słów kluczowych
+QDRANT_NESTED_KEYWORD_INDEXES = {
+    "vocabulary_items": ["word", "difficulty_level"],
+    "grammar_rules": ["rule_name", "difficulty_level"]
+}
+
+# Storage backends
+SQLITE_DEFAULT_PATH = "language_helper.db"
+ASYNC_DB_MAX_CONCURRENCY = 8  # maks. liczba równoległych zapytań AsyncLanguageHelperDB
+
+# Write-behind (zapisy w tle)
+WRITE_BATCH_SIZE = 64
+WRITE_FLUSH_INTERVAL = 0.5  # sekundy
+WRITE_MAX_RETRIES = 3
+
+# Kompresja dużych pól tekstowych payloadu (payload_codec.py)
+PAYLOAD_COMPRESSION_CODEC = "zlib"  # "zlib", "zstd" (wymaga pakietu zstandard) lub "none"; zmienna PAYLOAD_COMPRESSION
+PAYLOAD_COMPRESSION_THRESHOLD = 1024  # bajtów - krótsze pola zapisywane bez zmian
+PAYLOAD_COMPRESSION_FIELDS = ["analysis_data", "exercise_data", "explanation", "tips_text", "content"]
+
+# Embeddings
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_CACHE_SIZE = 10000
 
 # Data Limits
 DEFAULT_HISTORY_LIMIT = 20
 MAX_HISTORY_LIMIT = 100
+
+# Tryby zapisywane w bazie dla każdego typu historii
+HISTORY_MODES = {
+    "translations": ["translation"],
+    "corrections": ["correction", "analysis", "exercise"],
+    "chat_sessions": ["chat_session"],
+    "tips_history": ["learning_tips"]
+}
+
+# Sesje czatu (nagłówek sesji + osobny punkt dla każdej wiadomości)
+CHAT_MESSAGE_MODE = "chat_message"
+CHAT_MESSAGES_PAGE_SIZE = 50
+CHAT_PREVIEW_LENGTH = 200
+
+# Retencja historii (compaction.py) - limity dla każdego trybu (None = bez limitu)
+RETENTION_POLICIES = {
+    "translation": {"max_age_days": 365, "max_per_language": 1000},
+    "correction": {"max_age_days": 365, "max_per_language": 1000},
+    "analysis": {"max_age_days": 365, "max_per_language": 500},
+    "exercise": {"max_age_days": 180, "max_per_language": 500},
+    "chat_session": {"max_age_days": 180, "max_per_language": 200},
+    "learning_tips": {"max_age_days": 180, "max_per_language": 200}
+}
+AUDIO_RETENTION_DAYS = 30  # starsze tłumaczenia tracą audio
+COMPACTION_INTERVAL_HOURS = 24
+
+# Statystyki bazy (panel boczny)
+STATS_CACHE_TTL = 300  # sekundy - zapisy aktualizują statystyki w cache na bieżąco
+STATS_CACHE_STALE_TTL = 3600  # po STATS_CACHE_TTL statystyki przeliczane w tle, a nie przy odczycie
+STATS_EXACT_COUNTS = False  # przybliżone liczniki Qdrant są tańsze
+STATS_PAYLOAD_SAMPLE_SIZE = 200  # punktów do oszacowania rozmiaru payloadu w Qdrant
 MAX_TEXT_LENGTH = 10000
 MIN_TEXT_LENGTH = 3
 
@@ -27,6 +85,28 @@ SUPPORTED_FILE_TYPES = ['txt', 'docx', 'pdf']
 # Audio
 MIN_AUDIO_SIZE_BYTES = 1000
 AUDIO_FORMAT = "wav"
+AUDIO_STORE_DEFAULT_DIR = "audio_store"
+
+# Cache (cache_manager.py) - limity wpisów i pamięci
+CACHE_MAX_ENTRIES = 1000
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Osobne limity dla przestrzeni nazw (część klucza przed ":"), np. {"llm": {"max_entries": 200}};
+# "eviction_policy": "gdsf" włącza GDSF tylko dla przestrzeni (benchmarks/eviction_replay.py)
+CACHE_NAMESPACE_BUDGETS = {}
+# Wybór wpisu do usunięcia: "lru" lub "gdsf" (GreedyDual-Size-Frequency - koszt odtworzenia na bajt)
+CACHE_EVICTION_POLICY = "lru"
+# Koszt tokenu LLM przy wyliczaniu kosztu odtworzenia wpisu (2000 tokenów ~ 6 s)
+CACHE_TOKEN_COST_SECONDS = 0.003
+# Minimalny koszt wpisu (np. zapisanego bez pomiaru) - liczba odczytów i rozmiar nadal się liczą
+CACHE_MIN_COST_SECONDS = 0.001
+# Współdzielony cache L2 dla wielu procesów (zmienna CACHE_BACKEND=sqlite)
+CACHE_SQLITE_DEFAULT_PATH = "language_helper_cache.db"
+CACHE_SQLITE_PURGE_EVERY = 500  # wygasłe wpisy L2 usuwane przy otwarciu i co tyle zapisów
+# Wyniki zapytań do modelu (@cached, przestrzeń nazw "llm") - ten sam tekst nie jest wysyłany ponownie
+LLM_CACHE_TTL = 24 * 3600  # sekundy
+LLM_ERROR_CACHE_TTL = 30  # błędy API (np. limit zapytań) zapamiętywane krótko
+# Snapshot cache na dysku (zmienna CACHE_SNAPSHOT_PATH) - zapis co tyle sekund i przy zamknięciu
+CACHE_SNAPSHOT_INTERVAL = 300
 
 # UI
 DEFAULT_REFRESH_INTERVAL = 30  # seconds
@@ -1,531 +1,986 @@
 import os
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from datetime import datetime
+from qdrant_client.models import PointStruct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import base64
 import json
+import threading
 import uuid
 from constants import (
-    QDRANT_VECTOR_SIZE, QDRANT_TIMEOUT, QDRANT_DEFAULT_COLLECTION,
-    DEFAULT_HISTORY_LIMIT, MAX_HISTORY_LIMIT
+    QDRANT_DEFAULT_COLLECTION, QDRANT_TIMESTAMP_FIELD, QDRANT_SEQUENCE_FIELD,
+    DEFAULT_HISTORY_LIMIT, MAX_HISTORY_LIMIT, HISTORY_MODES,
+    CHAT_MESSAGE_MODE, CHAT_MESSAGES_PAGE_SIZE, CHAT_PREVIEW_LENGTH,
+    STATS_CACHE_TTL, STATS_CACHE_STALE_TTL, STATS_EXACT_COUNTS
+)
+from logger_config import log_database_operation, log_debug
+from audio_store import audio_store
+from embeddings import get_global_embedding_engine
+from write_queue import WriteBehindQueue
+from storage_backends import create_backend, PointSelector
+from payload_codec import compress_payload, decompress_value
+from history_records import (
+    TranslationRecord, CorrectionRecord, AnalysisRecord, ExerciseRecord, ChatSessionRecord, TipsRecord
 )
-from logger_config import log_database_operation, log_debug, log_error
 from cache_manager import (
-    cache_translations, get_cached_translations,
-    cache_corrections, get_cached_corrections,
-    cache_chat_sessions, get_cached_chat_sessions,
-    cache_tips_history, get_cached_tips_history,
-    invalidate_cache
+    update_cached_db_stats, cached,
+    get_or_load_history, cache_history_item, remove_cached_history_item, invalidate_cache
 )
 
 # Ładowanie zmiennych środowiskowych
 load_dotenv()
 
-class LanguageHelperDB:
-    """Klasa do obsługi bazy danych Qdrant dla aplikacji Language Helper"""
+# Pola analizy zapisywane w payloadzie jako natywne listy
+ANALYSIS_FIELDS = ("vocabulary_items", "grammar_rules", "learning_tips")
+
+def _timestamp_payload():
+    """Zwraca pola znacznika czasu (ISO oraz numeryczny do sortowania) dla nowego punktu"""
+    now = datetime.now(timezone.utc)
+    return {
+        "timestamp": now.replace(tzinfo=None).isoformat(),
+        QDRANT_TIMESTAMP_FIELD: now.timestamp()
+    }
+
+def _parse_timestamp(value):
+    """Parsuje znacznik czasu ISO z payloadu do naiwnego datetime w UTC"""
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+def _encode_cursor(position):
+    """Koduje pozycję w historii do nieprzezroczystego kursora"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    """Dekoduje kursor historii do słownika pozycji ({"ts": ..., "ids": [...]})"""
+    return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+
+class HistoryRecords:
+    """
+    Budowanie punktów historii i ich konwersja na elementy dla UI
+    
+    Używane przez LanguageHelperDB (i przez nią AsyncLanguageHelperDB); wymaga atrybutu embedder.
+    """
     
-    def __init__(self):
-        """Inicjalizacja połączenia z bazą danych"""
-        self.qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
-        self.qdrant_api_key = os.getenv("QDRANT_API_KEY")
-        self.collection_name = os.getenv("QDRANT_COLLECTION_NAME", QDRANT_DEFAULT_COLLECTION)
+    def _translation_point(self, input_text, output_text, target_language, mode="translation", audio_data=None, voice=None):
+        """Buduje punkt tłumaczenia"""
+        # Przygotowanie metadanych
+        metadata = {
+            **_timestamp_payload(),
+            "input_text": input_text,
+            "output_text": output_text,
+            "target_language": target_language,
+            "mode": mode,
+            "voice": voice,
+            "has_audio": audio_data is not None
+        }
         
-        # Debug - sprawdź zmienne środowiskowe
-        log_debug(f"Qdrant config - URL: {self.qdrant_url}, API Key: {'***' if self.qdrant_api_key else 'BRAK'}, Collection: {self.collection_name}")
+        # Jeśli jest audio, zapisz je w magazynie plików - w payloadzie tylko referencja
+        if audio_data:
+            metadata.update(audio_store.put(audio_data))
+        
+        return PointStruct(
+            id=str(uuid.uuid4()),
+            vector=self.embedder.embed(input_text),
+            payload=metadata
+        )
+    
+    def _correction_point(self, input_text, output_text, explanation, language, mode="correction", analysis_data=None):
+        """Buduje punkt poprawki, analizy lub ćwiczenia"""
+        # Przygotowanie metadanych
+        metadata = {
+            **_timestamp_payload(),
+            "input_text": input_text,
+            "output_text": output_text,
+            "language": language,
+            "mode": mode
+        }
         
-        # Inicjalizacja klienta Qdrant
+        # Dodaj specyficzne pola dla każdego trybu
+        if mode == "correction":
+            metadata["explanation"] = explanation
+        elif mode == "analysis" and analysis_data:
+            # Konwertuj obiekt Pydantic na słownik
+            analysis_dict = analysis_data.dict() if hasattr(analysis_data, 'dict') else analysis_data
+            # Listy zapisane natywnie w payloadzie - filtrowane po stronie serwera (find_analyses)
+            for field_name in ANALYSIS_FIELDS:
+                metadata[field_name] = analysis_dict.get(field_name, [])
+        elif mode == "exercise" and analysis_data:  # analysis_data zawiera dane ćwiczenia
+            # Serializuj dane ćwiczenia jako JSON
+            metadata["exercise_data"] = json.dumps(analysis_data)
+        
+        return PointStruct(
+            id=str(uuid.uuid4()),
+            vector=self.embedder.embed(input_text),
+            payload=compress_payload(metadata)
+        )
+    
+    def _chat_session_points(self, messages, language, context, session_id, saved_count):
+        """
+        Buduje punkty dopisywane do sesji czatu: nagłówek sesji i nowe wiadomości
+        
+        Koszt zapisu zależy tylko od liczby nowych wiadomości - nagłówek jest mały,
+        a jego wektor (z pierwszej wiadomości i kontekstu) pochodzi z cache embeddingów.
+        Wszystkie wektory liczone są jednym wywołaniem embed_batch.
+        
+        Args:
+            messages: Wszystkie wiadomości rozmowy
+            language: Język rozmowy
+            context: Kontekst rozmowy
+            session_id: Stałe ID sesji (ID punktu nagłówka)
+            saved_count: Liczba wiadomości zapisanych już wcześniej
+        
+        Returns:
+            list: Punkty do zapisania (nagłówek + nowe wiadomości)
+        """
+        first_message = next((msg for msg in messages if msg["role"] == "user"), messages[0])
+        started_at = messages[0].get("timestamp")
+        
+        # Wektory nagłówka i wszystkich nowych wiadomości liczone jednym wywołaniem wsadowym
+        vectors = self.embedder.embed_batch(
+            [f"{context}\n{first_message['content']}"]
+            + [messages[seq]["content"] or "" for seq in range(saved_count, len(messages))]
+        )
+        
+        header = PointStruct(
+            id=session_id,
+            vector=vectors[0],
+            payload={
+                **_timestamp_payload(),
+                "started_at": started_at.isoformat() if isinstance(started_at, datetime) else None,
+                "language": language,
+                "context": context,
+                "mode": "chat_session",
+                "session_id": session_id,
+                "title": first_message["content"][:CHAT_PREVIEW_LENGTH],
+                "last_message": messages[-1]["content"][:CHAT_PREVIEW_LENGTH],
+                "message_count": len(messages)
+            }
+        )
+        
+        points = [header]
+        for seq, vector in zip(range(saved_count, len(messages)), vectors[1:]):
+            msg = messages[seq]
+            points.append(PointStruct(
+                # ID wyznaczone z sesji i numeru - ponowny zapis tej samej wiadomości jest idempotentny
+                id=str(uuid.uuid5(uuid.UUID(session_id), str(seq))),
+                vector=vector,
+                payload=compress_payload({
+                    **_timestamp_payload(),
+                    "language": language,
+                    "mode": CHAT_MESSAGE_MODE,
+                    "session_id": session_id,
+                    QDRANT_SEQUENCE_FIELD: seq,
+                    "role": msg["role"],
+                    "content": msg["content"]
+                })
+            ))
+        return points
+    
+    def _tips_point(self, tips, language):
+        """Buduje punkt wskazówek do nauki"""
+        tips_text = "\n".join(tips)
+        
+        return PointStruct(
+            id=str(uuid.uuid4()),
+            vector=self.embedder.embed(tips_text),
+            payload=compress_payload({
+                **_timestamp_payload(),
+                "language": language,
+                "mode": "learning_tips",
+                "tips_text": tips_text,
+                "tips_count": len(tips)
+            })
+        )
+    
+    def _translation_from_point(self, point):
+        """Konwertuje punkt z magazynu na rekord tłumaczenia"""
+        payload = point.payload
+        
+        # Tylko referencja do audio - dane pobierane leniwie przez get_audio()
+        audio_ref = None
+        if payload.get("has_audio") and "audio_sha256" in payload:
+            audio_ref = {key: payload[key] for key in ("audio_sha256", "audio_size", "audio_format")}
+        elif payload.get("has_audio") and "audio_data" in payload:
+            # Punkt sprzed migracji - przenieś audio do magazynu (zapis idempotentny)
+            audio_ref = audio_store.put(base64.b64decode(payload["audio_data"]))
+        
+        return TranslationRecord(
+            id=point.id,
+            timestamp=_parse_timestamp(payload["timestamp"]),
+            input=payload["input_text"],
+            output=payload["output_text"],
+            target_language=payload["target_language"],
+            mode="translation",
+            audio_ref=audio_ref,
+            voice=payload.get("voice")
+        )
+    
+    def _correction_from_point(self, point):
+        """
+        Konwertuje punkt z magazynu na rekord poprawki, analizy lub ćwiczenia
+        
+        JSON analizy i ćwiczenia (oraz skompresowane pola) nie są dekodowane tutaj - dopiero
+        przy pierwszym odczycie pola (listy historii zwykle wyświetlają tylko tekst wejściowy).
+        """
+        payload = point.payload
+        fields = {
+            "id": point.id,
+            "timestamp": _parse_timestamp(payload["timestamp"]),
+            "input": payload["input_text"],
+            "output": payload["output_text"],
+            "language": payload["language"],
+            "mode": payload["mode"]
+        }
+        
+        if payload["mode"] == "analysis":
+            if "vocabulary_items" in payload:
+                return AnalysisRecord(analysis_data={name: payload.get(name, []) for name in ANALYSIS_FIELDS}, **fields)
+            # Punkt sprzed zapisu natywnego - analiza jako JSON (dekodowana leniwie)
+            return AnalysisRecord(analysis_data=payload.get("analysis_data"), **fields)
+        if payload["mode"] == "exercise":
+            return ExerciseRecord(exercise_data=payload.get("exercise_data"), **fields)
+        if payload["mode"] == "correction":
+            fields["explanation"] = payload["explanation"]
+        return CorrectionRecord(**fields)
+    
+    def _chat_session_from_point(self, point):
+        """Konwertuje nagłówek sesji czatu na rekord (wiadomości pobierane przez get_chat_messages)"""
+        payload = point.payload
+        return ChatSessionRecord(
+            id=point.id,
+            timestamp=_parse_timestamp(payload["timestamp"]),
+            language=payload["language"],
+            context=payload.get("context", ""),
+            # Tylko sesje zapisane przed wprowadzeniem osobnych wiadomości mają pełny tekst
+            chat_text=payload.get("chat_text"),
+            title=payload.get("title", ""),
+            last_message=payload.get("last_message", ""),
+            message_count=payload["message_count"],
+            mode="chat_session"
+        )
+    
+    def _chat_message_from_point(self, point):
+        """Konwertuje punkt wiadomości czatu na słownik wiadomości"""
+        payload = point.payload
+        return {
+            "role": payload["role"],
+            "content": decompress_value(payload["content"]),
+            "timestamp": _parse_timestamp(payload["timestamp"]),
+            "seq": payload[QDRANT_SEQUENCE_FIELD]
+        }
+    
+    def _tips_from_point(self, point):
+        """Konwertuje punkt z magazynu na rekord wskazówek do nauki"""
+        payload = point.payload
+        return TipsRecord(
+            id=point.id,
+            timestamp=_parse_timestamp(payload["timestamp"]),
+            language=payload["language"],
+            tips_text=payload["tips_text"],
+            tips_count=payload["tips_count"],
+            mode="learning_tips"
+        )
+    
+    def _item_builder(self, history_type):
+        """Zwraca funkcję konwertującą punkty dla danego typu historii"""
+        return {
+            "translations": self._translation_from_point,
+            "corrections": self._correction_from_point,
+            "chat_sessions": self._chat_session_from_point,
+            "tips_history": self._tips_from_point
+        }[history_type]
+    
+    def _cache_saved_point(self, point, history_type):
+        """
+        Dopisuje zapisany punkt do listy historii w cache zamiast jej unieważniania
+        
+        Odczyt po zapisie nie wymaga wtedy ponownego pobrania listy z bazy; w razie błędu
+        cache jest unieważniany.
+        """
         try:
-            if self.qdrant_api_key:
-                self.client = QdrantClient(
-                    url=self.qdrant_url, 
-                    api_key=self.qdrant_api_key,
-                    timeout=QDRANT_TIMEOUT
-                )
-            else:
-                self.client = QdrantClient(
-                    url=self.qdrant_url,
-                    timeout=QDRANT_TIMEOUT
-                )
-            log_database_operation("Połączenie z Qdrant", True, f"URL: {self.qdrant_url}")
+            cache_history_item(history_type, self._item_builder(history_type)(point), MAX_HISTORY_LIMIT)
+        except Exception as e:
+            log_debug(f"Aktualizacja cache {history_type} nieudana: {str(e)}")
+            invalidate_cache(history_type)
+    
+    def get_audio(self, item):
+        """Pobiera dane audio dla elementu historii (leniwie, z magazynu plików)"""
+        audio_ref = item.get("audio_ref")
+        if not audio_ref:
+            return None
+        return audio_store.get(audio_ref["audio_sha256"], audio_ref["audio_format"])
+    
+    def history_cursor(self, items, previous_cursor=None):
+        """
+        Buduje nieprzezroczysty kursor wskazujący na koniec podanej listy elementów
+        
+        Args:
+            items: Elementy historii posortowane od najnowszych
+            previous_cursor: Kursor poprzedniej strony (do obsługi identycznych znaczników czasu)
+        
+        Returns:
+            str: Kursor lub None dla pustej listy
+        """
+        if not items:
+            return None
+        
+        last_ts = items[-1]["timestamp"].replace(tzinfo=timezone.utc).timestamp()
+        ids = [str(item["id"]) for item in items
+               if item["timestamp"].replace(tzinfo=timezone.utc).timestamp() == last_ts]
+        
+        # Elementy z tym samym znacznikiem czasu mogą być rozłożone na kilka stron
+        if previous_cursor:
+            position = _decode_cursor(previous_cursor)
+            if position["ts"] == last_ts:
+                ids = position["ids"] + ids
+        
+        return _encode_cursor({"ts": last_ts, "ids": ids})
+    
+    def is_past_cursor(self, item, cursor):
+        """
+        Sprawdza, czy element leży za pozycją kursora (na stronach zwracanych od tego kursora)
+        
+        Args:
+            item: Element historii
+            cursor: Kursor zwrócony przez history_cursor lub get_history_page
+        
+        Returns:
+            bool: True dla elementów starszych niż pozycja kursora
+        """
+        position = _decode_cursor(cursor)
+        item_ts = item["timestamp"].replace(tzinfo=timezone.utc).timestamp()
+        return item_ts < position["ts"] or (item_ts == position["ts"] and str(item["id"]) not in position["ids"])
+    
+    def _page_start(self, cursor):
+        """Zwraca początek strony historii dla kursora: (znacznik czasu, ID już zwróconych punktów)"""
+        if not cursor:
+            return None, None
+        position = _decode_cursor(cursor)
+        return position["ts"], position["ids"]
+    
+    def _history_page(self, history_type, points, page_size, cursor):
+        """Buduje stronę historii z punktów pobranych z jednym zapasowym (wskazuje kolejną stronę)"""
+        build_item = self._item_builder(history_type)
+        items = [build_item(point) for point in points[:page_size]]
+        next_cursor = self.history_cursor(items, cursor) if len(points) > page_size else None
+        
+        log_debug(f"get_history_page - {history_type}: {len(items)} elementów, kolejna strona: {next_cursor is not None}")
+        return items, next_cursor
+    
+    def _message_page(self, session_id, points, page_size):
+        """Buduje stronę wiadomości czatu z punktów pobranych z jednym zapasowym"""
+        messages = [self._chat_message_from_point(point) for point in points[:page_size]]
+        next_cursor = _encode_cursor({"seq": messages[-1]["seq"]}) if len(points) > page_size else None
+        
+        log_debug(f"get_chat_messages - {session_id}: {len(messages)} wiadomości, kolejna strona: {next_cursor is not None}")
+        return messages, next_cursor
+    
+    def _similar_items(self, mode, hits):
+        """Konwertuje wyniki wyszukiwania wektorowego na elementy historii z polem score"""
+        history_type = next(name for name, modes in HISTORY_MODES.items() if mode in modes)
+        build_item = self._item_builder(history_type)
+        
+        results = []
+        for hit in hits:
+            item = build_item(hit)
+            item["score"] = hit.score
+            results.append(item)
+        
+        log_debug(f"search_similar - {mode}: {len(results)} wyników")
+        return results
+    
+    def _analysis_selector(self, language=None, word=None, vocabulary_level=None, rule_name=None, grammar_level=None):
+        """Buduje selektor analiz - warunki słownictwa i reguł dotyczą jednego elementu listy"""
+        nested = {}
+        vocabulary_match = {name: value for name, value in (("word", word), ("difficulty_level", vocabulary_level)) if value}
+        grammar_match = {name: value for name, value in (("rule_name", rule_name), ("difficulty_level", grammar_level)) if value}
+        if vocabulary_match:
+            nested["vocabulary_items"] = vocabulary_match
+        if grammar_match:
+            nested["grammar_rules"] = grammar_match
+        return PointSelector(modes=["analysis"], language=language, nested=nested or None)
+
+class LanguageHelperDB(HistoryRecords):
+    """Klasa do obsługi bazy danych historii dla aplikacji Language Helper"""
+    
+    def __init__(self, collection_name=None):
+        """
+        Inicjalizacja połączenia z bazą danych
+        
+        Args:
+            collection_name: Nazwa kolekcji (domyślnie z QDRANT_COLLECTION_NAME)
+        """
+        self.collection_name = collection_name or os.getenv("QDRANT_COLLECTION_NAME", QDRANT_DEFAULT_COLLECTION)
+        
+        # Inicjalizacja magazynu danych (zdalny Qdrant, Qdrant lokalny lub SQLite - wg STORAGE_BACKEND)
+        try:
+            self.backend = create_backend(self.collection_name)
+            log_database_operation("Połączenie z bazą danych", True, f"Magazyn: {self.backend.name}")
         except Exception as e:
-            log_database_operation("Połączenie z Qdrant", False, str(e))
-            self.client = None
+            log_database_operation("Połączenie z bazą danych", False, str(e))
+            self.backend = None
+        
+        # Statystyki w cache osobno dla każdego magazynu i kolekcji
+        self._stats_key = f"db_stats:{self.backend.name if self.backend else None}:{self.collection_name}"
+        
+        # Zapisy wysyłane partiami z wątku w tle (jeden upsert na partię)
+        self._writer = WriteBehindQueue(self._upsert_batch, on_failure=self._on_write_failure)
+        # ID sesji czatu -> numer pierwszej wiadomości utraconej przez kolejkę zapisów
+        self._dropped_chat_messages = {}
+        self._dropped_lock = threading.Lock()
+        
+        # Lokalny silnik embeddingów (wektory dla wyszukiwania podobnych wpisów)
+        self.embedder = get_global_embedding_engine()
         
         # Utworzenie kolekcji jeśli nie istnieje
         self._create_collection_if_not_exists()
     
     def _create_collection_if_not_exists(self):
-        """Tworzy kolekcję w Qdrant jeśli nie istnieje"""
+        """Tworzy kolekcję w magazynie jeśli nie istnieje"""
         try:
-            collections = self.client.get_collections()
-            collection_names = [col.name for col in collections.collections]
+            if self.backend.ensure_schema():
+                return
             
-            if self.collection_name not in collection_names:
-                # Utworzenie kolekcji z wektorami (dla embeddings)
-                self.client.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config=VectorParams(size=QDRANT_VECTOR_SIZE, distance=Distance.COSINE)
-                )
-                log_database_operation("Tworzenie kolekcji", True, f"Kolekcja: {self.collection_name}")
-            else:
-                log_database_operation("Sprawdzanie kolekcji", True, f"Kolekcja {self.collection_name} już istnieje")
+            log_database_operation("Sprawdzanie kolekcji", True, f"Kolekcja {self.collection_name} już istnieje")
+            # Starsze kolekcje mogą nie mieć numerycznego znacznika czasu, audio w magazynie plików
+            # ani natywnych list analiz
+            self._backfill_timestamps()
+            self.migrate_inline_audio()
+            self.migrate_analysis_payloads()
         except Exception as e:
             log_database_operation("Tworzenie kolekcji", False, str(e))
     
+    def _backfill_timestamps(self):
+        """Uzupełnia numeryczny znacznik czasu w punktach zapisanych przed jego wprowadzeniem"""
+        updated = 0
+        
+        for point in self.backend.iter_points(missing_field=QDRANT_TIMESTAMP_FIELD):
+            if not point.payload.get("timestamp"):
+                continue
+            timestamp = datetime.fromisoformat(point.payload["timestamp"])
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            self.backend.set_payload(point.id, {QDRANT_TIMESTAMP_FIELD: timestamp.timestamp()})
+            updated += 1
+        
+        if updated:
+            log_database_operation("Uzupełnianie znaczników czasu", True, f"Zaktualizowano {updated} punktów")
+    
+    def _upsert_batch(self, points):
+        """Zapisuje partię punktów z kolejki w tle jednym wywołaniem upsert"""
+        self.backend.upsert(points)
+        log_database_operation("Zapis partii", True, f"{len(points)} punktów")
+    
+    def _on_write_failure(self, points):
+        """Obsługuje partię odrzuconą przez kolejkę zapisów"""
+        log_database_operation("Zapis partii", False, f"Utracono {len(points)} punktów: {[point.id for point in points]}")
+        history_types = set()
+        with self._dropped_lock:
+            for point in points:
+                mode = point.payload.get("mode")
+                if mode == CHAT_MESSAGE_MODE:
+                    # Następny zapis sesji wyśle wiadomości ponownie od pierwszej utraconej
+                    session_id, seq = point.payload["session_id"], point.payload[QDRANT_SEQUENCE_FIELD]
+                    self._dropped_chat_messages[session_id] = min(seq, self._dropped_chat_messages.get(session_id, seq))
+                    history_types.add("chat_sessions")
+                else:
+                    history_types.update(name for name, modes in HISTORY_MODES.items() if mode in modes)
+        
+        # Cache tych typów mógł zostać uzupełniony w oczekiwaniu na zapis - wymuś ponowny odczyt
+        self.invalidate_history_cache(history_types)
+    
+    def _unsaved_chat_start(self, session_id, saved_count):
+        """Zwraca numer pierwszej wiadomości sesji do zapisania - cofnięty do wiadomości utraconej w tle"""
+        with self._dropped_lock:
+            dropped_from = self._dropped_chat_messages.pop(session_id, None)
+        return saved_count if dropped_from is None else min(saved_count, dropped_from)
+    
+    def invalidate_history_cache(self, history_types=None):
+        """
+        Unieważnia w cache listy historii i statystyki bazy
+        
+        Pozostałe wpisy (np. odpowiedzi modelu w przestrzeni "llm") nie zależą od zawartości
+        bazy i zostają - także w magazynie współdzielonym (L2).
+        
+        Args:
+            history_types: Typy historii do unieważnienia (None = wszystkie)
+        """
+        for history_type in HISTORY_MODES if history_types is None else history_types:
+            invalidate_cache(history_type)
+        invalidate_cache(self._stats_key)
+    
+    def _sync_pending_writes(self):
+        """Czeka na zapis punktów z kolejki w tle, aby odczyt widział własne zapisy"""
+        if self._writer.depth():
+            self._writer.flush()
+    
+    def pending_writes(self):
+        """Zwraca liczbę punktów oczekujących w kolejce zapisów"""
+        return self._writer.depth()
+    
+    def migrate_inline_audio(self):
+        """
+        Przenosi audio zapisane w payloadzie jako base64 do magazynu plików
+        
+        Returns:
+            int: Liczba zmigrowanych punktów
+        """
+        migrated = 0
+        
+        try:
+            for point in self.backend.iter_points(has_field="audio_data"):
+                audio_ref = audio_store.put(base64.b64decode(point.payload["audio_data"]))
+                self.backend.set_payload(point.id, audio_ref)
+                self.backend.delete_payload(point.id, ["audio_data"])
+                migrated += 1
+            
+            if migrated:
+                invalidate_cache("translations")
+                log_database_operation("Migracja audio do magazynu plików", True, f"Zmigrowano {migrated} punktów")
+            return migrated
+        
+        except Exception as e:
+            log_database_operation("Migracja audio do magazynu plików", False, str(e))
+            return migrated
+    
+    def migrate_analysis_payloads(self):
+        """
+        Zamienia analizy zapisane jako JSON (analysis_data) na natywne listy w payloadzie
+        
+        Returns:
+            int: Liczba zmigrowanych punktów
+        """
+        migrated = 0
+        
+        try:
+            for point in self.backend.iter_points(has_field="analysis_data"):
+                analysis_dict = json.loads(decompress_value(point.payload["analysis_data"]))
+                self.backend.set_payload(point.id, {name: analysis_dict.get(name, []) for name in ANALYSIS_FIELDS})
+                self.backend.delete_payload(point.id, ["analysis_data"])
+                migrated += 1
+            
+            if migrated:
+                invalidate_cache("corrections")
+                log_database_operation("Migracja analiz do natywnego payloadu", True, f"Zmigrowano {migrated} punktów")
+            return migrated
+        
+        except Exception as e:
+            log_database_operation("Migracja analiz do natywnego payloadu", False, str(e))
+            return migrated
+    
+    def _scroll_latest(self, modes, limit, language=None):
+        """Pobiera z magazynu najnowsze punkty podanych trybów (filtr + sortowanie po czasie)"""
+        self._sync_pending_writes()
+        return self.backend.query(modes, max(limit or 0, MAX_HISTORY_LIMIT), language)
+    
+    def _save_point(self, point, history_type):
+        """Umieszcza punkt w kolejce zapisu i dopisuje go do cache danego typu historii"""
+        return self._save_points([point], history_type)
+    
+    def _save_points(self, points, history_type, new_points=None):
+        """
+        Umieszcza punkty w kolejce zapisu i dopisuje nowy element do cache danego typu historii
+        
+        Args:
+            points: Punkty do zapisania
+            history_type: Typ historii (klucz cache)
+            new_points: Punkty dodawane (a nie nadpisywane) - do statystyk; domyślnie wszystkie
+        """
+        # Zapisanie do bazy danych w tle - ID zwracane od razu
+        for point in points:
+            self._writer.put(point)
+        
+        # Pierwszy punkt to element historii (dla czatu nagłówek sesji) - dopisz go do cache;
+        # nieudany zapis w tle unieważnia cache (_on_write_failure)
+        self._cache_saved_point(points[0], history_type)
+        self._record_write_stats(points if new_points is None else new_points)
+        return points[0].id
+    
     def save_translation(self, input_text, output_text, target_language, mode="translation", audio_data=None, voice=None):
         """Zapisuje tłumaczenie do bazy danych"""
-        log_debug(f"save_translation - Client exists: {self.client is not None}, Input text: {input_text[:50]}..., Target language: {target_language}")
+        log_debug(f"save_translation - Backend exists: {self.backend is not None}, Input text: {input_text[:50]}..., Target language: {target_language}")
         
-        if not self.client:
-            log_database_operation("Zapisywanie tłumaczenia", False, "Brak połączenia z bazą danych Qdrant")
+        if not self.backend:
+            log_database_operation("Zapisywanie tłumaczenia", False, "Brak połączenia z bazą danych")
             return None
         
         try:
-            # Generowanie unikalnego ID
-            point_id = str(uuid.uuid4())
-            
-            # Przygotowanie metadanych
-            metadata = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "input_text": input_text,
-                "output_text": output_text,
-                "target_language": target_language,
-                "mode": mode,
-                "voice": voice,
-                "has_audio": audio_data is not None
-            }
-            
-            # Jeśli jest audio, zapisz je jako base64
-            if audio_data:
-                import base64
-                metadata["audio_data"] = base64.b64encode(audio_data).decode('utf-8')
-            
-            # Tworzenie punktu w bazie danych
-            point = PointStruct(
-                id=point_id,
-                vector=[0.0] * QDRANT_VECTOR_SIZE,  # Placeholder vector
-                payload=metadata
-            )
-            
-            # Zapisanie do bazy danych
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[point]
-            )
-            
-            # Unieważnij cache po zapisaniu
-            invalidate_cache("translations")
+            point = self._translation_point(input_text, output_text, target_language, mode, audio_data, voice)
+            point_id = self._save_point(point, "translations")
             
-            log_database_operation("Zapisywanie tłumaczenia", True, f"ID: {point_id}")
+            log_database_operation("Zapisywanie tłumaczenia", True, f"ID: {point_id} (w kolejce zapisu)")
             return point_id
-            
+        
         except Exception as e:
             log_database_operation("Zapisywanie tłumaczenia", False, str(e))
             return None
     
     def save_correction(self, input_text, output_text, explanation, language, mode="correction", analysis_data=None):
         """Zapisuje poprawkę lub analizę do bazy danych"""
-        if not self.client:
-            log_database_operation(f"Zapisywanie {mode}", False, "Brak połączenia z bazą danych Qdrant")
+        if not self.backend:
+            log_database_operation(f"Zapisywanie {mode}", False, "Brak połączenia z bazą danych")
             return None
         
         try:
-            # Generowanie unikalnego ID
-            point_id = str(uuid.uuid4())
-            
-            # Przygotowanie metadanych
-            metadata = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "input_text": input_text,
-                "output_text": output_text,
-                "language": language,
-                "mode": mode
-            }
-            
-            # Dodaj specyficzne pola dla każdego trybu
-            if mode == "correction":
-                metadata["explanation"] = explanation
-            elif mode == "analysis" and analysis_data:
-                # Serializuj dane analizy jako JSON
-                import json
-                # Konwertuj obiekt Pydantic na słownik
-                analysis_dict = analysis_data.dict() if hasattr(analysis_data, 'dict') else analysis_data
-                metadata["analysis_data"] = json.dumps(analysis_dict)
-            elif mode == "exercise" and analysis_data:  # analysis_data zawiera dane ćwiczenia
-                # Serializuj dane ćwiczenia jako JSON
-                import json
-                metadata["exercise_data"] = json.dumps(analysis_data)
-            
-            # Tworzenie punktu w bazie danych
-            point = PointStruct(
-                id=point_id,
-                vector=[0.0] * QDRANT_VECTOR_SIZE,  # Placeholder vector
-                payload=metadata
-            )
+            point = self._correction_point(input_text, output_text, explanation, language, mode, analysis_data)
+            point_id = self._save_point(point, "corrections")
             
-            # Zapisanie do bazy danych
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[point]
-            )
-            
-            # Unieważnij cache po zapisaniu
-            invalidate_cache("corrections")
-            
-            log_database_operation(f"Zapisywanie {mode}", True, f"ID: {point_id}")
+            log_database_operation(f"Zapisywanie {mode}", True, f"ID: {point_id} (w kolejce zapisu)")
             if mode == "analysis":
-                log_debug("Analiza została zapisana w formacie JSON zamiast pickle")
+                log_debug(f"Analiza zapisana jako natywne listy payloadu: {', '.join(ANALYSIS_FIELDS)}")
             return point_id
-            
+        
         except Exception as e:
             log_database_operation(f"Zapisywanie {mode}", False, str(e))
             return None
     
-    def save_chat_session(self, messages: list, language: str, context: str = ""):
-        """Zapisuje sesję czatu do bazy danych"""
+    def save_chat_session(self, messages: list, language: str, context: str = "", session_id: str = None, saved_count: int = 0):
+        """
+        Zapisuje sesję czatu do bazy danych - dopisuje tylko wiadomości, których jeszcze nie zapisano
+        
+        Args:
+            messages: Wszystkie wiadomości rozmowy
+            language: Język rozmowy
+            context: Kontekst rozmowy
+            session_id: ID sesji zwrócone przez poprzedni zapis tej rozmowy (None = nowa rozmowa)
+            saved_count: Liczba wiadomości zapisanych poprzednio (wiadomości utracone przez
+                kolejkę zapisów są wysyłane ponownie mimo to)
+        
+        Returns:
+            str: Stałe ID sesji (do kolejnych zapisów) lub None w przypadku błędu
+        """
+        if not self.backend:
+            log_database_operation("Zapisywanie sesji czatu", False, "Brak połączenia z bazą danych")
+            return None
+        
         try:
-            # Generowanie unikalnego ID
-            point_id = str(uuid.uuid4())
-            
-            # Przygotowanie metadanych
-            metadata = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "language": language,
-                "context": context,
-                "mode": "chat_session"
-            }
-            
-            # Konwertuj wiadomości na string
-            chat_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
-            
-            # Tworzenie punktu w bazie danych
-            point = PointStruct(
-                id=point_id,
-                vector=[0.0] * QDRANT_VECTOR_SIZE,  # Placeholder vector
-                payload={
-                    **metadata,
-                    "chat_text": chat_text,
-                    "message_count": len(messages)
-                }
-            )
-            
-            # Zapisanie do bazy danych
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[point]
-            )
-            
-            # Unieważnij cache po zapisaniu
-            invalidate_cache("chat_sessions")
-            
-            log_database_operation("Zapisywanie sesji czatu", True, f"ID: {point_id}")
-            return point_id
+            if session_id is None:
+                session_id, saved_count = str(uuid.uuid4()), 0
+            else:
+                saved_count = self._unsaved_chat_start(session_id, saved_count)
+            points = self._chat_session_points(messages, language, context, session_id, saved_count)
+            # Nagłówek istniejącej sesji jest nadpisywany - nie zwiększa liczby punktów
+            self._save_points(points, "chat_sessions", new_points=points if saved_count == 0 else points[1:])
             
+            log_database_operation("Zapisywanie sesji czatu", True, f"ID: {session_id}, nowe wiadomości: {len(points) - 1} (w kolejce zapisu)")
+            return session_id
+        
         except Exception as e:
             log_database_operation("Zapisywanie sesji czatu", False, str(e))
             return None
     
     def save_learning_tips(self, tips: list, language: str):
         """Zapisuje wskazówki do nauki do bazy danych"""
+        if not self.backend:
+            log_database_operation("Zapisywanie wskazówek", False, "Brak połączenia z bazą danych")
+            return None
+        
         try:
-            # Generowanie unikalnego ID
-            point_id = str(uuid.uuid4())
-            
-            # Przygotowanie metadanych
-            metadata = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "language": language,
-                "mode": "learning_tips"
-            }
+            point_id = self._save_point(self._tips_point(tips, language), "tips_history")
             
-            tips_text = "\n".join(tips)
-            
-            # Tworzenie punktu w bazie danych
-            point = PointStruct(
-                id=point_id,
-                vector=[0.0] * QDRANT_VECTOR_SIZE,  # Placeholder vector
-                payload={
-                    **metadata,
-                    "tips_text": tips_text,
-                    "tips_count": len(tips)
-                }
-            )
-            
-            # Zapisanie do bazy danych
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[point]
-            )
-            
-            # Unieważnij cache po zapisaniu
-            invalidate_cache("tips_history")
-            
-            log_database_operation("Zapisywanie wskazówek", True, f"ID: {point_id}")
+            log_database_operation("Zapisywanie wskazówek", True, f"ID: {point_id} (w kolejce zapisu)")
             return point_id
-            
+        
         except Exception as e:
             log_database_operation("Zapisywanie wskazówek", False, str(e))
             return None
     
     def get_translations(self, limit=50):
         """Pobiera tłumaczenia z bazy danych z cache"""
-        # Sprawdź cache najpierw
-        cached_translations = get_cached_translations()
-        if cached_translations is not None:
-            log_debug(f"get_translations - zwracam z cache: {len(cached_translations)} tłumaczeń")
-            return cached_translations[:limit] if limit else cached_translations
+        log_debug(f"get_translations - Backend exists: {self.backend is not None}, Limit: {limit}")
         
-        log_debug(f"get_translations - Client exists: {self.client is not None}, Limit: {limit}")
-        
-        if not self.client:
-            log_database_operation("Pobieranie tłumaczeń", False, "Brak połączenia z bazą danych Qdrant")
+        if not self.backend:
+            log_database_operation("Pobieranie tłumaczeń", False, "Brak połączenia z bazą danych")
             return []
         
         try:
-            # Pobieranie punktów z bazy danych - używamy MAX_HISTORY_LIMIT jak w get_corrections
-            points = self.client.scroll(
-                collection_name=self.collection_name,
-                limit=MAX_HISTORY_LIMIT,  # Zmienione z limit na MAX_HISTORY_LIMIT
-                with_payload=True,
-                with_vectors=False
-            )[0]
-            
-            log_debug(f"get_translations - pobrano {len(points)} punktów")
-            
-            translations = []
-            for point in points:
-                payload = point.payload
-                log_debug(f"punkt: mode={payload.get('mode')}, timestamp={payload.get('timestamp')}")
-                if payload.get("mode") == "translation":
-                    # Konwersja audio z base64 jeśli istnieje
-                    audio_data = None
-                    if payload.get("has_audio") and "audio_data" in payload:
-                        import base64
-                        audio_data = base64.b64decode(payload["audio_data"])
-                    
-                    translation = {
-                        "id": point.id,
-                        "timestamp": datetime.fromisoformat(payload["timestamp"]).replace(tzinfo=None),
-                        "input": payload["input_text"],
-                        "output": payload["output_text"],
-                        "target_language": payload["target_language"],
-                        "mode": "translation",
-                        "audio_data": audio_data,
-                        "voice": payload.get("voice")
-                    }
-                    translations.append(translation)
-            
-            # Sortowanie po timestamp (najnowsze pierwsze)
-            translations.sort(key=lambda x: x["timestamp"], reverse=True)
-            
-            # Zapisz w cache
-            cache_translations(translations)
+            # Serwer zwraca tylko najnowsze tłumaczenia (filtr po trybie, sortowanie po czasie)
+            translations = get_or_load_history("translations", lambda: self._fetch_history("translations", limit))
             
             log_debug(f"get_translations - zwracam {len(translations)} tłumaczeń")
             return translations[:limit] if limit else translations
-            
+        
         except Exception as e:
             log_database_operation("Pobieranie tłumaczeń", False, str(e))
             return []
     
     def get_corrections(self, limit=50):
         """Pobiera poprawki i analizy z bazy danych z cache"""
-        # Sprawdź cache najpierw
-        cached_corrections = get_cached_corrections()
-        if cached_corrections is not None:
-            log_debug(f"get_corrections - zwracam z cache: {len(cached_corrections)} poprawek")
-            return cached_corrections[:limit] if limit else cached_corrections
-        
         try:
-            # Pobieranie punktów z bazy danych
-            points = self.client.scroll(
-                collection_name=self.collection_name,
-                limit=MAX_HISTORY_LIMIT,
-                with_payload=True,
-                with_vectors=False
-            )[0]
-            
-            corrections = []
-            for point in points:
-                payload = point.payload
-                if payload.get("mode") in ["correction", "analysis", "exercise"]:
-                    # Podstawowe dane
-                    item = {
-                        "id": point.id,
-                        "timestamp": datetime.fromisoformat(payload["timestamp"]).replace(tzinfo=None),
-                        "input": payload["input_text"],
-                        "output": payload["output_text"],
-                        "language": payload["language"],
-                        "mode": payload["mode"]
-                    }
-                    
-                    # Dodaj specyficzne pola dla każdego trybu
-                    if payload.get("mode") == "correction":
-                        item["explanation"] = payload["explanation"]
-                    elif payload.get("mode") == "analysis":
-                        # Dla analiz, deserializuj dane z JSON
-                        if "analysis_data" in payload:
-                            import json
-                            try:
-                                analysis_dict = json.loads(payload["analysis_data"])
-                                # Rekonstruuj obiekt analizy z słownika
-                                from types import SimpleNamespace
-                                
-                                # Rekonstruuj vocabulary_items
-                                vocabulary_items = []
-                                for vocab_dict in analysis_dict.get('vocabulary_items', []):
-                                    vocab_obj = SimpleNamespace(**vocab_dict)
-                                    vocabulary_items.append(vocab_obj)
-                                
-                                # Rekonstruuj grammar_rules
-                                grammar_rules = []
-                                for rule_dict in analysis_dict.get('grammar_rules', []):
-                                    rule_obj = SimpleNamespace(**rule_dict)
-                                    grammar_rules.append(rule_obj)
-                                
-                                # Rekonstruuj cały obiekt analizy
-                                analysis_obj = SimpleNamespace(
-                                    vocabulary_items=vocabulary_items,
-                                    grammar_rules=grammar_rules,
-                                    learning_tips=analysis_dict.get('learning_tips', [])
-                                )
-                                item["analysis"] = analysis_obj
-                            except Exception as e:
-                                log_error(f"Błąd deserializacji analizy: {str(e)}")
-                                item["analysis"] = None
-                    elif payload.get("mode") == "exercise":
-                        # Dla ćwiczeń, deserializuj dane z JSON
-                        if "exercise_data" in payload:
-                            import json
-                            try:
-                                exercise_dict = json.loads(payload["exercise_data"])
-                                item["exercise"] = exercise_dict
-                            except Exception as e:
-                                log_error(f"Błąd deserializacji ćwiczenia: {str(e)}")
-                                item["exercise"] = None
-                    
-                    corrections.append(item)
-            
-            # Sortowanie po timestamp (najnowsze pierwsze)
-            corrections.sort(key=lambda x: x["timestamp"], reverse=True)
-            
-            # Zapisz w cache
-            cache_corrections(corrections)
+            # Serwer zwraca tylko najnowsze poprawki, analizy i ćwiczenia
+            corrections = get_or_load_history("corrections", lambda: self._fetch_history("corrections", limit))
             
             return corrections[:limit] if limit else corrections
-            
+        
         except Exception as e:
             log_database_operation("Pobieranie poprawek i analiz", False, str(e))
             return []
     
     def get_chat_sessions(self, limit=20):
         """Pobiera sesje czatu z bazy danych z cache"""
-        # Sprawdź cache najpierw
-        cached_sessions = get_cached_chat_sessions()
-        if cached_sessions is not None:
-            log_debug(f"get_chat_sessions - zwracam z cache: {len(cached_sessions)} sesji")
-            return cached_sessions[:limit] if limit else cached_sessions
-        
         try:
-            points = self.client.scroll(
-                collection_name=self.collection_name,
-                limit=limit,
-                with_payload=True,
-                with_vectors=False
-            )[0]
-            
-            chat_sessions = []
-            for point in points:
-                payload = point.payload
-                if payload.get("mode") == "chat_session":
-                    chat_session = {
-                        "id": point.id,
-                        "timestamp": datetime.fromisoformat(payload["timestamp"]).replace(tzinfo=None),
-                        "language": payload["language"],
-                        "context": payload.get("context", ""),
-                        "chat_text": payload["chat_text"],
-                        "message_count": payload["message_count"],
-                        "mode": "chat_session"
-                    }
-                    chat_sessions.append(chat_session)
-            
-            # Sortowanie po timestamp (najnowsze pierwsze)
-            chat_sessions.sort(key=lambda x: x["timestamp"], reverse=True)
-            
-            # Zapisz w cache
-            cache_chat_sessions(chat_sessions)
+            chat_sessions = get_or_load_history("chat_sessions", lambda: self._fetch_history("chat_sessions", limit))
             
             return chat_sessions[:limit] if limit else chat_sessions
-            
+        
         except Exception as e:
             log_database_operation("Pobieranie sesji czatu", False, str(e))
             return []
     
     def get_learning_tips_history(self, limit=20):
         """Pobiera historię wskazówek do nauki z bazy danych z cache"""
-        # Sprawdź cache najpierw
-        cached_tips = get_cached_tips_history()
-        if cached_tips is not None:
-            log_debug(f"get_learning_tips_history - zwracam z cache: {len(cached_tips)} wskazówek")
-            return cached_tips[:limit] if limit else cached_tips
-        
         try:
-            points = self.client.scroll(
-                collection_name=self.collection_name,
-                limit=limit,
-                with_payload=True,
-                with_vectors=False
-            )[0]
-            
-            tips_history = []
-            for point in points:
-                payload = point.payload
-                
-                if payload.get("mode") == "learning_tips":
-                    tips_history_item = {
-                        "id": point.id,
-                        "timestamp": datetime.fromisoformat(payload["timestamp"]).replace(tzinfo=None),
-                        "language": payload["language"],
-                        "tips_text": payload["tips_text"],
-                        "tips_count": payload["tips_count"],
-                        "mode": "learning_tips"
-                    }
-                    tips_history.append(tips_history_item)
-            
-            # Sortowanie po timestamp (najnowsze pierwsze)
-            tips_history.sort(key=lambda x: x["timestamp"], reverse=True)
-            
-            # Zapisz w cache
-            cache_tips_history(tips_history)
+            tips_history = get_or_load_history("tips_history", lambda: self._fetch_history("tips_history", limit))
             
             return tips_history[:limit] if limit else tips_history
-            
+        
         except Exception as e:
             log_database_operation("Pobieranie historii wskazówek", False, str(e))
             return []
     
+    def _fetch_history(self, history_type, limit):
+        """
+        Pobiera najnowsze elementy danego typu z bazy
+        
+        Wywoływane przez get_or_load_history - przy jednoczesnym braku w cache w wielu
+        sesjach Streamlit zapytanie do bazy wykonuje tylko jedna z nich.
+        """
+        points = self._scroll_latest(HISTORY_MODES[history_type], limit)
+        build_item = self._item_builder(history_type)
+        return [build_item(point) for point in points]
+    
+    def load_history_snapshot(self, limit=DEFAULT_HISTORY_LIMIT):
+        """
+        Pobiera wszystkie typy historii naraz - z cache lub równoległymi zapytaniami filtrowanymi
+        
+        Args:
+            limit: Maksymalna liczba elementów każdego typu
+        
+        Returns:
+            dict: Typ historii -> lista elementów (najnowsze pierwsze)
+        """
+        if not self.backend:
+            log_database_operation("Pobieranie historii", False, "Brak połączenia z bazą danych")
+            return {history_type: [] for history_type in HISTORY_MODES}
+        
+        # Każdy typ przez get_or_load_history (single-flight, nieświeże listy odświeżane w tle);
+        # brakujące typy ładowane równoległymi zapytaniami
+        with ThreadPoolExecutor(max_workers=len(HISTORY_MODES)) as executor:
+            futures = {
+                history_type: executor.submit(
+                    get_or_load_history, history_type, lambda history_type=history_type: self._fetch_history(history_type, limit)
+                )
+                for history_type in HISTORY_MODES
+            }
+        
+        snapshot = {}
+        for history_type, future in futures.items():
+            try:
+                items = future.result()
+                snapshot[history_type] = items[:limit] if limit else items
+            except Exception as e:
+                log_database_operation(f"Pobieranie historii ({history_type})", False, str(e))
+                snapshot[history_type] = []
+        
+        return snapshot
+    
+    def get_history_page(self, history_type, page_size=DEFAULT_HISTORY_LIMIT, cursor=None, language=None):
+        """
+        Pobiera jedną stronę historii (od najnowszych), z możliwością wznowienia od kursora
+        
+        Args:
+            history_type: Typ historii ("translations", "corrections", "chat_sessions", "tips_history")
+            page_size: Liczba elementów na stronie
+            cursor: Kursor zwrócony przez poprzednie wywołanie (None = pierwsza strona)
+            language: Opcjonalny filtr języka
+        
+        Returns:
+            tuple: (lista elementów, kursor następnej strony lub None gdy brak starszych)
+        """
+        if not self.backend:
+            log_database_operation("Pobieranie strony historii", False, "Brak połączenia z bazą danych")
+            return [], None
+        
+        try:
+            self._sync_pending_writes()
+            # Start od znacznika czasu kursora, z pominięciem już zwróconych punktów
+            start_from, exclude_ids = self._page_start(cursor)
+            
+            # Pobierz jeden punkt więcej, aby wiedzieć czy istnieje kolejna strona
+            points = self.backend.query(
+                HISTORY_MODES[history_type],
+                page_size + 1,
+                language=language,
+                start_from=start_from,
+                exclude_ids=exclude_ids
+            )
+            return self._history_page(history_type, points, page_size, cursor)
+        
+        except Exception as e:
+            log_database_operation("Pobieranie strony historii", False, str(e))
+            return [], None
+    
+    def get_chat_messages(self, session_id, page_size=CHAT_MESSAGES_PAGE_SIZE, cursor=None):
+        """
+        Pobiera jedną stronę wiadomości sesji czatu (od najstarszych)
+        
+        Args:
+            session_id: ID sesji czatu
+            page_size: Liczba wiadomości na stronie
+            cursor: Kursor zwrócony przez poprzednie wywołanie (None = pierwsza strona)
+        
+        Returns:
+            tuple: (lista wiadomości, kursor następnej strony lub None gdy brak kolejnych)
+        """
+        if not self.backend:
+            log_database_operation("Pobieranie wiadomości czatu", False, "Brak połączenia z bazą danych")
+            return [], None
+        
+        try:
+            self._sync_pending_writes()
+            after_seq = _decode_cursor(cursor)["seq"] if cursor else None
+            
+            # Pobierz jedną wiadomość więcej, aby wiedzieć czy istnieje kolejna strona
+            points = self.backend.query_session(session_id, page_size + 1, after_seq)
+            return self._message_page(session_id, points, page_size)
+        
+        except Exception as e:
+            log_database_operation("Pobieranie wiadomości czatu", False, str(e))
+            return [], None
+    
+    def search_similar(self, text, mode, language=None, k=5):
+        """
+        Wyszukuje wpisy historii podobne do tekstu (indeks HNSW w Qdrant, przeszukanie liniowe w SQLite)
+        
+        Args:
+            text: Tekst zapytania
+            mode: Tryb wpisów (np. "translation", "analysis", "chat_session")
+            language: Opcjonalny filtr języka
+            k: Liczba wyników
+        
+        Returns:
+            list: Elementy historii z dodanym polem "score", od najbardziej podobnych
+        """
+        if not self.backend:
+            log_database_operation("Wyszukiwanie podobnych", False, "Brak połączenia z bazą danych")
+            return []
+        
+        try:
+            self._sync_pending_writes()
+            hits = self.backend.search(self.embedder.embed(text), [mode], k, language)
+            return self._similar_items(mode, hits)
+        
+        except Exception as e:
+            log_database_operation("Wyszukiwanie podobnych", False, str(e))
+            return []
+    
+    def find_analyses(self, language=None, word=None, vocabulary_level=None, rule_name=None,
+                      grammar_level=None, limit=MAX_HISTORY_LIMIT):
+        """
+        Wyszukuje analizy po słownictwie i regułach gramatycznych (filtr wykonywany w magazynie)
+        
+        Warunki słownictwa dotyczą jednego elementu listy (np. słowo na danym poziomie),
+        tak samo warunki reguł gramatycznych.
+        
+        Args:
+            language: Język analizy
+            word: Słowo (lub lista słów) w słownictwie
+            vocabulary_level: Poziom trudności słownictwa (np. "B2")
+            rule_name: Nazwa reguły gramatycznej (np. "Present Perfect")
+            grammar_level: Poziom trudności reguły
+            limit: Maksymalna liczba analiz
+        
+        Returns:
+            list: Rekordy analiz, od najnowszych
+        """
+        if not self.backend:
+            log_database_operation("Wyszukiwanie analiz", False, "Brak połączenia z bazą danych")
+            return []
+        
+        try:
+            self._sync_pending_writes()
+            selector = self._analysis_selector(language, word, vocabulary_level, rule_name, grammar_level)
+            points = self.backend.query_selected(selector, limit)
+            log_debug(f"find_analyses - {selector.nested}: {len(points)} analiz")
+            return [self._correction_from_point(point) for point in points]
+        
+        except Exception as e:
+            log_database_operation("Wyszukiwanie analiz", False, str(e))
+            return []
+    
+    def find_vocabulary(self, language=None, difficulty_level=None, word=None, limit=MAX_HISTORY_LIMIT):
+        """
+        Zwraca słownictwo z analiz spełniające warunki (np. całe słownictwo B2 po niemiecku)
+        
+        Magazyn zwraca tylko analizy zawierające pasujące słowa; z nich wybierane są
+        pasujące elementy (bez powtórzeń słów, od najnowszych analiz).
+        
+        Returns:
+            list: Słowniki elementów słownictwa z polami analysis_id i language
+        """
+        analyses = self.find_analyses(language=language, word=word, vocabulary_level=difficulty_level, limit=limit)
+        words = None if word is None else set(word if isinstance(word, (list, tuple, set)) else [word])
+        levels = None if difficulty_level is None else set(
+            difficulty_level if isinstance(difficulty_level, (list, tuple, set)) else [difficulty_level]
+        )
+        
+        vocabulary, seen = [], set()
+        for analysis in analyses:
+            if not analysis.analysis:
+                continue
+            for vocab in analysis.analysis.vocabulary_items.raw():
+                if words is not None and vocab.get("word") not in words:
+                    continue
+                if levels is not None and vocab.get("difficulty_level") not in levels:
+                    continue
+                if vocab.get("word") in seen:
+                    continue
+                seen.add(vocab.get("word"))
+                vocabulary.append({**vocab, "analysis_id": analysis["id"], "language": analysis["language"]})
+        return vocabulary
+    
     def delete_item(self, item_id):
         """Usuwa element z bazy danych"""
         try:
-            self.client.delete(
-                collection_name=self.collection_name,
-                points_selector=[item_id]
-            )
+            # Element może jeszcze czekać w kolejce - zapis musi wyprzedzić usunięcie
+            self._sync_pending_writes()
+            self.backend.delete([item_id])
+            # Typ elementu nie jest znany - usuń go z każdej listy historii w cache
+            for history_type in HISTORY_MODES:
+                remove_cached_history_item(history_type, item_id)
+            invalidate_cache(self._stats_key)
             log_database_operation("Usuwanie elementu", True, f"ID: {item_id}")
             return True
         except Exception as e:
             log_database_operation("Usuwanie elementu", False, str(e))
             return False
     
+    def delete_chat_session(self, session_id):
+        """
+        Usuwa sesję czatu razem z jej wiadomościami
+        
+        Wiadomości wybierane są filtrem po session_id, a nie po liczbie wiadomości znanej
+        wywołującemu - wiadomości dopisane po jej odczycie też są usuwane.
+        """
+        try:
+            self._sync_pending_writes()
+            # Nagłówek po ID - sesje zapisane jednym tekstem nie mają pola session_id
+            self.backend.delete([session_id])
+            self.backend.delete_selected(PointSelector(match={"session_id": session_id}))
+            invalidate_cache("chat_sessions")
+            invalidate_cache(self._stats_key)
+            log_database_operation("Usuwanie sesji czatu", True, f"ID: {session_id}")
+            return True
+        except Exception as e:
+            log_database_operation("Usuwanie sesji czatu", False, str(e))
+            return False
+    
     def clear_all(self):
         """Usuwa wszystkie elementy z bazy danych"""
         try:
-            self.client.delete(
-                collection_name=self.collection_name,
-                points_selector="all"
-            )
-            # Wyczyść cache po wyczyszczeniu bazy
-            invalidate_cache()
+            self._sync_pending_writes()
+            self.backend.clear()
+            # Wyczyść historię i statystyki w cache po wyczyszczeniu bazy
+            self.invalidate_history_cache()
             
             log_database_operation("Czyszczenie bazy danych", True)
             return True
@@ -533,18 +988,82 @@ class LanguageHelperDB:
             log_database_operation("Czyszczenie bazy danych", False, str(e))
             return False
     
+    # Klucz bazy (magazyn i kolekcja) - aktualizowany przy zapisach przez _record_write_stats;
+    # nieświeże statystyki są zwracane od razu i przeliczane w tle
+    @cached(ttl=STATS_CACHE_TTL, stale_ttl=STATS_CACHE_STALE_TTL, key=lambda self: self._stats_key)
+    def _compute_stats(self):
+        """
+        Liczy statystyki bazy zapytaniami count i facet (bez pobierania punktów)
+        
+        Returns:
+            dict: Liczby punktów (łącznie, wg trybu, wg języka), ostatnie zapisy i rozmiar payloadów
+        """
+        exact = STATS_EXACT_COUNTS
+        history_modes = [mode for modes in HISTORY_MODES.values() for mode in modes]
+        
+        mode_counts = {
+            mode: self.backend.count(PointSelector(modes=[mode]), exact=exact)
+            for mode in history_modes + [CHAT_MESSAGE_MODE]
+        }
+        language_counts = self.backend.language_counts(history_modes, exact=exact)
+        
+        # Najnowszy punkt każdego typu - jedno zapytanie z limitem 1 (sortowanie po indeksie czasu)
+        last_writes = {}
+        for history_type, modes in HISTORY_MODES.items():
+            newest = self.backend.query(modes, 1)
+            last_writes[history_type] = _parse_timestamp(newest[0].payload["timestamp"]) if newest else None
+        
+        return {
+            "total_points": self.backend.count(exact=exact),
+            "mode_counts": mode_counts,
+            "language_counts": language_counts,
+            "last_writes": last_writes,
+            "payload_bytes": self.backend.payload_bytes()
+        }
+    
+    def _record_write_stats(self, points):
+        """Aktualizuje statystyki w cache o zapisane punkty (bez zapytań do bazy)"""
+        def add_points(stats):
+            # Nowe słowniki - wartość w cache może być właśnie czytana przez inny wątek
+            updated = {
+                **stats,
+                "mode_counts": dict(stats["mode_counts"]),
+                "language_counts": dict(stats["language_counts"]),
+                "last_writes": dict(stats["last_writes"])
+            }
+            for point in points:
+                payload = point.payload
+                mode = payload.get("mode")
+                updated["total_points"] += 1
+                updated["mode_counts"][mode] = updated["mode_counts"].get(mode, 0) + 1
+                updated["payload_bytes"] += len(json.dumps(payload).encode("utf-8"))
+                
+                history_type = next((name for name, modes in HISTORY_MODES.items() if mode in modes), None)
+                if history_type:
+                    language = payload.get("language") or payload.get("target_language")
+                    updated["language_counts"][language] = updated["language_counts"].get(language, 0) + 1
+                    updated["last_writes"][history_type] = _parse_timestamp(payload["timestamp"])
+            return updated
+        
+        update_cached_db_stats(self._stats_key, add_points)
+    
     def get_stats(self):
-        """Zwraca statystyki bazy danych"""
+        """Zwraca statystyki bazy danych (z krótkotrwałego cache, aktualizowanego przy zapisach)"""
         try:
-            info = self.client.get_collection(self.collection_name)
+            stats = self._compute_stats()
+            
             return {
-                "total_points": info.points_count,
+                **stats,
+                "pending_writes": self._writer.depth(),
                 "collection_name": self.collection_name,
+                "backend": self.backend.name,
                 "status": "connected"
             }
         except Exception as e:
             return {
                 "total_points": 0,
+                "pending_writes": self._writer.depth(),
                 "collection_name": self.collection_name,
+                "backend": self.backend.name if self.backend else None,
                 "status": f"error: {str(e)}"
             }
@@ -0,0 +1,235 @@
+"""
+Lokalne (CPU) embeddingi tekstu dla historii w Qdrant
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from dotenv import load_dotenv
+from constants import QDRANT_VECTOR_SIZE, EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_SIZE
+from logger_config import log_debug, log_info, log_warning
+
+# Ładowanie zmiennych środowiskowych
+load_dotenv()
+
+class HashingEmbedder:
+    """Deterministyczny wektoryzator haszujący (słowa + trigramy znakowe), bez zależności"""
+    
+    name = "hashing"
+    
+    def __init__(self, dimension: int = QDRANT_VECTOR_SIZE):
+        """
+        Inicjalizuje wektoryzator
+        
+        Args:
+            dimension: Wymiar wektora wynikowego
+        """
+        self.dimension = dimension
+    
+    def _features(self, text: str) -> List[str]:
+        """
+        Wyciąga cechy z tekstu: całe słowa oraz trigramy znakowe słów
+        
+        Args:
+            text: Tekst wejściowy
+        
+        Returns:
+            List[str]: Lista cech
+        """
+        words = re.findall(r"\w+", text.lower())
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f"<{word}>"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+    
+    def _embed_one(self, text: str) -> List[float]:
+        """Zwraca znormalizowany (L2) wektor dla jednego tekstu"""
+        vector = [0.0] * self.dimension
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            # Znak z najwyższego bitu ogranicza wpływ kolizji haszy
+            sign = 1.0 if value >> 63 else -1.0
+            vector[value % self.dimension] += sign
+        
+        norm = math.sqrt(sum(component * component for component in vector))
+        if norm == 0:
+            return vector
+        return [component / norm for component in vector]
+    
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Zwraca wektory dla listy tekstów
+        
+        Args:
+            texts: Lista tekstów
+        
+        Returns:
+            List[List[float]]: Lista wektorów
+        """
+        return [self._embed_one(text) for text in texts]
+
+class OnnxMiniLMEmbedder:
+    """Embeddingi z modelu MiniLM (384 wymiary) uruchamianego na CPU przez onnxruntime"""
+    
+    name = "onnx-minilm"
+    
+    def __init__(self, model_dir: str, dimension: int = QDRANT_VECTOR_SIZE):
+        """
+        Ładuje model ONNX i tokenizer
+        
+        Args:
+            model_dir: Katalog z plikami model.onnx i tokenizer.json
+            dimension: Oczekiwany wymiar wektora
+        """
+        import numpy as np
+        import onnxruntime
+        from tokenizers import Tokenizer
+        
+        self.np = np
+        self.dimension = dimension
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=256)
+        self.tokenizer.enable_padding()
+    
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Zwraca wektory dla listy tekstów (mean pooling + normalizacja L2)
+        
+        Args:
+            texts: Lista tekstów
+        
+        Returns:
+            List[List[float]]: Lista wektorów
+        """
+        np = self.np
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        
+        token_embeddings = self.session.run(None, feeds)[0]
+        if token_embeddings.shape[-1] != self.dimension:
+            raise ValueError(f"Model zwraca wektory o wymiarze {token_embeddings.shape[-1]}, oczekiwano {self.dimension}")
+        
+        mask = attention_mask[..., None].astype(token_embeddings.dtype)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-9, None)
+        return (pooled / norms).tolist()
+
+class EmbeddingEngine:
+    """Silnik embeddingów z przetwarzaniem wsadowym i cache po skrócie tekstu"""
+    
+    def __init__(self, embedder, batch_size: int = EMBEDDING_BATCH_SIZE, cache_size: int = EMBEDDING_CACHE_SIZE):
+        """
+        Inicjalizuje silnik
+        
+        Args:
+            embedder: Obiekt z metodą embed_batch(texts)
+            batch_size: Maksymalna liczba tekstów w jednym wywołaniu modelu
+            cache_size: Maksymalna liczba zapamiętanych wektorów
+        """
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        log_info(f"Silnik embeddingów zainicjalizowany: {embedder.name}")
+    
+    def _text_key(self, text: str) -> str:
+        """Zwraca klucz cache dla tekstu (SHA-256)"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Zwraca wektory dla listy tekstów, licząc tylko te, których nie ma w cache
+        
+        Args:
+            texts: Lista tekstów
+        
+        Returns:
+            List[List[float]]: Lista wektorów w kolejności tekstów
+        """
+        keys = [self._text_key(text) for text in texts]
+        
+        # Unikalne teksty spoza cache
+        with self._lock:
+            missing = OrderedDict()
+            for key, text in zip(keys, texts):
+                if key not in self.cache and key not in missing:
+                    missing[key] = text
+        
+        # Model liczony poza blokadą - równoległe sesje nie czekają na siebie
+        computed = {}
+        missing_items = list(missing.items())
+        for start in range(0, len(missing_items), self.batch_size):
+            batch = missing_items[start:start + self.batch_size]
+            vectors = self.embedder.embed_batch([text for _, text in batch])
+            for (key, _), vector in zip(batch, vectors):
+                computed[key] = vector
+        
+        if missing_items:
+            log_debug(f"Embeddingi: policzono {len(missing_items)}, z cache {len(texts) - len(missing_items)}")
+        
+        with self._lock:
+            self.cache.update(computed)
+            result = []
+            for key, text in zip(keys, texts):
+                if key not in self.cache:
+                    # Wpis usunięty przez inny wątek w międzyczasie
+                    self.cache[key] = self.embedder.embed_batch([text])[0]
+                self.cache.move_to_end(key)
+                result.append(self.cache[key])
+            
+            # Usuń najdawniej używane wektory po przekroczeniu limitu
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        
+        return result
+    
+    def embed(self, text: str) -> List[float]:
+        """Zwraca wektor dla pojedynczego tekstu"""
+        return self.embed_batch([text or ""])[0]
+
+def create_embedding_engine() -> EmbeddingEngine:
+    """
+    Tworzy silnik embeddingów: MiniLM ONNX jeśli skonfigurowany, w przeciwnym razie wektoryzator haszujący
+    
+    Returns:
+        EmbeddingEngine: Skonfigurowany silnik
+    """
+    model_dir = os.getenv("EMBEDDING_MODEL_DIR")
+    if model_dir:
+        try:
+            return EmbeddingEngine(OnnxMiniLMEmbedder(model_dir))
+        except Exception as e:
+            log_warning(f"Nie udało się załadować modelu ONNX ({str(e)}), używam wektoryzatora haszującego")
+    return EmbeddingEngine(HashingEmbedder())
+
+# Globalna instancja silnika embeddingów
+_embedding_engine: Optional[EmbeddingEngine] = None
+
+def get_global_embedding_engine() -> EmbeddingEngine:
+    """
+    Zwraca globalną instancję silnika embeddingów (singleton)
+    
+    Returns:
+        EmbeddingEngine: Silnik embeddingów
+    """
+    global _embedding_engine
+    if _embedding_engine is None:
+        _embedding_engine = create_embedding_engine()
+    return _embedding_engine
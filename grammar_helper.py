@@ -1,6 +1,8 @@
 from typing import List, Dict
 from pydantic import BaseModel
-from openai_client import get_global_openai_client, get_global_instructor_client
+from openai_client import get_global_openai_client, get_global_instructor_client, response_tokens
+from cache_manager import cached, report_load_cost
+from constants import LLM_CACHE_TTL, LLM_ERROR_CACHE_TTL
 
 # Konfiguracja OpenAI i instructor
 client = get_global_openai_client()
@@ -27,6 +29,28 @@ class LanguageAnalysis(BaseModel):
     grammar_rules: List[GrammarRule]
     learning_tips: List[str]
 
+@cached(ttl=LLM_CACHE_TTL, namespace="llm", error_ttl=LLM_ERROR_CACHE_TTL)
+def _request_analysis(text: str, language: str) -> LanguageAnalysis:
+    """Pyta model o analizę tekstu (ten sam tekst i język - wynik z cache)"""
+    analysis = instructor_client.chat.completions.create(
+        model="gpt-4o",
+        response_model=LanguageAnalysis,
+        messages=[
+            {
+                "role": "system",
+                "content": f"Jesteś ekspertem w nauczaniu języka {language}. Przeanalizuj podany tekst i wyciągnij z niego ciekawe słownictwo oraz reguły gramatyczne, które mogą być przydatne do nauki. Wszystkie wyjaśnienia, tłumaczenia i wskazówki podawaj w języku polskim. Nazwy czasów gramatycznych, części mowy i reguł składni podawaj w języku {language} (np. Present Perfect, Past Continuous, Passive Voice)."
+            },
+            {
+                "role": "user",
+                "content": f"Przeanalizuj ten tekst ({language}): {text}"
+            }
+        ],
+        max_tokens=2000,
+        temperature=0.3
+    )
+    report_load_cost(tokens=response_tokens(analysis))
+    return analysis
+
 def analyze_text(text: str, language: str = "angielski") -> LanguageAnalysis:
     """
     Analizuje tekst i zwraca słownictwo oraz reguły gramatyczne
@@ -39,23 +63,7 @@ def analyze_text(text: str, language: str = "angielski") -> LanguageAnalysis:
         )
     
     try:
-        analysis = instructor_client.chat.completions.create(
-            model="gpt-4o",
-            response_model=LanguageAnalysis,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Jesteś ekspertem w nauczaniu języka {language}. Przeanalizuj podany tekst i wyciągnij z niego ciekawe słownictwo oraz reguły gramatyczne, które mogą być przydatne do nauki. Wszystkie wyjaśnienia, tłumaczenia i wskazówki podawaj w języku polskim. Nazwy czasów gramatycznych, części mowy i reguł składni podawaj w języku {language} (np. Present Perfect, Past Continuous, Passive Voice)."
-                },
-                {
-                    "role": "user",
-                    "content": f"Przeanalizuj ten tekst ({language}): {text}"
-                }
-            ],
-            max_tokens=2000,
-            temperature=0.3
-        )
-        return analysis
+        return _request_analysis(text, language)
     except Exception as e:
         # Fallback - zwróć podstawową analizę
         return LanguageAnalysis(
@@ -64,6 +72,27 @@ def analyze_text(text: str, language: str = "angielski") -> LanguageAnalysis:
             learning_tips=[f"Błąd podczas analizy: {str(e)}"]
         )
 
+@cached(ttl=LLM_CACHE_TTL, namespace="llm", error_ttl=LLM_ERROR_CACHE_TTL)
+def _request_word_explanation(word: str, language: str) -> str:
+    """Pyta model o wyjaśnienie słowa i zwraca treść odpowiedzi (JSON) - wynik z cache"""
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": f"Jesteś ekspertem w nauczaniu języka {language}. Podaj szczegółowe wyjaśnienie słowa w formacie JSON. Tłumaczenia i definicje podawaj w języku polskim. Nazwy części mowy podawaj w języku {language} (np. noun, verb, adjective)."
+            },
+            {
+                "role": "user",
+                "content": f"Wyjaśnij słowo '{word}' w języku {language}. Zwróć JSON z polami: word, translation, part_of_speech, definition, examples, synonyms, antonyms"
+            }
+        ],
+        max_tokens=500,
+        temperature=0.3
+    )
+    report_load_cost(tokens=response_tokens(response))
+    return response.choices[0].message.content
+
 def get_word_explanation(word: str, language: str = "angielski") -> Dict:
     """
     Zwraca szczegółowe wyjaśnienie słowa
@@ -80,26 +109,12 @@ def get_word_explanation(word: str, language: str = "angielski") -> Dict:
         }
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Jesteś ekspertem w nauczaniu języka {language}. Podaj szczegółowe wyjaśnienie słowa w formacie JSON. Tłumaczenia i definicje podawaj w języku polskim. Nazwy części mowy podawaj w języku {language} (np. noun, verb, adjective)."
-                },
-                {
-                    "role": "user",
-                    "content": f"Wyjaśnij słowo '{word}' w języku {language}. Zwróć JSON z polami: word, translation, part_of_speech, definition, examples, synonyms, antonyms"
-                }
-            ],
-            max_tokens=500,
-            temperature=0.3
-        )
+        content = _request_word_explanation(word, language)
         
         # Próba parsowania JSON z odpowiedzi
         import json
         try:
-            return json.loads(response.choices[0].message.content)
+            return json.loads(content)
         except:
             return {
                 "word": word,
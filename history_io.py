@@ -0,0 +1,204 @@
+"""
+Eksport i import całej historii Language Helper (strumieniowo, skompresowany JSONL)
+
+Uruchomienie:
+    python history_io.py export backup.jsonl.gz                      # audio w pliku (base64)
+    python history_io.py export backup.jsonl.gz --audio-dir audio/   # audio jako osobne pliki
+    python history_io.py import backup.jsonl.gz [--audio-dir audio/] [--workers 4]
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from pathlib import Path
+from qdrant_client.models import PointStruct
+from constants import AUDIO_FORMAT, MAX_HISTORY_LIMIT, WRITE_BATCH_SIZE
+from logger_config import log_database_operation, log_info, log_warning
+from audio_store import audio_store
+from storage_backends import PointSelector
+
+EXPORT_FORMAT = "language-helper-history"
+EXPORT_VERSION = 1
+
+def _throughput(points, started):
+    """Zwraca przepustowość w punktach na sekundę"""
+    elapsed = time.monotonic() - started
+    return round(points / elapsed, 1) if elapsed > 0 else float(points)
+
+def export_history(db, path, audio_dir=None, batch_size=MAX_HISTORY_LIMIT):
+    """
+    Eksportuje wszystkie punkty kolekcji do pliku JSONL skompresowanego gzip
+    
+    Punkty są czytane stronami (scroll) i zapisywane od razu - zużycie pamięci nie zależy
+    od wielkości kolekcji.
+    
+    Args:
+        db: Instancja LanguageHelperDB
+        path: Ścieżka pliku wynikowego (.jsonl.gz)
+        audio_dir: Katalog na pliki audio (None = audio w pliku eksportu jako base64)
+        batch_size: Liczba punktów pobieranych w jednym zapytaniu
+    
+    Returns:
+        dict: Raport (liczba punktów, plików audio, czas, punkty/s)
+    """
+    started = time.monotonic()
+    report = {"points": 0, "audio_files": 0}
+    if audio_dir:
+        Path(audio_dir).mkdir(parents=True, exist_ok=True)
+    
+    db._sync_pending_writes()
+    with gzip.open(path, "wt", encoding="utf-8") as export_file:
+        header = {
+            "format": EXPORT_FORMAT,
+            "version": EXPORT_VERSION,
+            "collection": db.collection_name,
+            "exported_at": datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+        }
+        export_file.write(json.dumps(header) + "\n")
+        
+        for point in db.backend.iter_selected(PointSelector(), batch_size=batch_size, with_vectors=True):
+            # Punkty zapisane bez embeddingu nie mają wektora
+            vector = list(point.vector) if point.vector else None
+            record = {"id": str(point.id), "payload": point.payload, "vector": vector}
+            digest = point.payload.get("audio_sha256")
+            if digest:
+                audio_format = point.payload.get("audio_format", AUDIO_FORMAT)
+                if audio_dir:
+                    target = Path(audio_dir) / f"{digest}.{audio_format}"
+                    if not target.exists():
+                        audio_data = audio_store.get(digest, audio_format)
+                        if audio_data is not None:
+                            target.write_bytes(audio_data)
+                            report["audio_files"] += 1
+                else:
+                    audio_data = audio_store.get(digest, audio_format)
+                    if audio_data is not None:
+                        record["audio"] = base64.b64encode(audio_data).decode("ascii")
+                        report["audio_files"] += 1
+            
+            export_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            report["points"] += 1
+            if report["points"] % (batch_size * 10) == 0:
+                log_info(f"Eksport: {report['points']} punktów ({_throughput(report['points'], started)} pkt/s)")
+    
+    report["seconds"] = round(time.monotonic() - started, 2)
+    report["points_per_second"] = _throughput(report["points"], started)
+    log_database_operation("Eksport historii", True, f"{report['points']} punktów do {path} ({report['points_per_second']} pkt/s)")
+    return report
+
+def _read_records(path):
+    """Czyta rekordy z pliku eksportu (strumieniowo) po sprawdzeniu nagłówka"""
+    with gzip.open(path, "rt", encoding="utf-8") as import_file:
+        header = json.loads(import_file.readline())
+        if header.get("format") != EXPORT_FORMAT or header.get("version") != EXPORT_VERSION:
+            raise ValueError(f"Nieobsługiwany format pliku eksportu: {header.get('format')} v{header.get('version')}")
+        for line in import_file:
+            if line.strip():
+                yield json.loads(line)
+
+def _record_point(record, audio_dir=None):
+    """Buduje punkt z rekordu eksportu, przywracając audio do magazynu plików"""
+    payload = record["payload"]
+    digest = payload.get("audio_sha256")
+    if "audio" in record:
+        audio_store.put(base64.b64decode(record["audio"]), payload.get("audio_format", AUDIO_FORMAT))
+    elif digest and audio_dir:
+        audio_format = payload.get("audio_format", AUDIO_FORMAT)
+        source = Path(audio_dir) / f"{digest}.{audio_format}"
+        if source.exists():
+            audio_store.put(source.read_bytes(), audio_format)
+        elif not audio_store.exists(digest, audio_format):
+            log_warning(f"Import: brak pliku audio {source}")
+    return PointStruct(id=record["id"], vector=record.get("vector") or {}, payload=payload)
+
+def import_history(db, path, audio_dir=None, batch_size=WRITE_BATCH_SIZE, workers=4):
+    """
+    Importuje punkty z pliku eksportu partiami, z równoległymi zapisami (upsert)
+    
+    W pamięci jest najwyżej workers * 2 partii naraz - plik może być większy niż RAM.
+    
+    Args:
+        db: Instancja LanguageHelperDB
+        path: Ścieżka pliku eksportu (.jsonl.gz)
+        audio_dir: Katalog z plikami audio zapisanymi przy eksporcie
+        batch_size: Liczba punktów w jednym upsert
+        workers: Liczba równoległych zapisów
+    
+    Returns:
+        dict: Raport (liczba punktów, partii, czas, punkty/s)
+    """
+    started = time.monotonic()
+    report = {"points": 0, "batches": 0}
+    in_flight = set()
+    
+    def collect(done):
+        for future in done:
+            report["points"] += future.result()
+            report["batches"] += 1
+    
+    def upsert(points):
+        db.backend.upsert(points)
+        return len(points)
+    
+    db._sync_pending_writes()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        for record in _read_records(path):
+            batch.append(_record_point(record, audio_dir))
+            if len(batch) < batch_size:
+                continue
+            
+            in_flight.add(executor.submit(upsert, batch))
+            batch = []
+            # Ograniczenie liczby partii w pamięci
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+                if report["batches"] % 10 == 0:
+                    log_info(f"Import: {report['points']} punktów ({_throughput(report['points'], started)} pkt/s)")
+        
+        if batch:
+            in_flight.add(executor.submit(upsert, batch))
+        collect(wait(in_flight).done)
+    
+    db.invalidate_history_cache()
+    report["seconds"] = round(time.monotonic() - started, 2)
+    report["points_per_second"] = _throughput(report["points"], started)
+    log_database_operation("Import historii", True, f"{report['points']} punktów z {path} ({report['points_per_second']} pkt/s)")
+    return report
+
+def main():
+    """Punkt wejścia CLI"""
+    from database import LanguageHelperDB
+    
+    parser = argparse.ArgumentParser(description="Eksport i import historii Language Helper")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="eksportuj historię do pliku .jsonl.gz")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--audio-dir", help="zapisz audio jako osobne pliki w tym katalogu")
+    export_parser.add_argument("--batch-size", type=int, default=MAX_HISTORY_LIMIT)
+    
+    import_parser = subparsers.add_parser("import", help="importuj historię z pliku .jsonl.gz")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--audio-dir", help="katalog z plikami audio z eksportu")
+    import_parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE)
+    import_parser.add_argument("--workers", type=int, default=4)
+    
+    args = parser.parse_args()
+    db = LanguageHelperDB()
+    if not db.backend:
+        raise SystemExit("Brak połączenia z bazą danych")
+    
+    if args.command == "export":
+        report = export_history(db, args.path, args.audio_dir, args.batch_size)
+    else:
+        report = import_history(db, args.path, args.audio_dir, args.batch_size, args.workers)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
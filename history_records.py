@@ -0,0 +1,225 @@
+"""
+Zwarte rekordy historii (__slots__) z leniwym dekodowaniem ciężkich pól
+
+Rekordy zachowują interfejs słownika (item["input"], item.get("explanation"), "analysis" in item),
+więc widoki i agent korepetytora działają bez zmian.
+"""
+
+import json
+from collections.abc import Sequence
+from logger_config import log_error
+from payload_codec import decompress_value, is_compressed
+
+class _Missing:
+    """Znacznik braku wartości (odróżnia brak pola od wartości None)"""
+
+    def __reduce__(self):
+        # Po deserializacji (np. cache współdzielony) ten sam obiekt
+        return "_MISSING"
+
+_MISSING = _Missing()
+
+class AttrView:
+    """Widok atrybutowy na słownik - bez kopiowania danych (zamiast SimpleNamespace)"""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self):
+        return f"AttrView({self._data!r})"
+
+class LazyViewList(Sequence):
+    """Lista słowników udostępnianych jako AttrView dopiero przy odczycie elementu"""
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: list):
+        self._items = items
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [AttrView(item) for item in self._items[index]]
+        return AttrView(self._items[index])
+
+    def __len__(self):
+        return len(self._items)
+
+    def raw(self):
+        """Zwraca elementy jako słowniki (bez widoków)"""
+        return list(self._items)
+
+class AnalysisView:
+    """Wynik analizy odczytany z bazy (słownictwo, reguły gramatyczne, wskazówki)"""
+
+    __slots__ = ("vocabulary_items", "grammar_rules", "learning_tips")
+
+    def __init__(self, analysis_dict: dict):
+        self.vocabulary_items = LazyViewList(analysis_dict.get("vocabulary_items", []))
+        self.grammar_rules = LazyViewList(analysis_dict.get("grammar_rules", []))
+        self.learning_tips = analysis_dict.get("learning_tips", [])
+
+class DecodedText:
+    """Pole tekstowe rekordu dekompresowane przy pierwszym odczycie (wartość trzymana w slocie "_<nazwa>")"""
+
+    def __set_name__(self, owner, name):
+        self.slot = getattr(owner, f"_{name}")
+
+    def __get__(self, record, owner=None):
+        if record is None:
+            return self
+        value = self.slot.__get__(record, owner)
+        if not isinstance(value, str) and value is not None:
+            value = decompress_value(value)
+            self.slot.__set__(record, value)
+        return value
+
+    def __set__(self, record, value):
+        self.slot.__set__(record, value)
+
+class HistoryRecord:
+    """Bazowy rekord historii - atrybuty w __slots__ z dostępem jak do słownika"""
+
+    __slots__ = ("id", "timestamp", "mode", "score")
+
+    # Klucze widoczne przez interfejs słownika
+    _keys = ("id", "timestamp", "mode", "score")
+    # Klucze dekodowane leniwie: klucz -> atrybut z surowymi danymi
+    _lazy = {}
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __getitem__(self, key):
+        if key in self._keys:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._keys:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        if key in self._lazy:
+            # Bez dekodowania - wystarczy obecność surowych danych
+            return getattr(self, self._lazy[key], None) is not None
+        return key in self._keys and getattr(self, key, _MISSING) is not _MISSING
+
+    def get(self, key, default=None):
+        """Zwraca wartość pola lub default (jak dict.get)"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """Zwraca klucze obecnych pól"""
+        return [key for key in self._keys if key in self]
+
+    def to_dict(self):
+        """Zwraca rekord jako słownik (z zdekodowanymi polami leniwymi)"""
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={getattr(self, 'id', None)!r}, mode={getattr(self, 'mode', None)!r})"
+
+class TranslationRecord(HistoryRecord):
+    """Tłumaczenie (audio tylko jako referencja do magazynu plików)"""
+
+    __slots__ = ("input", "output", "target_language", "audio_ref", "voice")
+    _keys = HistoryRecord._keys + __slots__
+
+class CorrectionRecord(HistoryRecord):
+    """Poprawka tekstu z wyjaśnieniem"""
+
+    __slots__ = ("input", "output", "language", "_explanation")
+    _keys = HistoryRecord._keys + ("input", "output", "language", "explanation")
+
+    explanation = DecodedText()
+
+class AnalysisRecord(HistoryRecord):
+    """Analiza językowa - obiekt analizy (z natywnych list lub JSON) budowany przy pierwszym odczycie pola "analysis" """
+
+    __slots__ = ("input", "output", "language", "_analysis_data", "_analysis")
+    _keys = HistoryRecord._keys + ("input", "output", "language", "analysis")
+    _lazy = {"analysis": "_analysis_data"}
+
+    def __init__(self, analysis_data=None, **fields):
+        super().__init__(**fields)
+        self._analysis_data = analysis_data
+        self._analysis = _MISSING
+
+    @property
+    def analysis(self):
+        if self._analysis is _MISSING:
+            self._analysis = None
+            if self._analysis_data is not None:
+                try:
+                    if isinstance(self._analysis_data, dict) and not is_compressed(self._analysis_data):
+                        # Analiza zapisana natywnie w payloadzie - bez dekodowania JSON
+                        self._analysis = AnalysisView(self._analysis_data)
+                    else:
+                        self._analysis = AnalysisView(json.loads(decompress_value(self._analysis_data)))
+                except Exception as e:
+                    log_error(f"Błąd deserializacji analizy: {str(e)}")
+            self._analysis_data = None if self._analysis is not None else self._analysis_data
+        return self._analysis
+
+    def __contains__(self, key):
+        if key == "analysis":
+            return self._analysis_data is not None or self._analysis not in (_MISSING, None)
+        return super().__contains__(key)
+
+class ExerciseRecord(HistoryRecord):
+    """Ćwiczenie - JSON ćwiczenia dekodowany przy pierwszym odczycie pola "exercise" """
+
+    __slots__ = ("input", "output", "language", "_exercise_data", "_exercise")
+    _keys = HistoryRecord._keys + ("input", "output", "language", "exercise")
+
+    def __init__(self, exercise_data=None, **fields):
+        super().__init__(**fields)
+        self._exercise_data = exercise_data
+        self._exercise = _MISSING
+
+    @property
+    def exercise(self):
+        if self._exercise is _MISSING:
+            self._exercise = None
+            if self._exercise_data is not None:
+                try:
+                    self._exercise = json.loads(decompress_value(self._exercise_data))
+                except Exception as e:
+                    log_error(f"Błąd deserializacji ćwiczenia: {str(e)}")
+        return self._exercise
+
+    def __contains__(self, key):
+        if key == "exercise":
+            return self._exercise_data is not None
+        return super().__contains__(key)
+
+class ChatSessionRecord(HistoryRecord):
+    """Nagłówek sesji czatu (wiadomości pobierane osobno)"""
+
+    __slots__ = ("language", "context", "chat_text", "title", "last_message", "message_count")
+    _keys = HistoryRecord._keys + __slots__
+
+class TipsRecord(HistoryRecord):
+    """Wskazówki do nauki"""
+
+    __slots__ = ("language", "_tips_text", "tips_count")
+    _keys = HistoryRecord._keys + ("language", "tips_text", "tips_count")
+
+    tips_text = DecodedText()
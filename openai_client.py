@@ -54,6 +54,16 @@ def get_instructor_client() -> Optional[openai.OpenAI]:
         log_openai_init(False, f"z instructor: {str(e)}")
         return None
 
+def response_tokens(response) -> int:
+    """
+    Zwraca liczbę tokenów zużytych przez odpowiedź (0 jeśli brak informacji o użyciu)
+    
+    Obsługuje odpowiedzi chat.completions oraz modele zwrócone przez instructor (_raw_response).
+    """
+    response = getattr(response, "_raw_response", response)
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", 0) or 0
+
 # Globalne instancje klientów
 _openai_client = None
 _instructor_client = None
@@ -0,0 +1,98 @@
+"""
+Przezroczysta kompresja dużych pól tekstowych payloadu
+
+Skompresowane pole zapisywane jest jako słownik ze znacznikiem formatu:
+    {"codec": "zlib", "data": "<base64>", "size": <rozmiar oryginału w bajtach>}
+Pola tekstowe nigdy nie są słownikami, więc punkty zapisane przed wprowadzeniem kompresji
+(i pola krótsze niż próg) odczytywane są bez zmian.
+"""
+
+import base64
+import os
+import zlib
+from constants import PAYLOAD_COMPRESSION_CODEC, PAYLOAD_COMPRESSION_THRESHOLD, PAYLOAD_COMPRESSION_FIELDS
+from logger_config import log_warning
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Ostrzeżenie o braku pakietu zstandard logowane raz na proces
+_zstd_fallback_logged = False
+
+def _codec() -> str:
+    """
+    Zwraca kodek wybrany zmienną środowiskową PAYLOAD_COMPRESSION
+    
+    Bez pakietu zstandard kodek zstd zastępowany jest przez zlib - zapis nie może się nie udać
+    z powodu brakującej zależności (odczyt zawsze używa kodeka zapisanego w polu).
+    """
+    global _zstd_fallback_logged
+    codec = os.getenv("PAYLOAD_COMPRESSION", PAYLOAD_COMPRESSION_CODEC).lower()
+    if codec == "zstd" and zstandard is None:
+        if not _zstd_fallback_logged:
+            log_warning("Kompresja zstd wymaga pakietu zstandard - używam zlib")
+            _zstd_fallback_logged = True
+        return "zlib"
+    return codec
+
+def _compress_bytes(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Kompresja zstd wymaga pakietu zstandard")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"Nieznany kodek kompresji: {codec}")
+
+def _decompress_bytes(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Dekompresja zstd wymaga pakietu zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Nieznany kodek kompresji: {codec}")
+
+def is_compressed(value) -> bool:
+    """Sprawdza, czy wartość pola jest skompresowana (słownik ze znacznikiem formatu)"""
+    return isinstance(value, dict) and "codec" in value and "data" in value
+
+def compress_value(value, threshold: int = PAYLOAD_COMPRESSION_THRESHOLD):
+    """
+    Kompresuje tekst dłuższy niż próg
+    
+    Args:
+        value: Wartość pola (kompresowane są tylko teksty)
+        threshold: Minimalny rozmiar tekstu w bajtach
+    
+    Returns:
+        Skompresowane pole ze znacznikiem formatu lub niezmieniona wartość
+        (gdy kompresja wyłączona, tekst krótki lub kompresja się nie opłaca)
+    """
+    codec = _codec()
+    if codec == "none" or not isinstance(value, str):
+        return value
+    
+    data = value.encode("utf-8")
+    if len(data) < threshold:
+        return value
+    
+    encoded = base64.b64encode(_compress_bytes(data, codec)).decode("ascii")
+    if len(encoded) >= len(data):
+        return value
+    return {"codec": codec, "data": encoded, "size": len(data)}
+
+def decompress_value(value):
+    """Zwraca tekst pola - dekompresuje je, jeśli ma znacznik formatu"""
+    if not is_compressed(value):
+        return value
+    return _decompress_bytes(base64.b64decode(value["data"]), value["codec"]).decode("utf-8")
+
+def compress_payload(payload: dict, fields=PAYLOAD_COMPRESSION_FIELDS) -> dict:
+    """Kompresuje w miejscu duże pola tekstowe payloadu i zwraca payload"""
+    for field_name in fields:
+        if field_name in payload:
+            payload[field_name] = compress_value(payload[field_name])
+    return payload
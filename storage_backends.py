@@ -0,0 +1,907 @@
+"""
+Wymienne magazyny danych historii dla aplikacji Language Helper
+
+Dostępne implementacje (wybór przez zmienną środowiskową STORAGE_BACKEND):
+- qdrant        - zdalny serwer Qdrant (domyślnie)
+- qdrant_local  - Qdrant w trybie lokalnym/wbudowanym (ścieżka lub ":memory:")
+- sqlite        - lokalna baza SQLite z indeksami po trybie, języku i czasie
+
+Dla zdalnego Qdrant dostępny jest też AsyncQdrantBackend (AsyncQdrantClient) - odczyty
+AsyncLanguageHelperDB bez blokowania wątków.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+from array import array
+from collections import namedtuple
+from typing import Iterator, List, Optional
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchAny, MatchValue,
+    OrderBy, Direction, PayloadSchemaType, IsEmptyCondition, PayloadField, HasIdCondition, Range,
+    FilterSelector, NestedCondition, Nested
+)
+from constants import (
+    QDRANT_VECTOR_SIZE, QDRANT_TIMEOUT, QDRANT_TIMESTAMP_FIELD, QDRANT_KEYWORD_INDEXES,
+    QDRANT_NESTED_KEYWORD_INDEXES, QDRANT_SEQUENCE_FIELD, MAX_HISTORY_LIMIT, SQLITE_DEFAULT_PATH, CHAT_MESSAGE_MODE,
+    STATS_PAYLOAD_SAMPLE_SIZE, LANGUAGE_FACET_LIMIT
+)
+from logger_config import log_database_operation, log_debug
+
+# Ładowanie zmiennych środowiskowych
+load_dotenv()
+
+# Punkt zwracany przez magazyny inne niż Qdrant (te same atrybuty co rekordy Qdrant)
+StoredPoint = namedtuple("StoredPoint", ["id", "payload", "score", "vector"], defaults=[None, None])
+
+# Selektor grupy punktów dla operacji zbiorczych (wszystkie podane warunki muszą być spełnione)
+# modes - tryby, language - język (language lub target_language), before - znacznik czasu < before,
+# has_field - pole payloadu obecne, ids - ID punktów, match - pole -> wartość lub lista wartości,
+# nested - lista w payloadzie -> {pole elementu: wartość lub lista wartości} (jeden element spełnia wszystkie)
+PointSelector = namedtuple(
+    "PointSelector",
+    ["modes", "language", "before", "has_field", "ids", "match", "nested"],
+    defaults=[None, None, None, None, None, None, None]
+)
+
+class StorageBackend:
+    """Interfejs magazynu punktów historii (id, wektor, payload)"""
+    
+    name = "base"
+    
+    def ensure_schema(self) -> bool:
+        """
+        Tworzy kolekcję/tabelę i indeksy jeśli nie istnieją
+        
+        Returns:
+            bool: True jeśli kolekcja została właśnie utworzona
+        """
+        raise NotImplementedError
+    
+    def upsert(self, points: List[PointStruct]) -> None:
+        """Zapisuje (lub nadpisuje) partię punktów"""
+        raise NotImplementedError
+    
+    def query(self, modes: List[str], limit: int, language: Optional[str] = None,
+              start_from: Optional[float] = None, exclude_ids: Optional[List[str]] = None) -> list:
+        """
+        Zwraca najnowsze punkty podanych trybów (malejąco po znaczniku czasu)
+        
+        Args:
+            modes: Tryby punktów
+            limit: Maksymalna liczba punktów
+            language: Opcjonalny filtr języka (language lub target_language)
+            start_from: Zwracaj tylko punkty ze znacznikiem czasu <= tej wartości
+            exclude_ids: ID punktów do pominięcia
+        
+        Returns:
+            list: Punkty z atrybutami id i payload
+        """
+        raise NotImplementedError
+    
+    def query_selected(self, selector: PointSelector, limit: int) -> list:
+        """
+        Zwraca najnowsze punkty dopasowane przez selektor (malejąco po znaczniku czasu)
+        
+        Returns:
+            list: Punkty z atrybutami id i payload
+        """
+        raise NotImplementedError
+    
+    def search(self, vector: List[float], modes: List[str], limit: int, language: Optional[str] = None) -> list:
+        """
+        Zwraca punkty najbardziej podobne do wektora (podobieństwo cosinusowe)
+        
+        Returns:
+            list: Punkty z atrybutami id, payload i score
+        """
+        raise NotImplementedError
+    
+    def query_session(self, session_id: str, limit: int, after_seq: Optional[int] = None) -> list:
+        """
+        Zwraca wiadomości sesji czatu w kolejności ich numerów
+        
+        Args:
+            session_id: ID sesji czatu
+            limit: Maksymalna liczba wiadomości
+            after_seq: Zwracaj tylko wiadomości o numerze większym od tej wartości
+        
+        Returns:
+            list: Punkty wiadomości z atrybutami id i payload
+        """
+        raise NotImplementedError
+    
+    def iter_points(self, has_field: Optional[str] = None, missing_field: Optional[str] = None,
+                    batch_size: int = MAX_HISTORY_LIMIT) -> Iterator:
+        """
+        Przechodzi po wszystkich punktach kolekcji partiami
+        
+        Args:
+            has_field: Tylko punkty posiadające to pole payloadu
+            missing_field: Tylko punkty bez tego pola payloadu
+            batch_size: Liczba punktów pobieranych w jednym zapytaniu
+        
+        Yields:
+            Punkty z atrybutami id i payload
+        """
+        raise NotImplementedError
+    
+    def iter_selected(self, selector: PointSelector, batch_size: int = MAX_HISTORY_LIMIT,
+                      with_vectors: bool = False) -> Iterator:
+        """
+        Przechodzi partiami po punktach dopasowanych przez selektor
+        
+        Yields:
+            Punkty z atrybutami id i payload (oraz vector gdy with_vectors=True)
+        """
+        raise NotImplementedError
+    
+    def distinct_languages(self, modes: List[str]) -> List[str]:
+        """Zwraca języki występujące w punktach podanych trybów"""
+        raise NotImplementedError
+    
+    def language_counts(self, modes: List[str], exact: bool = True) -> dict:
+        """
+        Zwraca liczbę punktów podanych trybów dla każdego występującego języka
+        
+        Args:
+            modes: Tryby punktów
+            exact: False pozwala na szybsze, przybliżone liczby (jeśli magazyn to obsługuje)
+        """
+        raise NotImplementedError
+    
+    def set_payload(self, point_id, payload: dict) -> None:
+        """Dopisuje/nadpisuje pola payloadu punktu"""
+        raise NotImplementedError
+    
+    def set_payload_selected(self, selector: PointSelector, payload: dict) -> None:
+        """Dopisuje/nadpisuje pola payloadu wszystkich punktów dopasowanych przez selektor"""
+        raise NotImplementedError
+    
+    def delete_payload_selected(self, selector: PointSelector, keys: List[str]) -> None:
+        """Usuwa pola payloadu wszystkich punktów dopasowanych przez selektor"""
+        raise NotImplementedError
+    
+    def delete_payload(self, point_id, keys: List[str]) -> None:
+        """Usuwa pola payloadu punktu"""
+        raise NotImplementedError
+    
+    def delete(self, ids: list) -> None:
+        """Usuwa punkty o podanych ID"""
+        raise NotImplementedError
+    
+    def delete_selected(self, selector: PointSelector) -> None:
+        """Usuwa wszystkie punkty dopasowane przez selektor (jedną operacją)"""
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """Usuwa wszystkie punkty"""
+        raise NotImplementedError
+    
+    def count(self, selector: Optional[PointSelector] = None, exact: bool = True) -> int:
+        """
+        Zwraca liczbę punktów w kolekcji
+        
+        Args:
+            selector: Liczyć tylko punkty dopasowane przez selektor
+            exact: False pozwala na szybszą, przybliżoną liczbę (jeśli magazyn to obsługuje)
+        """
+        raise NotImplementedError
+    
+    def payload_bytes(self) -> int:
+        """Zwraca (lub szacuje) łączny rozmiar payloadów w bajtach"""
+        raise NotImplementedError
+    
+    def vacuum(self) -> None:
+        """Zwalnia miejsce po usuniętych punktach (jeśli magazyn tego wymaga)"""
+
+def qdrant_history_filter(modes, language=None, exclude_ids=None):
+    """Buduje filtr Qdrant dla podanych trybów, (opcjonalnie) języka i wykluczonych ID"""
+    conditions = [FieldCondition(key="mode", match=MatchAny(any=list(modes)))]
+    if language:
+        # Tłumaczenia przechowują język w polu target_language, pozostałe tryby w language
+        conditions.append(Filter(should=[
+            FieldCondition(key="language", match=MatchValue(value=language)),
+            FieldCondition(key="target_language", match=MatchValue(value=language))
+        ]))
+    must_not = [HasIdCondition(has_id=list(exclude_ids))] if exclude_ids else None
+    return Filter(must=conditions, must_not=must_not)
+
+def qdrant_session_filter(session_id, after_seq=None):
+    """Buduje filtr Qdrant dla wiadomości sesji czatu (opcjonalnie od podanego numeru)"""
+    conditions = [
+        FieldCondition(key="mode", match=MatchValue(value=CHAT_MESSAGE_MODE)),
+        FieldCondition(key="session_id", match=MatchValue(value=session_id))
+    ]
+    if after_seq is not None:
+        conditions.append(FieldCondition(key=QDRANT_SEQUENCE_FIELD, range=Range(gt=after_seq)))
+    return Filter(must=conditions)
+
+def qdrant_selector_filter(selector):
+    """Buduje filtr Qdrant z selektora grupy punktów"""
+    conditions = []
+    if selector.modes:
+        conditions.append(FieldCondition(key="mode", match=MatchAny(any=list(selector.modes))))
+    if selector.language:
+        conditions.append(Filter(should=[
+            FieldCondition(key="language", match=MatchValue(value=selector.language)),
+            FieldCondition(key="target_language", match=MatchValue(value=selector.language))
+        ]))
+    if selector.before is not None:
+        conditions.append(FieldCondition(key=QDRANT_TIMESTAMP_FIELD, range=Range(lt=selector.before)))
+    if selector.has_field:
+        conditions.append(Filter(must_not=[IsEmptyCondition(is_empty=PayloadField(key=selector.has_field))]))
+    if selector.ids:
+        conditions.append(HasIdCondition(has_id=list(selector.ids)))
+    for field_name, value in (selector.match or {}).items():
+        conditions.append(qdrant_match_condition(field_name, value))
+    for array_field, element_match in (selector.nested or {}).items():
+        conditions.append(NestedCondition(nested=Nested(key=array_field, filter=Filter(must=[
+            qdrant_match_condition(field_name, value) for field_name, value in element_match.items()
+        ]))))
+    return Filter(must=conditions)
+
+def qdrant_match_condition(field_name, value):
+    """Buduje warunek Qdrant: pole równe wartości lub jednej z listy wartości"""
+    match = MatchAny(any=list(value)) if isinstance(value, (list, tuple, set)) else MatchValue(value=value)
+    return FieldCondition(key=field_name, match=match)
+
+def qdrant_order_by(start_from=None):
+    """Buduje sortowanie Qdrant od najnowszych (opcjonalnie od podanego znacznika czasu)"""
+    return OrderBy(key=QDRANT_TIMESTAMP_FIELD, direction=Direction.DESC, start_from=start_from)
+
+def qdrant_field_filter(has_field=None, missing_field=None):
+    """Buduje filtr Qdrant na obecność/brak pola payloadu"""
+    if has_field:
+        return Filter(must_not=[IsEmptyCondition(is_empty=PayloadField(key=has_field))])
+    if missing_field:
+        return Filter(must=[IsEmptyCondition(is_empty=PayloadField(key=missing_field))])
+    return None
+
+def qdrant_payload_indexes():
+    """Zwraca indeksy payloadu wymagane przez zapytania historii (pole -> typ)"""
+    indexes = {field_name: PayloadSchemaType.KEYWORD for field_name in QDRANT_KEYWORD_INDEXES}
+    for array_field, element_fields in QDRANT_NESTED_KEYWORD_INDEXES.items():
+        for field_name in element_fields:
+            indexes[f"{array_field}[].{field_name}"] = PayloadSchemaType.KEYWORD
+    indexes[QDRANT_TIMESTAMP_FIELD] = PayloadSchemaType.FLOAT
+    indexes[QDRANT_SEQUENCE_FIELD] = PayloadSchemaType.INTEGER
+    return indexes
+
+class QdrantBackend(StorageBackend):
+    """Magazyn oparty na Qdrant - zdalnym serwerze lub trybie lokalnym/wbudowanym"""
+    
+    def __init__(self, client: QdrantClient, collection_name: str, name: str = "qdrant"):
+        """
+        Inicjalizuje magazyn
+        
+        Args:
+            client: Klient Qdrant (zdalny lub lokalny)
+            collection_name: Nazwa kolekcji
+            name: Nazwa magazynu (do logów i statystyk)
+        """
+        self.client = client
+        self.collection_name = collection_name
+        self.name = name
+    
+    def ensure_schema(self) -> bool:
+        collections = self.client.get_collections()
+        collection_names = [col.name for col in collections.collections]
+        created = self.collection_name not in collection_names
+        
+        if created:
+            # Utworzenie kolekcji z wektorami (dla embeddings)
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(size=QDRANT_VECTOR_SIZE, distance=Distance.COSINE)
+            )
+            log_database_operation("Tworzenie kolekcji", True, f"Kolekcja: {self.collection_name}")
+        
+        # Starsze kolekcje mogą nie mieć indeksów
+        info = self.client.get_collection(self.collection_name)
+        existing = set((info.payload_schema or {}).keys())
+        for field_name, field_schema in qdrant_payload_indexes().items():
+            if field_name in existing:
+                continue
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=field_schema
+            )
+            log_database_operation("Tworzenie indeksu", True, f"Pole: {field_name}")
+        
+        return created
+    
+    def upsert(self, points):
+        self.client.upsert(collection_name=self.collection_name, points=points)
+    
+    def query(self, modes, limit, language=None, start_from=None, exclude_ids=None):
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=qdrant_history_filter(modes, language, exclude_ids),
+            limit=limit,
+            order_by=qdrant_order_by(start_from),
+            with_payload=True,
+            with_vectors=False
+        )
+        return points
+    
+    def query_selected(self, selector, limit):
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=qdrant_selector_filter(selector),
+            limit=limit,
+            order_by=qdrant_order_by(),
+            with_payload=True,
+            with_vectors=False
+        )
+        return points
+    
+    def query_session(self, session_id, limit, after_seq=None):
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=qdrant_session_filter(session_id, after_seq),
+            limit=limit,
+            order_by=OrderBy(key=QDRANT_SEQUENCE_FIELD, direction=Direction.ASC),
+            with_payload=True,
+            with_vectors=False
+        )
+        return points
+    
+    def search(self, vector, modes, limit, language=None):
+        return self.client.query_points(
+            collection_name=self.collection_name,
+            query=vector,
+            query_filter=qdrant_history_filter(modes, language),
+            limit=limit,
+            with_payload=True,
+            with_vectors=False
+        ).points
+    
+    def iter_points(self, has_field=None, missing_field=None, batch_size=MAX_HISTORY_LIMIT):
+        scroll_filter = qdrant_field_filter(has_field, missing_field)
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            yield from points
+            if offset is None:
+                break
+    
+    def iter_selected(self, selector, batch_size=MAX_HISTORY_LIMIT, with_vectors=False):
+        scroll_filter = qdrant_selector_filter(selector)
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            yield from points
+            if offset is None:
+                break
+    
+    def distinct_languages(self, modes):
+        return sorted(self.language_counts(modes))
+    
+    def language_counts(self, modes, exact=True):
+        # Facet na indeksowanych polach języka - bez przewijania kolekcji
+        facet_filter = qdrant_history_filter(modes)
+        counts = {}
+        for field_name in ("language", "target_language"):
+            response = self.client.facet(
+                collection_name=self.collection_name,
+                key=field_name,
+                facet_filter=facet_filter,
+                limit=LANGUAGE_FACET_LIMIT,
+                exact=exact
+            )
+            for hit in response.hits:
+                counts[hit.value] = counts.get(hit.value, 0) + hit.count
+        return counts
+    
+    def set_payload(self, point_id, payload):
+        self.client.set_payload(collection_name=self.collection_name, payload=payload, points=[point_id])
+    
+    def set_payload_selected(self, selector, payload):
+        self.client.set_payload(
+            collection_name=self.collection_name,
+            payload=payload,
+            points=FilterSelector(filter=qdrant_selector_filter(selector))
+        )
+    
+    def delete_payload(self, point_id, keys):
+        self.client.delete_payload(collection_name=self.collection_name, keys=keys, points=[point_id])
+    
+    def delete_payload_selected(self, selector, keys):
+        self.client.delete_payload(
+            collection_name=self.collection_name,
+            keys=keys,
+            points=FilterSelector(filter=qdrant_selector_filter(selector))
+        )
+    
+    def delete(self, ids):
+        self.client.delete(collection_name=self.collection_name, points_selector=list(ids))
+    
+    def delete_selected(self, selector):
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(filter=qdrant_selector_filter(selector))
+        )
+    
+    def clear(self):
+        # Pusty filtr dopasowuje wszystkie punkty
+        self.client.delete(collection_name=self.collection_name, points_selector=Filter())
+    
+    def count(self, selector=None, exact=True):
+        count_filter = qdrant_selector_filter(selector) if selector else None
+        return self.client.count(collection_name=self.collection_name, count_filter=count_filter, exact=exact).count
+    
+    def payload_bytes(self):
+        # Qdrant nie agreguje rozmiarów - średnia z próbki razy liczba punktów
+        sample, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            limit=STATS_PAYLOAD_SAMPLE_SIZE,
+            with_payload=True,
+            with_vectors=False
+        )
+        if not sample:
+            return 0
+        sample_bytes = sum(len(json.dumps(point.payload).encode("utf-8")) for point in sample)
+        return int(sample_bytes / len(sample) * self.count(exact=False))
+
+class AsyncQdrantBackend:
+    """
+    Zapytania odczytu do zdalnego Qdrant przez AsyncQdrantClient - odpowiedniki metod StorageBackend
+    
+    Używany przez AsyncLanguageHelperDB, aby odczyty nie zajmowały wątków puli; zapisy idą
+    przez kolejkę w tle synchronicznej bazy.
+    """
+    
+    def __init__(self, client: AsyncQdrantClient, collection_name: str, name: str = "qdrant"):
+        """
+        Inicjalizuje magazyn
+        
+        Args:
+            client: Asynchroniczny klient Qdrant
+            collection_name: Nazwa kolekcji
+            name: Nazwa magazynu (do logów i statystyk)
+        """
+        self.client = client
+        self.collection_name = collection_name
+        self.name = name
+    
+    async def query(self, modes, limit, language=None, start_from=None, exclude_ids=None):
+        points, _ = await self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=qdrant_history_filter(modes, language, exclude_ids),
+            limit=limit,
+            order_by=qdrant_order_by(start_from),
+            with_payload=True,
+            with_vectors=False
+        )
+        return points
+    
+    async def query_selected(self, selector, limit):
+        points, _ = await self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=qdrant_selector_filter(selector),
+            limit=limit,
+            order_by=qdrant_order_by(),
+            with_payload=True,
+            with_vectors=False
+        )
+        return points
+    
+    async def query_session(self, session_id, limit, after_seq=None):
+        points, _ = await self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=qdrant_session_filter(session_id, after_seq),
+            limit=limit,
+            order_by=OrderBy(key=QDRANT_SEQUENCE_FIELD, direction=Direction.ASC),
+            with_payload=True,
+            with_vectors=False
+        )
+        return points
+    
+    async def search(self, vector, modes, limit, language=None):
+        response = await self.client.query_points(
+            collection_name=self.collection_name,
+            query=vector,
+            query_filter=qdrant_history_filter(modes, language),
+            limit=limit,
+            with_payload=True,
+            with_vectors=False
+        )
+        return response.points
+    
+    async def count(self, selector=None, exact=True):
+        count_filter = qdrant_selector_filter(selector) if selector else None
+        response = await self.client.count(collection_name=self.collection_name, count_filter=count_filter, exact=exact)
+        return response.count
+    
+    async def close(self):
+        """Zamyka połączenia klienta"""
+        await self.client.close()
+
+class SQLiteBackend(StorageBackend):
+    """Magazyn w lokalnej bazie SQLite - bez serwera, z indeksami po trybie, języku i czasie"""
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str, collection_name: str):
+        """
+        Inicjalizuje magazyn
+        
+        Args:
+            path: Ścieżka pliku bazy (lub ":memory:")
+            collection_name: Nazwa tabeli z punktami
+        """
+        self.path = path
+        self.table = "".join(char if char.isalnum() else "_" for char in collection_name)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+    
+    def _columns(self, payload):
+        """Wyciąga z payloadu wartości kolumn indeksowanych"""
+        language = payload.get("language") or payload.get("target_language")
+        return payload.get("mode"), language, payload.get(QDRANT_TIMESTAMP_FIELD)
+    
+    def _point(self, row, score=None, with_vector=False):
+        """Konwertuje wiersz tabeli na punkt"""
+        vector = None
+        if with_vector and row["vector"] is not None:
+            vector = array("f")
+            vector.frombytes(row["vector"])
+            vector = vector.tolist()
+        return StoredPoint(id=row["id"], payload=json.loads(row["payload"]), score=score, vector=vector)
+    
+    def ensure_schema(self):
+        with self._lock:
+            created = self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table,)
+            ).fetchone() is None
+            self.connection.executescript(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    id TEXT PRIMARY KEY,
+                    mode TEXT,
+                    language TEXT,
+                    timestamp_ts REAL,
+                    payload TEXT NOT NULL,
+                    vector BLOB
+                );
+                CREATE INDEX IF NOT EXISTS {self.table}_mode_ts ON {self.table} (mode, timestamp_ts DESC);
+                CREATE INDEX IF NOT EXISTS {self.table}_language_ts ON {self.table} (language, timestamp_ts DESC);
+                CREATE INDEX IF NOT EXISTS {self.table}_session_seq ON {self.table}
+                    (json_extract(payload, '$.session_id'), json_extract(payload, '$.{QDRANT_SEQUENCE_FIELD}'))
+                    WHERE mode = '{CHAT_MESSAGE_MODE}';
+            """)
+            self.connection.commit()
+        if created:
+            log_database_operation("Tworzenie tabeli SQLite", True, f"Tabela: {self.table} ({self.path})")
+        return created
+    
+    def upsert(self, points):
+        rows = []
+        for point in points:
+            mode, language, timestamp_ts = self._columns(point.payload)
+            vector = array("f", point.vector).tobytes() if point.vector else None
+            rows.append((str(point.id), mode, language, timestamp_ts, json.dumps(point.payload), vector))
+        with self._lock:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (id, mode, language, timestamp_ts, payload, vector) "
+                f"VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.connection.commit()
+    
+    def _where(self, modes, language=None, start_from=None, exclude_ids=None):
+        """Buduje klauzulę WHERE i parametry dla zapytań historii"""
+        clauses = [f"mode IN ({', '.join('?' for _ in modes)})"]
+        params = list(modes)
+        if language:
+            clauses.append("language = ?")
+            params.append(language)
+        if start_from is not None:
+            clauses.append("timestamp_ts <= ?")
+            params.append(start_from)
+        if exclude_ids:
+            clauses.append(f"id NOT IN ({', '.join('?' for _ in exclude_ids)})")
+            params.extend(str(point_id) for point_id in exclude_ids)
+        return " AND ".join(clauses), params
+    
+    def _selector_where(self, selector):
+        """Buduje klauzulę WHERE i parametry z selektora grupy punktów"""
+        clauses, params = ["1 = 1"], []
+        
+        def add_in(column, values):
+            values = list(values)
+            clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        
+        if selector.modes:
+            add_in("mode", selector.modes)
+        if selector.language:
+            clauses.append("language = ?")
+            params.append(selector.language)
+        if selector.before is not None:
+            clauses.append("timestamp_ts < ?")
+            params.append(selector.before)
+        if selector.has_field:
+            clauses.append(f"json_extract(payload, '$.{selector.has_field}') IS NOT NULL")
+        if selector.ids:
+            add_in("id", (str(point_id) for point_id in selector.ids))
+        for field_name, value in (selector.match or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            add_in(f"json_extract(payload, '$.{field_name}')", values)
+        for array_field, element_match in (selector.nested or {}).items():
+            # Element listy spełniający wszystkie warunki (jak NestedCondition w Qdrant)
+            element_clauses = []
+            for field_name, value in element_match.items():
+                values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+                element_clauses.append(f"json_extract(value, '$.{field_name}') IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+            clauses.append(
+                f"EXISTS (SELECT 1 FROM json_each(payload, '$.{array_field}') WHERE {' AND '.join(element_clauses)})"
+            )
+        return " AND ".join(clauses), params
+    
+    def query(self, modes, limit, language=None, start_from=None, exclude_ids=None):
+        where, params = self._where(modes, language, start_from, exclude_ids)
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT id, payload FROM {self.table} WHERE {where} ORDER BY timestamp_ts DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        return [self._point(row) for row in rows]
+    
+    def query_selected(self, selector, limit):
+        where, params = self._selector_where(selector)
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT id, payload FROM {self.table} WHERE {where} ORDER BY timestamp_ts DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        return [self._point(row) for row in rows]
+    
+    def query_session(self, session_id, limit, after_seq=None):
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT id, payload FROM {self.table} "
+                f"WHERE mode = '{CHAT_MESSAGE_MODE}' AND json_extract(payload, '$.session_id') = ? "
+                f"AND json_extract(payload, '$.{QDRANT_SEQUENCE_FIELD}') > ? "
+                f"ORDER BY json_extract(payload, '$.{QDRANT_SEQUENCE_FIELD}') LIMIT ?",
+                (session_id, -1 if after_seq is None else after_seq, limit)
+            ).fetchall()
+        return [self._point(row) for row in rows]
+    
+    def search(self, vector, modes, limit, language=None):
+        where, params = self._where(modes, language)
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT id, payload, vector FROM {self.table} WHERE {where} AND vector IS NOT NULL",
+                params
+            ).fetchall()
+        
+        # Przeszukanie liniowe - wystarczające dla lokalnej historii jednego użytkownika
+        query_norm = math.sqrt(sum(component * component for component in vector)) or 1.0
+        scored = []
+        for row in rows:
+            candidate = array("f")
+            candidate.frombytes(row["vector"])
+            norm = math.sqrt(sum(component * component for component in candidate)) or 1.0
+            score = sum(a * b for a, b in zip(vector, candidate)) / (query_norm * norm)
+            scored.append((score, row))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [self._point(row, score) for score, row in scored[:limit]]
+    
+    def iter_points(self, has_field=None, missing_field=None, batch_size=MAX_HISTORY_LIMIT):
+        condition = ""
+        params = []
+        if has_field:
+            condition = "AND json_extract(payload, ?) IS NOT NULL"
+            params.append(f"$.{has_field}")
+        elif missing_field:
+            condition = "AND json_extract(payload, ?) IS NULL"
+            params.append(f"$.{missing_field}")
+        
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT rowid, id, payload FROM {self.table} WHERE rowid > ? {condition} ORDER BY rowid LIMIT ?",
+                    [last_rowid] + params + [batch_size]
+                ).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1]["rowid"]
+            for row in rows:
+                yield self._point(row)
+    
+    def iter_selected(self, selector, batch_size=MAX_HISTORY_LIMIT, with_vectors=False):
+        where, params = self._selector_where(selector)
+        columns = "rowid, id, payload, vector" if with_vectors else "rowid, id, payload"
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT {columns} FROM {self.table} WHERE rowid > ? AND {where} ORDER BY rowid LIMIT ?",
+                    [last_rowid] + params + [batch_size]
+                ).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1]["rowid"]
+            for row in rows:
+                yield self._point(row, with_vector=with_vectors)
+    
+    def distinct_languages(self, modes):
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT DISTINCT language FROM {self.table} "
+                f"WHERE mode IN ({', '.join('?' for _ in modes)}) AND language IS NOT NULL ORDER BY language",
+                list(modes)
+            ).fetchall()
+        return [row["language"] for row in rows]
+    
+    def language_counts(self, modes, exact=True):
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT language, COUNT(*) AS count FROM {self.table} "
+                f"WHERE mode IN ({', '.join('?' for _ in modes)}) AND language IS NOT NULL GROUP BY language",
+                list(modes)
+            ).fetchall()
+        return {row["language"]: row["count"] for row in rows}
+    
+    def _update_payload(self, point_id, update):
+        """Odczytuje payload punktu, modyfikuje go funkcją update i zapisuje"""
+        with self._lock:
+            row = self.connection.execute(
+                f"SELECT payload FROM {self.table} WHERE id = ?", (str(point_id),)
+            ).fetchone()
+            if row is None:
+                return
+            payload = json.loads(row["payload"])
+            update(payload)
+            mode, language, timestamp_ts = self._columns(payload)
+            self.connection.execute(
+                f"UPDATE {self.table} SET mode = ?, language = ?, timestamp_ts = ?, payload = ? WHERE id = ?",
+                (mode, language, timestamp_ts, json.dumps(payload), str(point_id))
+            )
+            self.connection.commit()
+    
+    def set_payload(self, point_id, payload):
+        self._update_payload(point_id, lambda current: current.update(payload))
+    
+    def delete_payload(self, point_id, keys):
+        def remove_keys(current):
+            for key in keys:
+                current.pop(key, None)
+        self._update_payload(point_id, remove_keys)
+    
+    def set_payload_selected(self, selector, payload):
+        # Zbierz ID przed modyfikacją - zmiana payloadu może wyłączyć punkt z selekcji
+        for point_id in [point.id for point in self.iter_selected(selector)]:
+            self.set_payload(point_id, payload)
+    
+    def delete_payload_selected(self, selector, keys):
+        for point_id in [point.id for point in self.iter_selected(selector)]:
+            self.delete_payload(point_id, keys)
+    
+    def delete(self, ids):
+        with self._lock:
+            self.connection.executemany(
+                f"DELETE FROM {self.table} WHERE id = ?", [(str(point_id),) for point_id in ids]
+            )
+            self.connection.commit()
+    
+    def delete_selected(self, selector):
+        where, params = self._selector_where(selector)
+        with self._lock:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE {where}", params)
+            self.connection.commit()
+    
+    def clear(self):
+        with self._lock:
+            self.connection.execute(f"DELETE FROM {self.table}")
+            self.connection.commit()
+    
+    def count(self, selector=None, exact=True):
+        where, params = self._selector_where(selector) if selector else ("1 = 1", [])
+        with self._lock:
+            return self.connection.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {where}", params).fetchone()[0]
+    
+    def payload_bytes(self):
+        with self._lock:
+            return self.connection.execute(f"SELECT COALESCE(SUM(LENGTH(CAST(payload AS BLOB))), 0) FROM {self.table}").fetchone()[0]
+    
+    def vacuum(self):
+        with self._lock:
+            self.connection.execute("VACUUM")
+
+def _backend_type() -> str:
+    """Zwraca typ magazynu wybrany zmienną środowiskową STORAGE_BACKEND"""
+    return os.getenv("STORAGE_BACKEND", "qdrant").lower()
+
+def _qdrant_client_kwargs(backend_type: str, collection_name: str) -> dict:
+    """
+    Zwraca parametry klienta Qdrant (zdalnego lub lokalnego) na podstawie zmiennych środowiskowych
+    
+    Args:
+        backend_type: "qdrant" lub "qdrant_local"
+        collection_name: Nazwa kolekcji (do logów)
+    
+    Returns:
+        dict: Parametry dla QdrantClient
+    """
+    if backend_type == "qdrant_local":
+        location = os.getenv("QDRANT_LOCAL_PATH", ":memory:")
+        log_debug(f"Storage backend: qdrant_local ({location})")
+        return {"location": location} if location == ":memory:" else {"path": location}
+    
+    qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+    
+    # Debug - sprawdź zmienne środowiskowe
+    log_debug(f"Qdrant config - URL: {qdrant_url}, API Key: {'***' if qdrant_api_key else 'BRAK'}, Collection: {collection_name}")
+    
+    kwargs = {"url": qdrant_url, "timeout": QDRANT_TIMEOUT}
+    if qdrant_api_key:
+        kwargs["api_key"] = qdrant_api_key
+    return kwargs
+
+def create_backend(collection_name: str) -> StorageBackend:
+    """
+    Tworzy magazyn wybrany zmienną środowiskową STORAGE_BACKEND
+    
+    Args:
+        collection_name: Nazwa kolekcji (tabeli)
+    
+    Returns:
+        StorageBackend: Skonfigurowany magazyn
+    """
+    backend_type = _backend_type()
+    
+    if backend_type == "sqlite":
+        path = os.getenv("SQLITE_PATH", SQLITE_DEFAULT_PATH)
+        log_debug(f"Storage backend: sqlite ({path})")
+        return SQLiteBackend(path, collection_name)
+    
+    client = QdrantClient(**_qdrant_client_kwargs(backend_type, collection_name))
+    return QdrantBackend(client, collection_name, name=backend_type)
+
+def create_async_backend(collection_name: str) -> Optional[AsyncQdrantBackend]:
+    """
+    Tworzy asynchroniczny magazyn dla zdalnego Qdrant (STORAGE_BACKEND=qdrant)
+    
+    Magazyny lokalne (qdrant_local, sqlite) działają w procesie bez operacji sieciowych - ich
+    zapytania wykonywane są w puli wątków; lokalny klient asynchroniczny otworzyłby przy tym
+    osobną kopię danych.
+    
+    Args:
+        collection_name: Nazwa kolekcji
+    
+    Returns:
+        AsyncQdrantBackend: Magazyn asynchroniczny lub None dla magazynów lokalnych
+    """
+    backend_type = _backend_type()
+    if backend_type != "qdrant":
+        return None
+    
+    client = AsyncQdrantClient(**_qdrant_client_kwargs(backend_type, collection_name))
+    return AsyncQdrantBackend(client, collection_name, name=backend_type)
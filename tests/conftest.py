@@ -0,0 +1,45 @@
+"""
+Wspólna konfiguracja testów: magazyny lokalne (bez serwera) i pliki w katalogu tymczasowym
+"""
+
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Ustawione przed importem modułów aplikacji (magazyn audio i cache tworzone przy imporcie)
+_TEST_DIR = tempfile.mkdtemp(prefix="language_helper_tests_")
+os.environ["AUDIO_STORE_DIR"] = os.path.join(_TEST_DIR, "audio_store")
+os.environ["STORAGE_BACKEND"] = "qdrant_local"
+os.environ["QDRANT_LOCAL_PATH"] = ":memory:"
+for name in ("CACHE_BACKEND", "CACHE_SNAPSHOT_PATH", "EMBEDDING_MODEL_DIR"):
+    os.environ.pop(name, None)
+
+BACKEND_TYPES = ["qdrant_local", "sqlite"]
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Każdy test zaczyna z pustym globalnym cache"""
+    from cache_manager import cache_manager
+    cache_manager.clear()
+    yield
+    cache_manager.clear()
+
+@pytest.fixture
+def make_db(monkeypatch, tmp_path):
+    """Zwraca fabrykę LanguageHelperDB dla podanego typu magazynu (nowa, pusta kolekcja)"""
+    databases = []
+    
+    def factory(backend_type="qdrant_local"):
+        from database import LanguageHelperDB
+        monkeypatch.setenv("STORAGE_BACKEND", backend_type)
+        monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "history.db"))
+        databases.append(LanguageHelperDB())
+        return databases[-1]
+    
+    yield factory
+    # Zapisy z kolejki w tle kończą się przed następnym testem
+    for db in databases:
+        db._writer.flush()
@@ -0,0 +1,106 @@
+"""
+Testy asynchronicznej nakładki na LanguageHelperDB
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, VectorParams
+import async_database
+from async_database import AsyncLanguageHelperDB
+from constants import QDRANT_VECTOR_SIZE
+from storage_backends import AsyncQdrantBackend, create_async_backend
+from conftest import BACKEND_TYPES
+
+@pytest.fixture
+def async_db(monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "qdrant_local")
+    db = AsyncLanguageHelperDB(max_concurrency=2, collection_name=f"async_{uuid.uuid4().hex[:8]}")
+    yield db
+    shared = async_database._shared_databases.pop(db.collection_name, None)
+    if shared is not None:
+        shared._writer.flush()
+
+def test_instance_is_usable_from_successive_event_loops(async_db):
+    # Streamlit uruchamia każdy rerun w nowej pętli zdarzeń
+    assert asyncio.run(async_db.save_translation("good morning", "dzień dobry", "angielski"))
+    translations = asyncio.run(async_db.get_translations())
+    
+    assert [item["input"] for item in translations] == ["good morning"]
+
+def test_instances_share_one_database(async_db):
+    other = AsyncLanguageHelperDB(collection_name=async_db.collection_name)
+    
+    async def initialize_both():
+        await asyncio.gather(async_db.initialize(), other.initialize())
+    
+    asyncio.run(initialize_both())
+    assert async_db.db is other.db
+
+def test_exposes_queries_of_sync_database(async_db):
+    async def scenario():
+        await async_db.save_correction("Ich habe ein Haus", "Ich habe ein Haus", None, "niemiecki", mode="analysis",
+                                       analysis_data={"vocabulary_items": [{"word": "Haus", "difficulty_level": "A1"}]})
+        return await async_db.find_vocabulary(language="niemiecki"), await async_db.get_stats()
+    
+    vocabulary, stats = asyncio.run(scenario())
+    
+    assert [item["word"] for item in vocabulary] == ["Haus"]
+    assert stats["status"] == "connected"
+
+def test_concurrency_is_bounded_per_event_loop(async_db, monkeypatch):
+    asyncio.run(async_db.initialize())
+    running, peak, lock = 0, 0, threading.Lock()
+    
+    def slow_get_translations(limit=50):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return []
+    
+    monkeypatch.setattr(async_db.db, "get_translations", slow_get_translations)
+    
+    async def many_reads():
+        await asyncio.gather(*(async_db.get_translations() for _ in range(6)))
+    
+    asyncio.run(many_reads())
+    assert peak == 2
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_local_backends_use_thread_pool(monkeypatch, backend_type):
+    monkeypatch.setenv("STORAGE_BACKEND", backend_type)
+    
+    assert create_async_backend("history") is None
+
+def test_reads_go_through_async_qdrant_client(async_db, monkeypatch):
+    asyncio.run(async_db.initialize())
+    # Dane tylko w magazynie asynchronicznym - synchroniczna kolekcja jest pusta
+    points = [async_db.db._translation_point(text, text, "angielski") for text in ("good morning", "good night", "thank you")]
+    monkeypatch.setattr(async_database, "create_async_backend",
+                        lambda collection_name: AsyncQdrantBackend(AsyncQdrantClient(location=":memory:"), collection_name))
+    
+    async def scenario():
+        backend = await async_db._async_backend()
+        await backend.client.create_collection(
+            async_db.collection_name, vectors_config=VectorParams(size=QDRANT_VECTOR_SIZE, distance=Distance.COSINE)
+        )
+        await backend.client.upsert(async_db.collection_name, points)
+        
+        first, cursor = await async_db.get_history_page("translations", page_size=2)
+        rest, last_cursor = await async_db.get_history_page("translations", page_size=2, cursor=cursor)
+        similar = await async_db.search_similar("thank you", "translation", k=1)
+        await async_db.close()
+        return first, rest, last_cursor, similar
+    
+    first, rest, last_cursor, similar = asyncio.run(scenario())
+    
+    assert [item["input"] for item in first + rest] == ["thank you", "good night", "good morning"]
+    assert last_cursor is None
+    assert [item["input"] for item in similar] == ["thank you"]
@@ -0,0 +1,59 @@
+"""
+Testy współdzielonego magazynu cache (L2) w SQLite
+"""
+
+import time
+from cache_backends import SQLiteCacheBackend
+from cache_manager import CacheManager
+
+def row_counts(backend):
+    return tuple(
+        backend.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("cache_entries", "cache_versions")
+    )
+
+def test_expired_entries_are_purged_on_open_and_every_n_writes(tmp_path, monkeypatch):
+    clock = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    path = str(tmp_path / "cache.db")
+    backend = SQLiteCacheBackend(path, purge_every=3)
+    backend.set("expired", "value", ttl=10)
+    backend.set("kept", "value", ttl=1000)
+    clock[0] += 60
+    
+    assert row_counts(SQLiteCacheBackend(path)) == (1, 1)
+    
+    backend.set("expiring", "value", ttl=10)
+    clock[0] += 60
+    backend.set("other", "value", ttl=1000)
+    backend.set("third", "value", ttl=1000)
+    # Odczyt nie usuwa wygasłego wpisu - robi to co trzeci zapis
+    assert backend.get("expiring") is None
+    assert row_counts(backend) == (4, 4)
+    
+    backend.set("fourth", "value", ttl=1000)
+    assert row_counts(backend) == (4, 4)
+    assert backend.version("expiring") == 0
+
+def test_rewrite_and_delete_leave_no_superseded_rows(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    first = backend.set("key", "old", ttl=60)
+    second = backend.set("key", "new", ttl=60)
+    assert second > first
+    assert row_counts(backend) == (1, 1)
+    
+    backend.delete("key")
+    assert row_counts(backend) == (0, 0)
+    # Nowa wersja po usunięciu jest większa od każdej wcześniejszej - kopie w L1 pozostają nieaktualne
+    assert backend.set("key", "again", ttl=60) > second
+
+def test_l1_copy_is_dropped_after_other_process_deletes_key(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = CacheManager(backend=SQLiteCacheBackend(path)), CacheManager(backend=SQLiteCacheBackend(path))
+    first.set("history:translations", ["old"], ttl=60)
+    assert second.get("history:translations") == ["old"]
+    
+    first.delete("history:translations")
+    first.set("history:translations", ["new"], ttl=60)
+    
+    assert second.get("history:translations") == ["new"]
@@ -0,0 +1,230 @@
+"""
+Testy CacheManager (single-flight, odświeżanie w tle, usuwanie wpisów LRU/GDSF, dekorator @cached)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from cache_manager import CacheManager, cached
+
+def test_get_or_load_runs_loader_once_for_concurrent_misses():
+    manager = CacheManager()
+    barrier = threading.Barrier(50)
+    calls = []
+    
+    def loader():
+        calls.append(threading.get_ident())
+        time.sleep(0.05)  # pozostałe wątki trafiają na trwające ładowanie
+        return "value"
+    
+    def read():
+        barrier.wait()
+        return manager.get_or_load("key", loader, ttl=60)
+    
+    with ThreadPoolExecutor(max_workers=50) as executor:
+        results = list(executor.map(lambda _: read(), range(50)))
+    
+    assert len(calls) == 1
+    assert results == ["value"] * 50
+
+def test_cached_counts_remembered_errors_only_as_error_hits():
+    @cached(ttl=60, error_ttl=60)
+    def failing_lookup(word):
+        raise ValueError(word)
+    
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            failing_lookup("Haus")
+    
+    stats = failing_lookup.cache_stats()
+    assert (stats["calls"], stats["misses"], stats["errors"], stats["error_hits"], stats["hits"]) == (3, 1, 1, 2, 0)
+    assert stats["hit_ratio"] == 0.0
+
+def test_concurrent_snapshot_saves_use_separate_temp_files(tmp_path):
+    manager = CacheManager()
+    for index in range(200):
+        manager.set(f"key{index}", "value" * 100, ttl=60)
+    path = str(tmp_path / "cache.snapshot")
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        saved = list(executor.map(lambda _: manager.save_snapshot(path), range(8)))
+    
+    assert saved == [200] * 8
+    assert CacheManager().load_snapshot(path) == 200
+    assert [file.name for file in tmp_path.iterdir()] == ["cache.snapshot"]
+
+def test_gdsf_applies_only_to_namespaces_that_opt_in():
+    budgets = {"llm": {"max_entries": 2, "eviction_policy": "gdsf"}, "memo": {"max_entries": 2}}
+    manager = CacheManager(namespace_budgets=budgets)
+    for namespace in budgets:
+        manager.set(f"{namespace}:expensive", "x", ttl=60, cost=5.0)
+        manager.set(f"{namespace}:cheap", "x", ttl=60, cost=0.001)
+        manager.get(f"{namespace}:cheap")  # najświeższy, ale tani w odtworzeniu
+        manager.set(f"{namespace}:new", "x", ttl=60, cost=1.0)
+    
+    assert manager.eviction_policy == "lru"
+    assert sorted(manager._namespace_keys["llm"]) == ["llm:expensive", "llm:new"]
+    assert sorted(manager._namespace_keys["memo"]) == ["memo:cheap", "memo:new"]
+
+def test_lru_evicts_least_recently_used_entry_under_entry_budget():
+    manager = CacheManager(max_entries=3)
+    for key in ("a", "b", "c"):
+        manager.set(key, key, ttl=60)
+    manager.get("a")
+    
+    manager.set("d", "d", ttl=60)
+    manager.set("e", "e", ttl=60)
+    
+    assert list(manager.cache) == ["a", "d", "e"]
+    assert sum(manager.evictions.values()) == 2
+
+def test_lru_evicts_until_new_entry_fits_byte_budget():
+    value = "x" * 1000
+    entry_size = CacheManager()._entry_size("k0", value)
+    manager = CacheManager(max_bytes=3 * entry_size)
+    for key in ("k0", "k1", "k2"):
+        manager.set(key, value, ttl=60)
+    manager.get("k0")
+    
+    manager.set("k3", value, ttl=60)
+    assert list(manager.cache) == ["k2", "k0", "k3"]
+    
+    # Większy wpis wymaga usunięcia dwóch najdawniej używanych
+    manager.set("k4", value * 2, ttl=60)
+    assert list(manager.cache) == ["k3", "k4"]
+    assert manager._total_bytes <= manager.max_bytes
+
+def test_namespace_byte_budget_evicts_only_from_that_namespace():
+    value = "x" * 1000
+    entry_size = CacheManager()._entry_size("llm:0", value)
+    manager = CacheManager(namespace_budgets={"llm": {"max_bytes": 2 * entry_size}})
+    manager.set("memo:old", value, ttl=60)
+    for index in range(3):
+        manager.set(f"llm:{index}", value, ttl=60)
+    
+    assert list(manager.cache) == ["memo:old", "llm:1", "llm:2"]
+    assert dict(manager.evictions) == {"llm": 1}
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Sterowany zegar monotoniczny (clock.now w sekundach)"""
+    class Clock:
+        now = 1000.0
+        
+        def advance(self, seconds):
+            self.now += seconds
+    
+    fake = Clock()
+    monkeypatch.setattr(time, "monotonic", lambda: fake.now)
+    return fake
+
+def test_expired_entries_are_purged_in_expiry_order(clock):
+    manager = CacheManager()
+    manager.set("short", 1, ttl=10)
+    manager.set("long", 2, ttl=30)
+    manager.set("medium", 3, ttl=20)
+    
+    clock.advance(15)
+    assert manager.cleanup_expired() == 1
+    assert list(manager.cache) == ["long", "medium"]
+    
+    clock.advance(10)
+    assert manager.get("medium") is None
+    assert manager.get("long") == 2
+    assert manager.expirations == 2
+
+def test_reset_with_new_ttl_ignores_stale_heap_entry(clock):
+    manager = CacheManager()
+    manager.set("extended", "old", ttl=10)
+    manager.set("extended", "new", ttl=100)
+    manager.set("shortened", "old", ttl=100)
+    manager.set("shortened", "new", ttl=5)
+    
+    # Pozycje kopca z pierwszych zapisów zostają - wpis decyduje o terminie
+    clock.advance(20)
+    assert manager.get("extended") == "new"
+    assert manager.get("shortened") is None
+    
+    # Stara pozycja (termin 100 s) nie usuwa wpisu zapisanego ponownie później
+    manager.set("shortened", "again", ttl=200)
+    clock.advance(90)
+    assert manager.cleanup_expired() == 1
+    assert list(manager.cache) == ["shortened"]
+    assert manager.expirations == 2
+
+def test_expiry_heap_stays_bounded_when_one_key_is_rewritten(clock):
+    manager = CacheManager()
+    for index in range(1000):
+        manager.set("key", index, ttl=60)
+    
+    assert len(manager._expiry_heap) <= 2 * len(manager.cache) + 65
+    clock.advance(61)
+    assert manager.get("key") is None
+
+def test_memory_accounting_follows_nested_values_through_update_and_removal():
+    history = [{"id": index, "text": f"{index}:" + "x" * 1000} for index in range(10)]
+    manager = CacheManager()
+    manager.set("history:translations", history, ttl=60)
+    manager.set("memo:small", "x", ttl=60)
+    
+    # Rozmiar obejmuje zawartość listy, a nie tylko samą listę
+    history_bytes = manager.memory_report()["namespaces"]["history"]["bytes"]
+    assert history_bytes >= 10 * 1000
+    assert manager._total_bytes == sum(entry["size"] for entry in manager.cache.values())
+    
+    # Te same obiekty liczone są raz - urosła tylko lista
+    manager.update("history:translations", lambda items: items + items)
+    doubled_bytes = manager.memory_report()["namespaces"]["history"]["bytes"]
+    assert history_bytes < doubled_bytes < history_bytes + 1000
+    assert manager._total_bytes == sum(entry["size"] for entry in manager.cache.values())
+    
+    manager.delete("history:translations")
+    assert "history" not in manager.memory_report()["namespaces"]
+    assert manager._total_bytes == manager.cache["memo:small"]["size"]
+
+def test_update_that_outgrows_max_bytes_evicts_other_entries():
+    item = {"text": "x" * 1000}
+    manager = CacheManager()
+    manager.set("memo:a", [item], ttl=60)
+    manager.set("memo:b", [item], ttl=60)
+    single = manager.cache["memo:a"]["size"]
+    manager.set_memory_budget(int(2.5 * single))
+    
+    manager.update("memo:b", lambda items: items + [{"text": "y" * 1000}])
+    
+    assert list(manager.cache) == ["memo:b"]
+    assert manager._total_bytes == manager.cache["memo:b"]["size"] <= manager.max_bytes
+
+def test_update_does_not_count_as_read():
+    manager = CacheManager(namespace_budgets={"history": {"eviction_policy": "gdsf"}})
+    manager.set("history:translations", ["a"], ttl=60)
+    
+    for item in ("b", "c"):
+        assert manager.update("history:translations", lambda items, item=item: [item] + items)
+    assert not manager.update("history:missing", lambda items: items)
+    
+    assert manager.get_stats()["hits"] == 0
+    assert manager.get_stats()["misses"] == 0
+    assert manager.cache["history:translations"]["frequency"] == 1
+    assert manager.get("history:translations") == ["c", "b", "a"]
+    assert manager.cache["history:translations"]["frequency"] == 2
+
+def test_cached_rejects_arguments_without_stable_key():
+    class Document:
+        def __init__(self, text):
+            self.text = text
+    
+    @cached(ttl=60)
+    def word_count(document):
+        return len(document.text.split())
+    
+    @cached(ttl=60, key=lambda document: [document.text])
+    def char_count(document):
+        return len(document.text)
+    
+    # repr obiektu zawiera adres w pamięci - klucz byłby inny przy każdym wywołaniu
+    with pytest.raises(TypeError, match="key="):
+        word_count(Document("ein zwei drei"))
+    assert char_count(Document("abc")) == 3
+    assert char_count.cache_key(Document("abc")) == char_count.cache_key(Document("abc"))
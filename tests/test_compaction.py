@@ -0,0 +1,76 @@
+"""
+Testy retencji i kompaktowania historii
+"""
+
+import time
+import pytest
+from datetime import datetime, timezone
+from constants import QDRANT_TIMESTAMP_FIELD
+from audio_store import audio_store
+from compaction import HistoryCompactor
+from storage_backends import PointSelector
+from conftest import BACKEND_TYPES
+
+DAY = 24 * 3600
+POLICIES = {"translation": {"max_age_days": 30, "max_per_language": 2}}
+# Audio tłumaczeń nie jest usuwane ze względu na wiek - tylko razem z punktami
+KEEP_AUDIO_DAYS = 10_000
+
+def add_translation(db, text, language, age_days, audio_data=None):
+    """Zapisuje w magazynie tłumaczenie sprzed podanej liczby dni i zwraca jego ID"""
+    point = db._translation_point(text, text, language, audio_data=audio_data)
+    timestamp = time.time() - age_days * DAY
+    point.payload["timestamp"] = datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
+    point.payload[QDRANT_TIMESTAMP_FIELD] = timestamp
+    db.backend.upsert([point])
+    return point.id
+
+def stored_ids(db):
+    return {str(point.id) for point in db.backend.iter_selected(PointSelector())}
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_retention_cutoffs_by_age_and_per_language_limit(make_db, backend_type):
+    db = make_db(backend_type)
+    kept = {
+        add_translation(db, "fresh en 1", "angielski", 1),
+        add_translation(db, "fresh en 2", "angielski", 2),
+        add_translation(db, "just before cutoff", "niemiecki", 29)
+    }
+    add_translation(db, "over limit en", "angielski", 3)
+    add_translation(db, "just after cutoff", "niemiecki", 31)
+    
+    report = HistoryCompactor(db, policies=POLICIES, audio_retention_days=KEEP_AUDIO_DAYS).run()
+    
+    assert stored_ids(db) == kept
+    assert (report["deleted_expired"], report["deleted_over_limit"]) == (1, 1)
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_dry_run_reports_what_real_run_deletes(make_db, backend_type):
+    db = make_db(backend_type)
+    for age_days in (1, 2, 3, 4, 40, 50):
+        add_translation(db, f"sentence {age_days}", "angielski", age_days)
+    before = stored_ids(db)
+    
+    dry_report = HistoryCompactor(db, policies=POLICIES, audio_retention_days=KEEP_AUDIO_DAYS, dry_run=True).run()
+    assert stored_ids(db) == before
+    report = HistoryCompactor(db, policies=POLICIES, audio_retention_days=KEEP_AUDIO_DAYS).run()
+    
+    # Punkty wygasłe nie są liczone drugi raz jako przekraczające limit
+    assert (dry_report["deleted_expired"], dry_report["deleted_over_limit"]) == (2, 2)
+    for counter in ("deleted_points", "deleted_expired", "deleted_over_limit", "bytes_reclaimed"):
+        assert dry_report[counter] == report[counter]
+    assert len(stored_ids(db)) == 2
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_deduplicated_audio_still_referenced_is_kept(make_db, dry_run):
+    db = make_db("qdrant_local")
+    shared_audio, expired_audio = b"shared mp3 bytes", b"expired mp3 bytes"
+    add_translation(db, "old with shared audio", "angielski", 40, audio_data=shared_audio)
+    fresh_id = add_translation(db, "fresh with shared audio", "angielski", 1, audio_data=shared_audio)
+    add_translation(db, "old with own audio", "angielski", 45, audio_data=expired_audio)
+    shared_ref = db.backend.query_selected(PointSelector(ids=[fresh_id]), 1)[0].payload
+    
+    report = HistoryCompactor(db, policies=POLICIES, audio_retention_days=KEEP_AUDIO_DAYS, dry_run=dry_run).run()
+    
+    assert report["audio_files_removed"] == 1
+    assert audio_store.exists(shared_ref["audio_sha256"], shared_ref["audio_format"])
@@ -0,0 +1,178 @@
+"""
+Testy LanguageHelperDB na magazynach lokalnych
+"""
+
+import time
+import pytest
+from cache_manager import cache_manager
+from storage_backends import PointSelector
+from conftest import BACKEND_TYPES
+
+def test_search_similar_qdrant_local(make_db):
+    db = make_db("qdrant_local")
+    db.save_translation("the weather is nice today", "pogoda jest dziś ładna", "angielski")
+    db.save_translation("I like green apples", "lubię zielone jabłka", "angielski")
+    
+    results = db.search_similar("nice weather today", "translation")
+    
+    assert [item["input"] for item in results] == ["the weather is nice today", "I like green apples"]
+    assert results[0]["score"] > results[1]["score"]
+
+def test_search_similar_filters_language(make_db):
+    db = make_db("qdrant_local")
+    db.save_translation("the weather is nice today", "el tiempo es bueno hoy", "hiszpański")
+    db.save_translation("the weather is nice today", "the weather is nice today", "angielski")
+    
+    results = db.search_similar("nice weather", "translation", language="hiszpański")
+    
+    assert [item["target_language"] for item in results] == ["hiszpański"]
+
+def test_chat_session_save_embeds_in_one_batch(make_db, monkeypatch):
+    db = make_db("qdrant_local")
+    calls = []
+    embed_batch = db.embedder.embed_batch
+    monkeypatch.setattr(db.embedder, "embed_batch", lambda texts: calls.append(len(texts)) or embed_batch(texts))
+    messages = [{"role": "user", "content": f"message {seq}"} for seq in range(5)]
+    
+    db.save_chat_session(messages, "angielski", "kawiarnia")
+    
+    assert calls == [6]  # nagłówek + 5 wiadomości
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_delete_chat_session_removes_messages_appended_after_count_was_read(make_db, backend_type):
+    db = make_db(backend_type)
+    messages = [{"role": "user", "content": "Hallo"}, {"role": "assistant", "content": "Hallo! Wie geht's?"}]
+    session_id = db.save_chat_session(messages, "niemiecki")
+    other_session_id = db.save_chat_session(messages, "niemiecki")
+    
+    # UI odczytało liczbę wiadomości, a w międzyczasie dopisano kolejne
+    message_count = db.get_chat_sessions()[0]["message_count"]
+    messages = messages + [{"role": "user", "content": "Gut, danke"}, {"role": "assistant", "content": "Schön!"}]
+    db.save_chat_session(messages, "niemiecki", session_id=session_id, saved_count=message_count)
+    
+    assert db.delete_chat_session(session_id)
+    
+    db._sync_pending_writes()
+    assert db.backend.count(PointSelector(match={"session_id": session_id})) == 0
+    assert db.backend.count(PointSelector(ids=[session_id])) == 0
+    assert len(db.get_chat_messages(other_session_id)[0]) == 2
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_stats_count_languages_from_data_and_writes_replace_cached_dict(make_db, backend_type):
+    db = make_db(backend_type)
+    db.save_translation("hello", "cześć", "angielski")
+    db.save_translation("ahoj", "cześć", "czeski")  # język spoza LANGUAGE_VOICE_MAPPING
+    db._sync_pending_writes()
+    
+    stats = db.get_stats()
+    db.save_translation("good morning", "dzień dobry", "angielski")
+    updated = db.get_stats()
+    
+    assert stats["language_counts"] == {"angielski": 1, "czeski": 1}
+    assert updated["language_counts"] == {"angielski": 2, "czeski": 1}
+    assert updated["mode_counts"]["translation"] == stats["mode_counts"]["translation"] + 1
+
+def test_stats_are_cached_per_collection(make_db):
+    from database import LanguageHelperDB
+    db = make_db("qdrant_local")
+    other = LanguageHelperDB("other_collection")
+    db.save_translation("hello", "cześć", "angielski")
+    db._sync_pending_writes()
+    
+    assert db.get_stats()["total_points"] == 1
+    assert other.get_stats()["total_points"] == 0
+    other.save_translation("ahoj", "cześć", "czeski")
+    other._writer.flush()
+    assert db.get_stats()["language_counts"] == {"angielski": 1}
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_delete_item_removes_it_from_cached_history(make_db, backend_type):
+    db = make_db(backend_type)
+    kept_id = db.save_translation("hello", "cześć", "angielski")
+    deleted_id = db.save_translation("good morning", "dzień dobry", "angielski")
+    assert [item["id"] for item in db.get_translations()] == [deleted_id, kept_id]
+    
+    assert db.delete_item(deleted_id)
+    
+    assert [item["id"] for item in db.get_translations()] == [kept_id]
+
+def test_load_history_snapshot_refreshes_stale_history_once_in_background(make_db, monkeypatch):
+    db = make_db("qdrant_local")
+    db.save_translation("hello", "cześć", "angielski")
+    db.load_history_snapshot()
+    cache_manager.cache["translations"]["fresh_until"] = 0  # lista tłumaczeń nieświeża
+    fetched = []
+    fetch_history = db._fetch_history
+    monkeypatch.setattr(db, "_fetch_history", lambda history_type, limit: fetched.append(history_type) or fetch_history(history_type, limit))
+    refreshes = cache_manager.refreshes
+    
+    snapshots = [db.load_history_snapshot() for _ in range(3)]
+    
+    assert all([item["input"] for item in snapshot["translations"]] == ["hello"] for snapshot in snapshots)
+    assert cache_manager.refreshes == refreshes + 1
+    for _ in range(100):
+        if "translations" not in cache_manager._in_flight:
+            break
+        time.sleep(0.01)
+    assert fetched == ["translations"]
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_chat_messages_dropped_by_write_queue_are_resent_by_next_save(make_db, backend_type, monkeypatch):
+    db = make_db(backend_type)
+    db._writer.max_retries = 0
+    messages = [{"role": "user", "content": f"Nachricht {seq}"} for seq in range(5)]
+    session_id = db.save_chat_session(messages[:2], "niemiecki")
+    db._sync_pending_writes()
+    cache_manager.set("llm:answer", "odpowiedź modelu")
+    
+    upsert = db.backend.upsert
+    def failing_upsert(points):
+        raise ConnectionError("magazyn niedostępny")
+    monkeypatch.setattr(db.backend, "upsert", failing_upsert)
+    db.save_chat_session(messages[:4], "niemiecki", session_id=session_id, saved_count=2)
+    db._sync_pending_writes()
+    monkeypatch.setattr(db.backend, "upsert", upsert)
+    
+    # UI uznało 4 wiadomości za zapisane - następny zapis wysyła też utracone wiadomości 2 i 3
+    db.save_chat_session(messages, "niemiecki", session_id=session_id, saved_count=4)
+    
+    stored, _ = db.get_chat_messages(session_id)
+    assert [message["content"] for message in stored] == [message["content"] for message in messages]
+    # Odrzucona partia unieważnia tylko historię i statystyki - odpowiedzi modelu zostają
+    assert cache_manager.get("llm:answer") == "odpowiedź modelu"
+
+def test_clear_all_keeps_model_answers_in_cache(make_db):
+    db = make_db("qdrant_local")
+    db.save_translation("good morning", "dzień dobry", "angielski")
+    assert db.get_translations()
+    cache_manager.set("llm:answer", "odpowiedź modelu")
+    
+    assert db.clear_all()
+    
+    assert cache_manager.get("translations") is None
+    assert cache_manager.get("llm:answer") == "odpowiedź modelu"
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_find_analyses_matches_conditions_within_one_list_element(make_db, backend_type):
+    db = make_db(backend_type)
+    db.save_correction("Ich habe gegessen", "Ich habe gegessen", None, "niemiecki", mode="analysis", analysis_data={
+        "vocabulary_items": [{"word": "essen", "difficulty_level": "A1"}, {"word": "haben", "difficulty_level": "B2"}],
+        "grammar_rules": [{"rule_name": "Perfekt", "difficulty_level": "A2"}]
+    })
+    db.save_correction("Ich esse", "Ich esse", None, "niemiecki", mode="analysis", analysis_data={
+        "vocabulary_items": [{"word": "essen", "difficulty_level": "B2"}],
+        "grammar_rules": [{"rule_name": "Präsens", "difficulty_level": "A1"}]
+    })
+    db.save_correction("I eat", "I eat", None, "angielski", mode="analysis", analysis_data={
+        "vocabulary_items": [{"word": "essen", "difficulty_level": "B2"}]
+    })
+    
+    def inputs(**conditions):
+        return sorted(record["input"] for record in db.find_analyses(**conditions))
+    
+    assert inputs(language="niemiecki", word="essen") == ["Ich esse", "Ich habe gegessen"]
+    # Słowo i poziom muszą dotyczyć tego samego elementu słownictwa
+    assert inputs(language="niemiecki", word="essen", vocabulary_level="B2") == ["Ich esse"]
+    assert inputs(rule_name="Perfekt", grammar_level="A2") == ["Ich habe gegessen"]
+    assert inputs(word=["haben", "sein"]) == ["Ich habe gegessen"]
+    assert inputs(word="essen", vocabulary_level="B2") == ["I eat", "Ich esse"]
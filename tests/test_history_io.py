@@ -0,0 +1,27 @@
+"""
+Eksport i import historii (history_io) na magazynach lokalnych
+"""
+
+import uuid
+import pytest
+from qdrant_client.models import PointStruct
+from constants import QDRANT_TIMESTAMP_FIELD, QDRANT_VECTOR_SIZE
+from history_io import export_history, import_history
+from conftest import BACKEND_TYPES
+
+@pytest.mark.parametrize("backend_type", BACKEND_TYPES)
+def test_export_and_import_keep_points_without_vectors(make_db, backend_type, tmp_path):
+    source = make_db(backend_type)
+    source.backend.upsert([
+        PointStruct(id=str(uuid.UUID(int=1)), vector=[1.0] + [0.0] * (QDRANT_VECTOR_SIZE - 1),
+                    payload={"mode": "translation", "target_language": "angielski", QDRANT_TIMESTAMP_FIELD: 1001.0}),
+        PointStruct(id=str(uuid.UUID(int=2)), vector={},
+                    payload={"mode": "learning_tips", "language": "angielski", QDRANT_TIMESTAMP_FIELD: 1002.0})
+    ])
+    
+    export_report = export_history(source, tmp_path / "backup.jsonl.gz")
+    source.backend.clear()
+    import_report = import_history(source, tmp_path / "backup.jsonl.gz", workers=1)
+    
+    assert export_report["points"] == import_report["points"] == 2
+    assert source.backend.count() == 2
@@ -0,0 +1,26 @@
+"""
+Kompresja pól payloadu (payload_codec)
+"""
+
+import payload_codec
+from payload_codec import compress_value, decompress_value
+
+LONG_TEXT = "Der Hund spielt im Garten. " * 100
+
+def test_compress_value_round_trips_long_text(monkeypatch):
+    monkeypatch.setenv("PAYLOAD_COMPRESSION", "zlib")
+    
+    compressed = compress_value(LONG_TEXT)
+    
+    assert compressed["codec"] == "zlib"
+    assert decompress_value(compressed) == LONG_TEXT
+    assert compress_value("krótki tekst") == "krótki tekst"
+
+def test_zstd_without_zstandard_falls_back_to_zlib(monkeypatch):
+    monkeypatch.setenv("PAYLOAD_COMPRESSION", "zstd")
+    monkeypatch.setattr(payload_codec, "zstandard", None)
+    
+    compressed = compress_value(LONG_TEXT)
+    
+    assert compressed["codec"] == "zlib"
+    assert decompress_value(compressed) == LONG_TEXT
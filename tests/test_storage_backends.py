@@ -0,0 +1,128 @@
+"""
+Wspólny kontrakt magazynów danych - te same testy dla każdego typu z create_backend
+
+Zdalny Qdrant testowany jest tylko, gdy ustawiono zmienną QDRANT_URL.
+"""
+
+import os
+import uuid
+import pytest
+from qdrant_client.models import PointStruct
+from constants import QDRANT_VECTOR_SIZE, QDRANT_TIMESTAMP_FIELD
+from storage_backends import create_backend, PointSelector
+from conftest import BACKEND_TYPES
+
+CONTRACT_BACKENDS = BACKEND_TYPES + [
+    pytest.param("qdrant", marks=pytest.mark.skipif(not os.getenv("QDRANT_URL"), reason="brak QDRANT_URL"))
+]
+
+def _vector(*components):
+    """Wektor o podanych pierwszych składowych (reszta zerowa)"""
+    return list(components) + [0.0] * (QDRANT_VECTOR_SIZE - len(components))
+
+def _point(index, mode="translation", language="angielski", vector=None, **payload):
+    language_field = "target_language" if mode == "translation" else "language"
+    return PointStruct(
+        id=str(uuid.UUID(int=index + 1)),
+        vector=vector or _vector(1.0, float(index)),
+        payload={"mode": mode, language_field: language, QDRANT_TIMESTAMP_FIELD: 1000.0 + index,
+                 "timestamp": f"2026-01-01T00:00:{index:02d}", **payload}
+    )
+
+@pytest.fixture(params=CONTRACT_BACKENDS)
+def backend(request, monkeypatch, tmp_path):
+    monkeypatch.setenv("STORAGE_BACKEND", request.param)
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "contract.db"))
+    backend = create_backend(f"contract_{uuid.uuid4().hex[:8]}")
+    assert backend.ensure_schema() is True
+    yield backend
+    backend.clear()
+
+def test_ensure_schema_is_idempotent(backend):
+    assert backend.ensure_schema() is False
+
+def test_upsert_and_count(backend):
+    backend.upsert([_point(index) for index in range(3)])
+    backend.upsert([_point(0, output_text="nadpisany")])
+    
+    assert backend.count() == 3
+    assert backend.count(PointSelector(modes=["translation"])) == 3
+    assert backend.count(PointSelector(modes=["correction"])) == 0
+
+def test_query_orders_by_timestamp_desc(backend):
+    backend.upsert([_point(index) for index in (2, 0, 4, 1, 3)] + [_point(5, mode="correction")])
+    
+    points = backend.query(["translation"], 3)
+    
+    assert [point.payload[QDRANT_TIMESTAMP_FIELD] for point in points] == [1004.0, 1003.0, 1002.0]
+
+def test_query_resumes_from_cursor_position(backend):
+    backend.upsert([_point(index) for index in range(5)])
+    
+    points = backend.query(["translation"], 10, start_from=1003.0, exclude_ids=[str(uuid.UUID(int=4))])
+    
+    assert [point.payload[QDRANT_TIMESTAMP_FIELD] for point in points] == [1002.0, 1001.0, 1000.0]
+
+def test_query_filters_language(backend):
+    backend.upsert([_point(0, language="angielski"), _point(1, language="niemiecki"),
+                    _point(2, mode="correction", language="niemiecki")])
+    
+    points = backend.query(["translation", "correction"], 10, language="niemiecki")
+    
+    assert sorted(str(point.id) for point in points) == [str(uuid.UUID(int=2)), str(uuid.UUID(int=3))]
+
+def test_distinct_languages_covers_both_language_fields(backend):
+    backend.upsert([_point(0, language="angielski"), _point(1, language="niemiecki"),
+                    _point(2, mode="correction", language="hiszpański"), _point(3, language="angielski")])
+    
+    assert backend.distinct_languages(["translation"]) == ["angielski", "niemiecki"]
+    assert backend.distinct_languages(["translation", "correction"]) == ["angielski", "hiszpański", "niemiecki"]
+    assert backend.distinct_languages(["analysis"]) == []
+
+def test_language_counts_per_language(backend):
+    backend.upsert([_point(0, language="angielski"), _point(1, language="niemiecki"),
+                    _point(2, mode="correction", language="angielski"), _point(3, mode="analysis", language="czeski")])
+    
+    assert backend.language_counts(["translation", "correction"]) == {"angielski": 2, "niemiecki": 1}
+
+def test_query_selected_matches_nested_elements(backend):
+    backend.upsert([
+        _point(0, mode="analysis", vocabulary_items=[{"word": "Haus", "difficulty_level": "A1"}]),
+        _point(1, mode="analysis", vocabulary_items=[{"word": "Haus", "difficulty_level": "B2"},
+                                                     {"word": "Baum", "difficulty_level": "A1"}]),
+        _point(2, mode="analysis", vocabulary_items=[{"word": "Baum", "difficulty_level": "B2"}])
+    ])
+    
+    selector = PointSelector(modes=["analysis"], nested={"vocabulary_items": {"word": "Haus", "difficulty_level": "B2"}})
+    points = backend.query_selected(selector, 10)
+    
+    assert [str(point.id) for point in points] == [str(uuid.UUID(int=2))]
+
+def test_search_ranks_by_cosine_similarity(backend):
+    backend.upsert([
+        _point(0, vector=_vector(1.0, 0.0)),
+        _point(1, vector=_vector(0.0, 1.0)),
+        _point(2, vector=_vector(1.0, 1.0)),
+        _point(3, mode="correction", vector=_vector(1.0, 0.0))
+    ])
+    
+    hits = backend.search(_vector(1.0, 0.1), ["translation"], 2)
+    
+    assert [str(hit.id) for hit in hits] == [str(uuid.UUID(int=1)), str(uuid.UUID(int=3))]
+    assert hits[0].score > hits[1].score
+
+def test_delete_selected_removes_only_matching_points(backend):
+    backend.upsert([_point(index) for index in range(4)] + [_point(4, mode="correction")])
+    
+    backend.delete_selected(PointSelector(modes=["translation"], before=1002.0))
+    
+    assert backend.count() == 3
+    assert backend.count(PointSelector(modes=["translation"])) == 2
+
+def test_delete_and_clear(backend):
+    backend.upsert([_point(index) for index in range(3)])
+    
+    backend.delete([str(uuid.UUID(int=1))])
+    assert backend.count() == 2
+    backend.clear()
+    assert backend.count() == 0
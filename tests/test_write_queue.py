@@ -0,0 +1,106 @@
+"""
+Testy kolejki zapisów w tle
+"""
+
+import threading
+import time
+from write_queue import WriteBehindQueue, flush_all_queues
+
+def recording_queue(**options):
+    """Kolejka zapisująca partie do listy; zdarzenie sygnalizuje każdą zapisaną partię"""
+    batches, written = [], threading.Event()
+    
+    def flush_fn(batch):
+        batches.append(list(batch))
+        written.set()
+    
+    return WriteBehindQueue(flush_fn, **options), batches, written
+
+def blocked_queue(**options):
+    """Kolejka, której zapis czeka na zdarzenie release"""
+    release = threading.Event()
+    queue = WriteBehindQueue(lambda batch: release.wait(5), **options)
+    return queue, release
+
+def test_batch_is_written_when_batch_size_is_reached():
+    queue, batches, written = recording_queue(batch_size=3, max_delay=60)
+    for item in ("a", "b", "c"):
+        queue.put(item)
+    
+    assert written.wait(2)
+    assert batches == [["a", "b", "c"]]
+
+def test_batch_is_written_after_max_delay_without_other_trigger():
+    queue, batches, written = recording_queue(batch_size=100, max_delay=0.2)
+    started = time.monotonic()
+    queue.put("a")
+    
+    assert not written.wait(0.1)
+    assert written.wait(2)
+    assert time.monotonic() - started >= 0.2
+    assert batches == [["a"]]
+
+def test_flush_waits_for_items_enqueued_before_call():
+    queue, batches, _ = recording_queue(batch_size=100, max_delay=60)
+    queue.put("a")
+    queue.put("b")
+    
+    assert queue.flush(timeout=2)
+    assert batches == [["a", "b"]]
+
+def test_flush_returns_false_on_timeout():
+    queue, release = blocked_queue(max_delay=60)
+    queue.put("a")
+    
+    assert queue.flush(timeout=0.1) is False
+    release.set()
+    assert queue.flush(timeout=2) is True
+
+def test_depth_counts_items_until_their_batch_is_written():
+    queue, release = blocked_queue(batch_size=2, max_delay=60)
+    assert queue.depth() == 0
+    for item in ("a", "b", "c"):
+        queue.put(item)
+    
+    # Pierwsza partia jest w trakcie zapisu, trzeci element czeka w buforze
+    assert queue.depth() == 3
+    release.set()
+    assert queue.flush(timeout=2)
+    assert queue.depth() == 0
+
+def test_flush_all_queues_writes_pending_items():
+    queue, batches, _ = recording_queue(batch_size=100, max_delay=60)
+    queue.put("a")
+    
+    flush_all_queues()
+    
+    assert batches == [["a"]]
+    assert queue.depth() == 0
+
+def test_dropped_batch_is_passed_to_on_failure():
+    failed = []
+    
+    def flush_fn(batch):
+        raise ConnectionError("magazyn niedostępny")
+    
+    queue = WriteBehindQueue(flush_fn, max_delay=60, max_retries=0, on_failure=failed.append)
+    queue.put("a")
+    queue.put("b")
+    
+    # Odrzucona partia też kończy oczekiwanie - flush nie blokuje się na niej
+    assert queue.flush(timeout=2)
+    assert failed == [["a", "b"]]
+    assert queue.depth() == 0
+
+def test_failed_batch_is_dropped_without_sleeping_after_last_attempt(monkeypatch):
+    sleeps, failed = [], []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    
+    def flush_fn(batch):
+        raise ConnectionError("magazyn niedostępny")
+    
+    queue = WriteBehindQueue(flush_fn, max_delay=0.5, max_retries=2, on_failure=failed.append)
+    queue._write_batch(["a", "b"])
+    
+    assert sleeps == [0.5, 1.0]
+    assert failed == [["a", "b"]]
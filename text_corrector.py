@@ -1,8 +1,52 @@
-from openai_client import get_global_openai_client
+from openai_client import get_global_openai_client, response_tokens
+from cache_manager import cached, report_load_cost
+from constants import LLM_CACHE_TTL, LLM_ERROR_CACHE_TTL
 
 # Konfiguracja OpenAI
 client = get_global_openai_client()
 
+@cached(ttl=LLM_CACHE_TTL, namespace="llm", error_ttl=LLM_ERROR_CACHE_TTL)
+def _request_correction(text, language):
+    """Pyta model o poprawiony tekst (ten sam tekst i język - wynik z cache)"""
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": f"Jesteś ekspertem w poprawianiu błędów gramatycznych w języku {language}. Popraw błędy w tekście i zwróć poprawioną wersję. Jeśli tekst jest już poprawny, zwróć go bez zmian. Odpowiadaj w języku polskim."
+            },
+            {
+                "role": "user",
+                "content": f"Popraw błędy w tym tekście ({language}): {text}"
+            }
+        ],
+        max_tokens=1000,
+        temperature=0.2
+    )
+    report_load_cost(tokens=response_tokens(response))
+    return response.choices[0].message.content.strip()
+
+@cached(ttl=LLM_CACHE_TTL, namespace="llm", error_ttl=LLM_ERROR_CACHE_TTL)
+def _request_explanation(original_text, corrected_text, language):
+    """Pyta model o wyjaśnienie poprawek (wynik z cache dla tej samej pary tekstów)"""
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": f"Jesteś nauczycielem języka {language}. Wyjaśnij jakie błędy zostały poprawione w tekście. Podaj krótkie i zrozumiałe wyjaśnienia w języku polskim. Używaj nazw gramatycznych w języku {language} (np. Present Perfect, Past Continuous), ale wyjaśnienia podawaj po polsku."
+            },
+            {
+                "role": "user",
+                "content": f"Oryginalny tekst: {original_text}\nPoprawiony tekst: {corrected_text}\nWyjaśnij jakie błędy zostały poprawione."
+            }
+        ],
+        max_tokens=500,
+        temperature=0.3
+    )
+    report_load_cost(tokens=response_tokens(response))
+    return response.choices[0].message.content.strip()
+
 def correct_text(text, language="angielski"):
     """
     Funkcja do poprawiania błędów gramatycznych w tekście obcojęzycznym
@@ -11,22 +55,7 @@ def correct_text(text, language="angielski"):
         return "Klucz API OpenAI nie jest skonfigurowany. Dodaj OPENAI_API_KEY do pliku .env"
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Jesteś ekspertem w poprawianiu błędów gramatycznych w języku {language}. Popraw błędy w tekście i zwróć poprawioną wersję. Jeśli tekst jest już poprawny, zwróć go bez zmian. Odpowiadaj w języku polskim."
-                },
-                {
-                    "role": "user",
-                    "content": f"Popraw błędy w tym tekście ({language}): {text}"
-                }
-            ],
-            max_tokens=1000,
-            temperature=0.2
-        )
-        return response.choices[0].message.content.strip()
+        return _request_correction(text, language)
     except Exception as e:
         return f"Błąd podczas poprawiania tekstu: {str(e)}"
 
@@ -38,21 +67,6 @@ def get_correction_explanation(original_text, corrected_text, language="angielsk
         return "Klucz API OpenAI nie jest skonfigurowany. Dodaj OPENAI_API_KEY do pliku .env"
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Jesteś nauczycielem języka {language}. Wyjaśnij jakie błędy zostały poprawione w tekście. Podaj krótkie i zrozumiałe wyjaśnienia w języku polskim. Używaj nazw gramatycznych w języku {language} (np. Present Perfect, Past Continuous), ale wyjaśnienia podawaj po polsku."
-                },
-                {
-                    "role": "user",
-                    "content": f"Oryginalny tekst: {original_text}\nPoprawiony tekst: {corrected_text}\nWyjaśnij jakie błędy zostały poprawione."
-                }
-            ],
-            max_tokens=500,
-            temperature=0.3
-        )
-        return response.choices[0].message.content.strip()
+        return _request_explanation(original_text, corrected_text, language)
     except Exception as e:
         return f"Błąd podczas generowania wyjaśnienia: {str(e)}"
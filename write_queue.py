@@ -0,0 +1,175 @@
+"""
+Kolejka zapisów w tle (write-behind) dla aplikacji Language Helper
+"""
+
+import atexit
+import threading
+import time
+import weakref
+from typing import Any, Callable, List, Optional
+from constants import WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL, WRITE_MAX_RETRIES
+from logger_config import log_debug, log_error, log_info
+
+# Wszystkie aktywne kolejki - opróżniane przy zamykaniu procesu
+_active_queues = weakref.WeakSet()
+
+class WriteBehindQueue:
+    """Grupuje zapisy w partie i wysyła je z wątku w tle (wg rozmiaru partii lub po czasie)"""
+    
+    def __init__(self, flush_fn: Callable[[List[Any]], None], batch_size: int = WRITE_BATCH_SIZE,
+                 max_delay: float = WRITE_FLUSH_INTERVAL, max_retries: int = WRITE_MAX_RETRIES,
+                 on_failure: Optional[Callable[[List[Any]], None]] = None):
+        """
+        Inicjalizuje kolejkę
+        
+        Args:
+            flush_fn: Funkcja zapisująca jedną partię elementów (np. jeden upsert)
+            batch_size: Liczba elementów, po której partia jest wysyłana od razu
+            max_delay: Maksymalny czas (s) oczekiwania elementu w kolejce
+            max_retries: Liczba ponowień nieudanej partii przed jej odrzuceniem
+            on_failure: Funkcja wywoływana z partią odrzuconą po wyczerpaniu ponowień
+        """
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.on_failure = on_failure
+        
+        self._buffer: List[Any] = []
+        self._oldest_at: Optional[float] = None
+        self._enqueued = 0      # numer ostatniego przyjętego elementu
+        self._completed = 0     # numer ostatniego obsłużonego elementu
+        self._flush_requested = False
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        
+        _active_queues.add(self)
+    
+    def put(self, item: Any) -> None:
+        """
+        Dodaje element do kolejki (bez czekania na zapis)
+        
+        Args:
+            item: Element do zapisania
+        """
+        with self._condition:
+            if not self._buffer:
+                self._oldest_at = time.monotonic()
+            self._buffer.append(item)
+            self._enqueued += 1
+            self._ensure_worker()
+            self._condition.notify_all()
+    
+    def depth(self) -> int:
+        """Zwraca liczbę elementów oczekujących na zapis"""
+        with self._condition:
+            return self._enqueued - self._completed
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wymusza zapis i czeka na wszystkie elementy dodane przed wywołaniem
+        
+        Args:
+            timeout: Maksymalny czas oczekiwania w sekundach (None = bez limitu)
+        
+        Returns:
+            bool: True jeśli wszystkie elementy zostały obsłużone
+        """
+        with self._condition:
+            target = self._enqueued
+            if self._completed >= target:
+                return True
+            self._flush_requested = True
+            started = self._ensure_worker()
+            self._condition.notify_all()
+            if started:
+                return self._condition.wait_for(lambda: self._completed >= target, timeout=timeout)
+        
+        # Nie można uruchomić wątku (np. przy zamykaniu interpretera) - zapis w bieżącym wątku
+        self._run()
+        return self.depth() == 0
+    
+    def _ensure_worker(self) -> bool:
+        """
+        Uruchamia wątek zapisujący, jeśli nie działa (wywoływane pod blokadą)
+        
+        Returns:
+            bool: True jeśli wątek działa
+        """
+        if self._worker is None or not self._worker.is_alive():
+            try:
+                worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                worker.start()
+            except RuntimeError:
+                return False
+            self._worker = worker
+        return True
+    
+    def _take_batch(self) -> List[Any]:
+        """
+        Czeka aż partia będzie gotowa i ją zdejmuje (wywoływane pod blokadą)
+        
+        Returns:
+            List: Partia do zapisu lub pusta lista gdy kolejka jest pusta
+        """
+        while self._buffer:
+            deadline = self._oldest_at + self.max_delay
+            remaining = deadline - time.monotonic()
+            if len(self._buffer) >= self.batch_size or self._flush_requested or remaining <= 0:
+                break
+            self._condition.wait(timeout=remaining)
+        
+        batch = self._buffer[:self.batch_size]
+        del self._buffer[:self.batch_size]
+        self._oldest_at = time.monotonic() if self._buffer else None
+        if not self._buffer:
+            self._flush_requested = False
+        return batch
+    
+    def _run(self) -> None:
+        """Pętla wątku zapisującego - kończy się gdy kolejka jest pusta"""
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+                if not batch:
+                    self._worker = None
+                    return
+            
+            self._write_batch(batch)
+            
+            with self._condition:
+                self._completed += len(batch)
+                self._condition.notify_all()
+    
+    def _write_batch(self, batch: List[Any]) -> None:
+        """
+        Zapisuje partię z ponowieniami
+        
+        Args:
+            batch: Partia elementów
+        """
+        max_attempts = self.max_retries + 1
+        for attempt in range(1, max_attempts + 1):
+            try:
+                self.flush_fn(batch)
+                log_debug(f"Write-behind: zapisano partię {len(batch)} elementów")
+                return
+            except Exception as e:
+                log_error(f"Write-behind: błąd zapisu partii (próba {attempt}): {str(e)}")
+                # Po ostatniej próbie partia jest od razu odrzucana - bez czekania
+                if attempt < max_attempts:
+                    time.sleep(min(self.max_delay * attempt, 5.0))
+        
+        log_error(f"Write-behind: odrzucono partię {len(batch)} elementów po {self.max_retries} ponowieniach")
+        if self.on_failure:
+            self.on_failure(batch)
+
+def flush_all_queues() -> None:
+    """Opróżnia wszystkie aktywne kolejki (wywoływane przy zamykaniu procesu)"""
+    for queue in list(_active_queues):
+        pending = queue.depth()
+        if pending:
+            log_info(f"Write-behind: zapisuję {pending} oczekujących elementów przed zamknięciem")
+            queue.flush()
+
+atexit.register(flush_all_queues)